@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+import tempfile
 
 from pathlib import Path
 
@@ -22,6 +23,12 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
 TELEGRAM_ALERTS_BOT_TOKEN = os.environ.get('TELEGRAM_ALERTS_BOT_TOKEN')
+# Адрес Bot API (для тестов можно подставить локальный сервер-заглушку)
+TELEGRAM_API_URL = os.environ.get('TELEGRAM_API_URL', 'https://api.telegram.org')
+# Лимиты Telegram: ~30 сообщений/сек на бота, 1/сек в личный чат, 20/мин в группу
+TELEGRAM_GLOBAL_RATE = float(os.environ.get('TELEGRAM_GLOBAL_RATE', '30'))
+TELEGRAM_CHAT_RATE = float(os.environ.get('TELEGRAM_CHAT_RATE', '1'))
+TELEGRAM_GROUP_RATE_PER_MINUTE = float(os.environ.get('TELEGRAM_GROUP_RATE_PER_MINUTE', '20'))
 
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.environ.get('SECRET_KEY', 'django-insecure-1tj806!%%4mj43w(4a=jap2o(nht%txy+i6h^8g%-@eo@fbj*r')
@@ -66,6 +73,8 @@ MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    # Время/SQL/сериализация по маршрутам для /metrics (статику не меряем)
+    'wells.metrics.MetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -178,10 +187,75 @@ STORAGES = {
     "staticfiles": {
         "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
     },
+    # Архив замеров завершенных скважин (wells/archive.py). Диск машины
+    # должен быть постоянным; иначе — любое хранилище Django (S3 и т.п.)
+    "mud_archive": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "OPTIONS": {"location": os.environ.get('MUD_ARCHIVE_DIR', str(BASE_DIR / 'archive'))},
+    },
 }
 
 
 GOOGLE_API_KEY = os.environ.get('GOOGLE_API_KEY')
 
+# Сколько секунд индекс норм в памяти процесса считается свежим
+# (в своем процессе он сбрасывается сигналами сразу, см. wells/norm_index.py)
+NORM_INDEX_TTL = int(os.environ.get('NORM_INDEX_TTL', '60'))
+
+# Кэш готовых ответов списков дашборда (wells/response_cache.py).
+# По умолчанию — файловый (общий для всех воркеров gunicorn на машине: сигнал
+# сброса в одном воркере виден остальным), при заданном REDIS_URL — Redis
+# (нужен пакет redis).
+API_CACHE_TTL = int(os.environ.get('API_CACHE_TTL', '300'))
+REDIS_URL = os.environ.get('REDIS_URL')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'api': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+        'KEY_PREFIX': 'oil-dashboard',
+    } if REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('API_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'oil-dashboard-api-cache')),
+        'OPTIONS': {'MAX_ENTRIES': 2000},
+    },
+}
+
+# Как долго буфер последних замеров скважины (правила по трендам, wells/trends.py)
+# живет без перечитывания из БД: другие воркеры могли обработать новые замеры
+TREND_BUFFER_TTL = int(os.environ.get('TREND_BUFFER_TTL', '300'))
+
+# Живые обновления по SSE (wells/events.py). Поток отдает отдельный ASGI-процесс
+# (events в Procfile), сводки принимают WSGI-воркеры web, поэтому события между
+# процессами разносит Postgres LISTEN/NOTIFY. Выключать (EVENTS_PG_NOTIFY=0) имеет
+# смысл только при одном процессе на все; на SQLite работает только внутри процесса.
+EVENTS_PG_NOTIFY = os.environ.get('EVENTS_PG_NOTIFY', '1') == '1'
+# Раз во сколько секунд в простаивающий поток уходит пинг
+EVENTS_HEARTBEAT = int(os.environ.get('EVENTS_HEARTBEAT', '15'))
+
+# Синхронизация изменений (/api/changes/, wells/changes.py): на сколько секунд
+# курсор отстает от текущего времени (запас на незакоммиченные транзакции)
+# и сколько дней хранится журнал удалений (курсор старше — полный снимок)
+CHANGES_SAFETY_WINDOW = int(os.environ.get('CHANGES_SAFETY_WINDOW', '5'))
+CHANGES_TOMBSTONE_DAYS = int(os.environ.get('CHANGES_TOMBSTONE_DAYS', '30'))
+# Метрики Prometheus (/metrics, wells/metrics.py): как часто процесс выкладывает
+# свой снимок в общий кэш, сколько снимок живет без обновления и токен доступа
+# (если задан — нужен заголовок Authorization: Bearer <токен>)
+METRICS_FLUSH_INTERVAL = int(os.environ.get('METRICS_FLUSH_INTERVAL', '10'))
+METRICS_PROCESS_TTL = int(os.environ.get('METRICS_PROCESS_TTL', '3600'))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+# Архивация замеров (команда archive_mud_logs): замеры неактивных скважин
+# старше стольких дней переезжают из БД в файлы хранилища 'mud_archive'
+MUD_ARCHIVE_AFTER_DAYS = int(os.environ.get('MUD_ARCHIVE_AFTER_DAYS', '180'))
+
+REST_FRAMEWORK = {
+    # TimedJSONRenderer — JSONRenderer с замером времени рендера для /metrics
+    'DEFAULT_RENDERER_CLASSES': [
+        'wells.metrics.TimedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
 
 DATA_UPLOAD_MAX_NUMBER_FIELDS = 10000
@@ -2,9 +2,12 @@
 
 from django.contrib import admin
 from django.urls import path, include # Убедись, что 'include' импортирован
+from wells.views import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     # Добавляем эту строчку
     path('api/', include('wells.urls')), 
+    # Метрики для Prometheus
+    path('metrics', metrics_view, name='metrics'),
 ]
\ No newline at end of file
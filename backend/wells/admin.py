@@ -1,10 +1,18 @@
+from django import forms
 from django.contrib import admin
+from django.contrib.admin import helpers
+from django.core.exceptions import ValidationError
+from django.template.response import TemplateResponse
 # ИМПОРТИРУЕМ КЛАССЫ ИЗ NESTED_ADMIN
 from django.urls import reverse
 from django.utils.html import format_html
+from django.db.models import Exists, OuterRef
 import nested_admin
 
-from .models import Well, Task, NVPIncident, Tender, MudParameterLog, DrillingProgram, ProgramSection, DepthIntervalNorms,ChemicalReagent, MudType
+from .models import Well, Task, NVPIncident, Tender, MudParameterLog, DrillingProgram, ProgramSection, DepthIntervalNorms,ChemicalReagent, MudType, Job
+from django.utils import timezone
+from .revalidation import revalidate_mud_logs
+from .program_import import import_program_file
 
 @admin.register(ChemicalReagent)
 class ChemicalReagentAdmin(admin.ModelAdmin):
@@ -83,6 +91,12 @@ class MudParameterLogAdmin(admin.ModelAdmin):
     def has_add_permission(self, request):
         return False
 
+class ProgramImportForm(forms.Form):
+    file = forms.FileField(label="Файл программы", help_text="XLSX или CSV: строка на интервал, первая строка — заголовки")
+    name = forms.CharField(label="Название программы", max_length=255)
+    replace = forms.BooleanField(label="Заменить существующие программы", required=False)
+
+
 @admin.register(Well)
 class WellAdmin(nested_admin.NestedModelAdmin):
     list_display = ('name', 'is_active', 'current_depth', 'current_section','has_nvp_incidents',  'has_overspending', 'updated_at')
@@ -99,6 +113,47 @@ class WellAdmin(nested_admin.NestedModelAdmin):
         ('Уведомления и Логи', {'fields': ('telegram_chat_id', 'telegram_topic_id', 'mud_logs_link')}),
     )
     inlines = [DrillingProgramInline, NVPIncidentInline]
+    actions = ['revalidate_history', 'import_program']
+
+    @admin.action(description="Перепроверить историю замеров по текущим нормам")
+    def revalidate_history(self, request, queryset):
+        stats = revalidate_mud_logs(well_ids=list(queryset.values_list('pk', flat=True)))
+        self.message_user(
+            request,
+            f"Проверено замеров: {stats['checked']}, изменено флагов: {stats['changed']}, "
+            f"пропущено (нет глубины/секции): {stats['skipped']}."
+        )
+
+    @admin.action(description="Загрузить программу промывки из файла")
+    def import_program(self, request, queryset):
+        # Промежуточная страница с формой; форма отправляется обратно в это же действие
+        if 'apply' in request.POST:
+            form = ProgramImportForm(request.POST, request.FILES)
+            if form.is_valid():
+                upload = form.cleaned_data['file']
+                try:
+                    stats = import_program_file(
+                        upload, upload.name, queryset, form.cleaned_data['name'], replace=form.cleaned_data['replace'],
+                    )
+                except ValidationError as e:
+                    form.add_error(None, e)
+                else:
+                    self.message_user(
+                        request,
+                        f"Программа загружена на {stats['wells']} скв. (заменено: {stats['replaced']}): "
+                        f"секций {stats['sections']}, интервалов {stats['intervals']}.",
+                    )
+                    return None
+        else:
+            form = ProgramImportForm()
+        return TemplateResponse(request, 'admin/wells/well/import_program.html', {
+            **self.admin_site.each_context(request),
+            'title': "Загрузка программы промывки",
+            'opts': self.model._meta,
+            'form': form,
+            'wells': queryset.select_related('drilling_program').order_by('name'),
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+        })
 
     def mud_logs_link(self, obj):
         if obj.pk: # Если объект уже сохранен
@@ -111,9 +166,15 @@ class WellAdmin(nested_admin.NestedModelAdmin):
         return "Сохраните скважину, чтобы увидеть ссылку на логи."
     mud_logs_link.short_description = "История параметров"
 
-    @admin.display(boolean=True, description='Наличие НВП')
+    def get_queryset(self, request):
+        # Наличие НВП считаем в том же запросе, что и список (иначе — запрос на каждую строку)
+        return super().get_queryset(request).annotate(
+            _has_nvp_incidents=Exists(NVPIncident.objects.filter(well=OuterRef('pk')))
+        )
+
+    @admin.display(boolean=True, description='Наличие НВП', ordering='_has_nvp_incidents')
     def has_nvp_incidents(self, obj):
-        return obj.nvp_incidents.exists()
+        return obj._has_nvp_incidents
 @admin.register(Task)
 class TaskAdmin(admin.ModelAdmin):
     list_display = ('title', 'customer', 'deadline', 'is_urgent', 'is_completed')
@@ -124,4 +185,23 @@ class TaskAdmin(admin.ModelAdmin):
 class TenderAdmin(admin.ModelAdmin):
     list_display = ('name', 'status', 'deadline', 'updated_at')
     list_filter = ('status',)
-    search_fields = ('name', 'notes')
\ No newline at end of file
+    search_fields = ('name', 'notes')
+
+# Очередь фоновых задач: только просмотр и повторный запуск
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'attempts', 'max_attempts', 'run_after', 'created_at', 'updated_at')
+    list_filter = ('status', 'kind')
+    search_fields = ('last_error',)
+    readonly_fields = ('kind', 'payload', 'status', 'attempts', 'max_attempts', 'run_after', 'last_error', 'created_at', 'updated_at')
+    actions = ['retry_jobs']
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description="Повторить выбранные задачи")
+    def retry_jobs(self, request, queryset):
+        updated = queryset.exclude(status=Job.Status.RUNNING).update(
+            status=Job.Status.PENDING, attempts=0, run_after=timezone.now(), updated_at=timezone.now()
+        )
+        self.message_user(request, f"Возвращено в очередь задач: {updated}")
@@ -3,9 +3,12 @@ import logging
 import google.generativeai as genai
 from django.conf import settings
 from .models import Well
+from .validator import get_interval_norms
+from .metrics import stage_timer
 
 logger = logging.getLogger(__name__)
 
+@stage_timer('ai')
 def get_ai_analysis(well: Well) -> str | None:
     """
     Формирует промпт, отправляет его в Google Gemini и возвращает анализ.
@@ -27,15 +30,7 @@ def get_ai_analysis(well: Well) -> str | None:
         if len(last_logs) < 2:
             return None
 
-        current_norms = None
-        try:
-            section = well.drilling_program.sections.get(section_type=well.current_section)
-            current_norms = section.intervals.get(
-                start_depth__lte=well.current_depth,
-                end_depth__gte=well.current_depth
-            )
-        except Exception:
-            pass
+        current_norms = get_interval_norms(well, well.current_depth)
 
         prompt_parts = []
         prompt_parts.append("Ты — опытный инженер по буровым растворам. Проведи краткий анализ ситуации на скважине и дай рекомендации. Отвечай кратко, по делу, используя Markdown для форматирования.")
@@ -0,0 +1,358 @@
+# backend/wells/archive.py
+"""
+Холодный архив замеров завершенных скважин.
+
+У неактивной скважины (is_active=False) замеры старше MUD_ARCHIVE_AFTER_DAYS
+выгружаются в файл .npz — по массиву NumPy на колонку, сжатие zlib — и
+удаляются из MudParameterLog. Горячая таблица остается маленькой (помещается
+в память БД), а резервные копии — легкими: 17 float-колонок сжимаются в
+файле в разы лучше, чем строки в Postgres.
+
+Файл неизменяем: одна архивация — один файл (MudLogArchive). Если скважину
+вернули в работу и потом снова завершили, у нее появится второй архив.
+
+Чтение прозрачное: графики (timeseries) добавляют к строкам из БД строки из
+архивов скважины — те же объекты MudParameterLog, только не сохраненные;
+история замеров (/api/wells/<id>/mud-logs/) берет из архива только строки
+страницы (ArchivedLogs). Часовые/суточные сводки
+(rollups) при архивации не трогаются, а их пересборка читает и архив —
+по одному файлу, агрегируя прямо по колонкам NumPy.
+
+Последние прочитанные архивы держатся в памяти процесса (ARCHIVE_CACHE_SIZE):
+файлы не меняются, поэтому сбрасывать их не нужно.
+"""
+import io
+import heapq
+import hashlib
+import logging
+import itertools
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone as dt_timezone
+import numpy as np
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.db import models, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from .models import Well, MudParameterLog, MudLogArchive, ProcessedSummary, ReceivedSummary
+from .trends import invalidate_trend_buffer
+
+logger = logging.getLogger(__name__)
+
+FLOAT_FIELDS = tuple(
+    field.name for field in MudParameterLog._meta.concrete_fields if isinstance(field, models.FloatField)
+)
+TEXT_FIELDS = ('section', 'raw_unparsed_params')
+ARCHIVE_FIELDS = ('id', 'measurement_time', 'is_out_of_norm') + FLOAT_FIELDS + TEXT_FIELDS
+DELETE_CHUNK_SIZE = 2000
+ARCHIVE_CACHE_SIZE = 16
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def archive_storage():
+    return storages['mud_archive']
+
+
+def archive_cutoff():
+    return timezone.now() - timedelta(days=getattr(settings, 'MUD_ARCHIVE_AFTER_DAYS', 180))
+
+
+def with_archive_flag(queryset):
+    """Аннотирует скважины флагом has_archived_logs (без отдельного запроса на скважину)."""
+    return queryset.annotate(has_archived_logs=Exists(MudLogArchive.objects.filter(well=OuterRef('pk'))))
+
+
+# --- Формат файла ---
+
+def _encode(rows) -> bytes:
+    """rows — кортежи значений ARCHIVE_FIELDS. None: NaN для чисел, маска для текста."""
+    columns = dict(zip(ARCHIVE_FIELDS, zip(*rows)))
+    arrays = {
+        'id': np.array(columns['id'], dtype=np.int64),
+        # микросекунды Unix-времени (UTC)
+        'measurement_time': np.array(
+            [to_microseconds(value) for value in columns['measurement_time']], dtype=np.int64,
+        ),
+        'is_out_of_norm': np.array(columns['is_out_of_norm'], dtype=bool),
+    }
+    for name in FLOAT_FIELDS:
+        arrays[name] = np.array(columns[name], dtype=float)
+    for name in TEXT_FIELDS:
+        arrays[name] = np.array(['' if value is None else value for value in columns[name]], dtype=str)
+        arrays[f'{name}__null'] = np.array([value is None for value in columns[name]], dtype=bool)
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    return buffer.getvalue()
+
+
+def _decode(content: bytes) -> dict:
+    with np.load(io.BytesIO(content), allow_pickle=False) as data:
+        return {name: data[name] for name in data.files}
+
+
+# --- Чтение ---
+
+_cache_lock = threading.Lock()
+_cache = OrderedDict() # (archive.pk, sha256) -> колонки; sha256 — на случай переиспользованного pk
+
+
+def load_archive(archive: MudLogArchive, cache: bool = True) -> dict:
+    """
+    Колонки архива. cache=False — для проходов по всем архивам (пересборка
+    сводок): не вытесняем из кэша архивы, которые читает API.
+    """
+    key = (archive.pk, archive.sha256)
+    with _cache_lock:
+        columns = _cache.get(key)
+        if columns is not None:
+            _cache.move_to_end(key)
+            return columns
+    with archive_storage().open(archive.file, 'rb') as f:
+        columns = _decode(f.read())
+    if not cache:
+        return columns
+    with _cache_lock:
+        _cache[key] = columns
+        while len(_cache) > ARCHIVE_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return columns
+
+
+def to_microseconds(moment) -> int:
+    """Время в единицах колонки measurement_time (микросекунды Unix-времени)."""
+    return (moment - _EPOCH) // timedelta(microseconds=1)
+
+
+def from_microseconds(value: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=int(value))
+
+
+def iter_archives(well_ids=None, time_from=None, time_to=None, cache: bool = True):
+    """
+    (архив, колонки) по одному архиву скважин well_ids (None — всех), которые
+    пересекаются с периодом time_from..time_to: в памяти только текущий архив.
+    """
+    archives = MudLogArchive.objects.all()
+    if well_ids is not None:
+        archives = archives.filter(well_id__in=list(well_ids))
+    if time_from:
+        archives = archives.filter(time_to__gte=time_from)
+    if time_to:
+        archives = archives.filter(time_from__lte=time_to)
+    for archive in archives.order_by('well_id', 'pk').iterator():
+        yield archive, load_archive(archive, cache=cache)
+
+
+def _to_logs(well_id: int, columns: dict, selected) -> list:
+    logs = []
+    times = columns['measurement_time'][selected].tolist()
+    values = {name: columns[name][selected].tolist() for name in ('id', 'is_out_of_norm') + FLOAT_FIELDS}
+    texts = {
+        name: [None if null else value for value, null in zip(
+            columns[name][selected].tolist(), columns[f'{name}__null'][selected].tolist(),
+        )]
+        for name in TEXT_FIELDS
+    }
+    for i, moment in enumerate(times):
+        fields = {name: values[name][i] for name in values} | {name: texts[name][i] for name in TEXT_FIELDS}
+        for name in FLOAT_FIELDS:
+            if fields[name] != fields[name]: # NaN -> None
+                fields[name] = None
+        logs.append(MudParameterLog(
+            well_id=well_id, measurement_time=from_microseconds(moment), **fields,
+        ))
+    return logs
+
+
+def archived_logs(well_ids=None, time_from=None, time_to=None, is_out_of_norm=None) -> list:
+    """Замеры из архивов скважин well_ids (None — всех) с теми же фильтрами, что у истории."""
+    logs = []
+    for archive, columns in iter_archives(well_ids, time_from, time_to):
+        mask = np.ones(len(columns['id']), dtype=bool)
+        if time_from:
+            mask &= columns['measurement_time'] >= to_microseconds(time_from)
+        if time_to:
+            mask &= columns['measurement_time'] <= to_microseconds(time_to)
+        if is_out_of_norm is not None:
+            mask &= columns['is_out_of_norm'] == is_out_of_norm
+        logs += _to_logs(archive.well_id, columns, np.flatnonzero(mask))
+    return logs
+
+
+class ArchivedLogs:
+    """
+    Архивные замеры скважины для курсорной пагинации (pagination.MergedRows):
+    страница берется прямо из колонок — архив уже отсортирован по
+    (measurement_time, id), поэтому границы периода и курсор находятся
+    бинарным поиском, а объекты создаются только для строк страницы.
+    """
+    ORDER_FIELDS = ('measurement_time', 'id')
+    # По сколько строк просматривается флаг is_out_of_norm
+    SCAN_CHUNK_SIZE = 4096
+
+    def __init__(self, well_id: int, time_from=None, time_to=None, is_out_of_norm=None):
+        self.well_id = well_id
+        self.time_from = time_from
+        self.time_to = time_to
+        self.is_out_of_norm = is_out_of_norm
+
+    def page(self, ordering, values, limit: int) -> list:
+        """
+        До limit замеров строго после ключа values (None — с начала) в порядке
+        ordering: ('-measurement_time', '-id') или ('measurement_time', 'id').
+        Некорректный курсор — ValueError/TypeError.
+        """
+        if tuple(field.lstrip('-') for field in ordering) != self.ORDER_FIELDS:
+            raise ValueError(f"Архив сортируется только по {self.ORDER_FIELDS}, а не по {ordering}")
+        descending = ordering[0].startswith('-')
+        cursor = None
+        if values is not None:
+            moment, log_id = values
+            if isinstance(moment, str):
+                moment = datetime.fromisoformat(moment)
+            cursor = (to_microseconds(moment), int(log_id))
+
+        pages = []
+        for archive, columns in iter_archives([self.well_id], self.time_from, self.time_to):
+            selected = self._select(columns, cursor, descending, limit)
+            pages.append(list(zip(
+                columns['measurement_time'][selected].tolist(), columns['id'][selected].tolist(),
+                _to_logs(self.well_id, columns, selected),
+            )))
+        # Архивы скважины могут пересекаться по времени — сливаем уже отсортированные куски
+        rows = heapq.merge(*pages, key=lambda row: row[:2], reverse=descending)
+        return [log_entry for _, _, log_entry in itertools.islice(rows, limit)]
+
+    def _select(self, columns: dict, cursor, descending: bool, limit: int):
+        """Индексы строк страницы в одном архиве, в порядке выдачи."""
+        times, ids = columns['measurement_time'], columns['id']
+        start, end = 0, len(times)
+        if self.time_from:
+            start = int(np.searchsorted(times, to_microseconds(self.time_from), 'left'))
+        if self.time_to:
+            end = int(np.searchsorted(times, to_microseconds(self.time_to), 'right'))
+        if cursor is not None:
+            moment, log_id = cursor
+            same_time = slice(
+                int(np.searchsorted(times, moment, 'left')), int(np.searchsorted(times, moment, 'right')),
+            )
+            # Внутри одного времени строки упорядочены по id
+            if descending:
+                end = min(end, same_time.start + int(np.searchsorted(ids[same_time], log_id, 'left')))
+            else:
+                start = max(start, same_time.start + int(np.searchsorted(ids[same_time], log_id, 'right')))
+        if start >= end:
+            return np.empty(0, dtype=np.int64)
+        if self.is_out_of_norm is None:
+            if descending:
+                return np.arange(end - 1, max(start, end - limit) - 1, -1)
+            return np.arange(start, min(end, start + limit))
+
+        flags = columns['is_out_of_norm']
+        found, count = [], 0
+        chunks = range(end, start, -self.SCAN_CHUNK_SIZE) if descending else range(start, end, self.SCAN_CHUNK_SIZE)
+        for edge in chunks:
+            low, high = (max(start, edge - self.SCAN_CHUNK_SIZE), edge) if descending else (
+                edge, min(end, edge + self.SCAN_CHUNK_SIZE),
+            )
+            matched = np.flatnonzero(flags[low:high] == self.is_out_of_norm) + low
+            if descending:
+                matched = matched[::-1]
+            found.append(matched[:limit - count])
+            count += len(found[-1])
+            if count >= limit:
+                break
+        return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+
+def find_archived_log(well_id: int, log_id: int) -> MudParameterLog | None:
+    archives = MudLogArchive.objects.filter(well_id=well_id, min_log_id__lte=log_id, max_log_id__gte=log_id)
+    for archive in archives:
+        columns = load_archive(archive)
+        found = np.flatnonzero(columns['id'] == log_id)
+        if len(found):
+            return _to_logs(well_id, columns, found)[0]
+    return None
+
+
+# --- Архивация ---
+
+def _delete_logs(ids: list):
+    """
+    Удаляет замеры без сигналов post_delete: иначе сводки (rollups) пересобрались
+    бы без этих замеров, а они должны остаться — архивные замеры в них учтены.
+    Ссылки обработанных и полученных сводок обнуляем сами (on_delete=SET_NULL
+    делает Django только при обычном delete()).
+    """
+    for start in range(0, len(ids), DELETE_CHUNK_SIZE):
+        chunk = ids[start:start + DELETE_CHUNK_SIZE]
+        ProcessedSummary.objects.filter(mud_log_id__in=chunk).update(mud_log=None)
+        ReceivedSummary.objects.filter(mud_log_id__in=chunk).update(mud_log=None)
+        logs = MudParameterLog.objects.filter(pk__in=chunk)
+        logs._raw_delete(logs.db)
+
+
+def archive_well_logs(well: Well, cutoff) -> MudLogArchive | None:
+    """Выгружает в архив замеры скважины старше cutoff и удаляет их из БД."""
+    rows = list(
+        MudParameterLog.objects.filter(well=well, measurement_time__lt=cutoff)
+        .order_by('measurement_time', 'id')
+        .values_list(*ARCHIVE_FIELDS)
+    )
+    if not rows:
+        return None
+
+    content = _encode(rows)
+    ids = [row[0] for row in rows]
+    # Файл пишется до удаления строк и перечитывается: удаляем только то, что точно в архиве
+    if len(_decode(content)['id']) != len(ids):
+        raise RuntimeError(f"Архив скважины {well.pk} собран с ошибкой")
+    storage = archive_storage()
+    name = storage.save(f"well_{well.pk}/{rows[0][1]:%Y%m%d}-{rows[-1][1]:%Y%m%d}.npz", ContentFile(content))
+    try:
+        with transaction.atomic():
+            archive = MudLogArchive.objects.create(
+                well=well, file=name, log_count=len(rows),
+                time_from=rows[0][1], time_to=rows[-1][1],
+                min_log_id=min(ids), max_log_id=max(ids),
+                sha256=hashlib.sha256(content).hexdigest(),
+            )
+            _delete_logs(ids)
+    except Exception:
+        storage.delete(name)
+        raise
+    invalidate_trend_buffer(well.pk)
+    logger.info(f"Скважина {well.pk}: {len(rows)} замеров в архиве {name} ({len(content)} байт)")
+    return archive
+
+
+def archive_mud_logs(well_ids=None, cutoff=None, dry_run: bool = False) -> dict:
+    """Архивирует замеры неактивных скважин старше cutoff. Возвращает статистику."""
+    cutoff = cutoff or archive_cutoff()
+    wells = Well.objects.filter(is_active=False)
+    if well_ids is not None:
+        wells = wells.filter(pk__in=list(well_ids))
+    wells = wells.filter(Exists(MudParameterLog.objects.filter(well=OuterRef('pk'), measurement_time__lt=cutoff)))
+
+    stats = {'wells': 0, 'logs': 0, 'bytes': 0}
+    for well in wells.order_by('pk'):
+        if dry_run:
+            stats['wells'] += 1
+            stats['logs'] += MudParameterLog.objects.filter(well=well, measurement_time__lt=cutoff).count()
+            continue
+        archive = archive_well_logs(well, cutoff)
+        if archive:
+            stats['wells'] += 1
+            stats['logs'] += archive.log_count
+            stats['bytes'] += archive_storage().size(archive.file)
+    return stats
+
+
+def delete_archive_file(name: str):
+    try:
+        archive_storage().delete(name)
+    except OSError:
+        logger.warning(f"Не удалось удалить файл архива {name}")
@@ -0,0 +1,118 @@
+# backend/wells/changes.py
+"""
+Синхронизация изменений: /api/changes/?since=<курсор>.
+
+Настенные экраны держат списки целиком в памяти, поэтому им нужны только
+строки, изменившиеся с прошлого раза. Курсор — непрозрачная строка с
+моментом прошлой выборки; изменения ищутся по индексированным updated_at,
+удаления — по журналу Tombstone. Без since (или со слишком старым курсором,
+чьи удаления уже вычищены из журнала) отдается полный снимок с "reset": true.
+
+Курсор отстает от текущего времени на CHANGES_SAFETY_WINDOW секунд:
+updated_at проставляется до коммита, и строка из еще не закоммиченной
+транзакции могла бы оказаться позади курсора и потеряться. Поэтому строка,
+изменившаяся за последние секунды, может прийти дважды — клиент просто
+заменяет ее по id.
+
+Сортировку списков клиент делает сам (как в /api/dashboard/).
+"""
+import json
+import base64
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import serializers
+from .models import Well, NVPIncident, Task, Tombstone
+from .serializers import WellListSerializer, NVPIncidentSerializer, TaskSerializer, TenderSerializer
+from .dashboard import tender_list_queryset
+
+COLLECTIONS = ('wells', 'nvp_incidents', 'tasks', 'tenders')
+KIND_BY_COLLECTION = {
+    'wells': Tombstone.Kind.WELL,
+    'nvp_incidents': Tombstone.Kind.NVP_INCIDENT,
+    'tasks': Tombstone.Kind.TASK,
+    'tenders': Tombstone.Kind.TENDER,
+}
+
+
+class NVPIncidentChangeSerializer(NVPIncidentSerializer):
+    """НВП в ленте изменений: клиенту нужно знать, к какой скважине он относится."""
+    class Meta(NVPIncidentSerializer.Meta):
+        fields = NVPIncidentSerializer.Meta.fields + ['well', 'updated_at']
+
+
+def tombstone_retention() -> timedelta:
+    return timedelta(days=getattr(settings, 'CHANGES_TOMBSTONE_DAYS', 30))
+
+
+def encode_cursor(moment: datetime) -> str:
+    data = json.dumps({'t': moment.isoformat()}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(encoded: str) -> datetime:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)))
+        moment = datetime.fromisoformat(data['t'])
+    except (ValueError, KeyError, TypeError):
+        raise serializers.ValidationError({'since': ["Неверный курсор."]})
+    if timezone.is_naive(moment):
+        raise serializers.ValidationError({'since': ["Неверный курсор."]})
+    return moment
+
+
+def _tombstones(since) -> tuple:
+    """{коллекция: [id удаленных]} и id скважин, у которых удаляли НВП — одним запросом."""
+    deleted = {name: [] for name in COLLECTIONS}
+    collection_by_kind = {kind: name for name, kind in KIND_BY_COLLECTION.items()}
+    nvp_wells = set()
+    rows = Tombstone.objects.filter(deleted_at__gt=since).values_list('kind', 'object_id', 'well_id')
+    for kind, object_id, well_id in rows:
+        deleted[collection_by_kind[kind]].append(object_id)
+        if kind == Tombstone.Kind.NVP_INCIDENT and well_id is not None:
+            nvp_wells.add(well_id)
+    return deleted, nvp_wells
+
+
+def build_changes(since=None) -> dict:
+    """
+    Изменения после момента since (None — полный снимок).
+    {"cursor", "reset", <коллекция>: {"changed": [...], "deleted": [id, ...]}}
+    """
+    now = timezone.now()
+    cursor = now - timedelta(seconds=getattr(settings, 'CHANGES_SAFETY_WINDOW', 5))
+    reset = since is None or since < now - tombstone_retention()
+
+    if reset:
+        deleted = {name: [] for name in COLLECTIONS}
+        wells = Well.objects.all()
+        nvp_incidents = NVPIncident.objects.all()
+        tasks = Task.objects.filter(is_completed=False)
+        tenders = tender_list_queryset()
+    else:
+        deleted, nvp_wells = _tombstones(since)
+        # В карточке скважины есть счетчик НВП — она меняется и вместе с ее НВП
+        changed_nvp_wells = NVPIncident.objects.filter(updated_at__gt=since).values('well_id')
+        wells = Well.objects.filter(
+            Q(updated_at__gt=since) | Q(pk__in=changed_nvp_wells) | Q(pk__in=nvp_wells)
+        )
+        nvp_incidents = NVPIncident.objects.filter(updated_at__gt=since)
+        # Выполненная задача пропадает из списка — для клиента это удаление
+        tasks = list(Task.objects.filter(updated_at__gt=since))
+        deleted['tasks'] += [task.pk for task in tasks if task.is_completed]
+        tasks = [task for task in tasks if not task.is_completed]
+        tenders = tender_list_queryset().filter(updated_at__gt=since)
+
+    wells = WellListSerializer().optimize_queryset(wells.order_by('id'))
+    return {
+        'cursor': encode_cursor(cursor),
+        'reset': reset,
+        'wells': {'changed': WellListSerializer(wells, many=True).data, 'deleted': deleted['wells']},
+        'nvp_incidents': {
+            'changed': NVPIncidentChangeSerializer(nvp_incidents, many=True).data,
+            'deleted': deleted['nvp_incidents'],
+        },
+        'tasks': {'changed': TaskSerializer(tasks, many=True).data, 'deleted': deleted['tasks']},
+        'tenders': {'changed': TenderSerializer(tenders, many=True).data, 'deleted': deleted['tenders']},
+    }
@@ -0,0 +1,50 @@
+# backend/wells/conditional.py
+"""
+Условный GET (ETag / Last-Modified) для списков дашборда.
+
+Валидатор считается одним агрегирующим запросом (Max('updated_at'), Count
+и т.п. — см. get_validator_aggregates у вьюсета), без выборки строк и без
+сериализации. Если клиент прислал If-None-Match / If-Modified-Since и данные
+не менялись — сразу отвечаем 304.
+
+Count нужен, чтобы заметить удаление строки: Max('updated_at') от него не меняется.
+"""
+import hashlib
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+
+class ConditionalListMixin:
+    # Поля агрегата, которые являются временем изменения (из них берется Last-Modified)
+    last_modified_aggregates = ('updated_at',)
+
+    def get_validator_queryset(self):
+        raise NotImplementedError
+
+    def get_validator_aggregates(self) -> dict:
+        raise NotImplementedError
+
+    def get_list_validators(self, request):
+        aggregates = self.get_validator_queryset().order_by().aggregate(**self.get_validator_aggregates())
+        # В ETag входят и параметры запроса (cursor, fields, ...) и формат ответа
+        source = "|".join([
+            request.get_full_path(),
+            request.META.get('HTTP_ACCEPT', ''),
+            *(f"{key}={aggregates[key]}" for key in sorted(aggregates)),
+        ])
+        etag = f'"{hashlib.sha1(source.encode()).hexdigest()}"'
+        times = [aggregates[key] for key in self.last_modified_aggregates if aggregates.get(key)]
+        last_modified = int(max(times).timestamp()) if times else None
+        return etag, last_modified
+
+    def list(self, request, *args, **kwargs):
+        etag, last_modified = self.get_list_validators(request)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        # Браузер хранит ответ, но каждый раз перепроверяет его по ETag
+        patch_cache_control(response, no_cache=True)
+        return response
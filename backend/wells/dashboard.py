@@ -0,0 +1,140 @@
+# backend/wells/dashboard.py
+"""
+Сводный ответ главной страницы: скважины, задачи и тендеры одним запросом.
+
+Каждая секция сериализуется один раз и лежит в кэше 'api' (см.
+response_cache.py) под поколением своей группы — сигналы моделей сбрасывают
+ровно ту секцию, данные которой поменялись. Версия секции — хэш ее JSON,
+общая версия — версии секций через точку. Клиент присылает ?version=
+с прошлого ответа, и неизменившиеся секции не передаются вовсе.
+
+Холодная сборка — по одному запросу на секцию, теплая — без запросов к БД:
+ответ склеивается из уже готовых байтов секций.
+"""
+import gzip
+import hashlib
+from django.conf import settings
+from django.db.models import F, Case, When, Value, BooleanField
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from datetime import datetime, timezone as dt_timezone
+from .models import Well, Task, Tender
+from .serializers import WellListSerializer, TaskSerializer, TenderSerializer
+from .response_cache import cache_generations, response_cache
+from .metrics import TimedJSONRenderer
+
+SECTIONS = ('wells', 'tasks', 'tenders')
+
+
+def tender_list_queryset():
+    """
+    Тендеры, отсортированные по следующей логике:
+    1. Сначала "Активные" тендеры (у которых есть дедлайн в будущем).
+       - Внутри этой группы сортируем по дедлайну (от ближайшего к дальнему).
+    2. Затем все остальные ("Неактивные").
+       - Внутри этой группы сортируем по дате обновления (от нового к старому).
+    """
+    now = timezone.now()
+
+    return Tender.objects.annotate(
+        # Создаем флаг "Активный"
+        is_active=Case(
+            When(deadline__isnull=False, deadline__gt=now, then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField()
+        ),
+        deadline_sort=Coalesce('deadline', Value(datetime.max.replace(tzinfo=dt_timezone.utc))),
+    ).order_by(
+        F('is_active').desc(), # Сначала активные (True > False при сортировке по убыванию)
+        F('deadline').asc(nulls_last=True), # Затем по дедлайну (ближайшие сначала)
+        F('updated_at').desc(), # В самом конце - по дате обновления
+        '-id',
+    )
+
+
+def seconds_until_next_deadline(deadlines, default: int) -> int:
+    """Сколько можно кэшировать список тендеров: до ближайшего будущего дедлайна."""
+    now = timezone.now()
+    upcoming = [deadline for deadline in deadlines if deadline is not None and deadline > now]
+    if not upcoming:
+        return default
+    return min(default, max(int((min(upcoming) - now).total_seconds()), 1))
+
+
+# --- Сборка секций (по одному запросу на секцию) ---
+
+def _build_wells(ttl):
+    queryset = Well.objects.order_by(F('is_active').desc(), F('updated_at').desc(), '-id')
+    queryset = WellListSerializer().optimize_queryset(queryset)
+    return WellListSerializer(queryset, many=True).data, ttl
+
+
+def _build_tasks(ttl):
+    queryset = Task.objects.filter(is_completed=False).order_by('deadline', 'id')
+    return TaskSerializer(queryset, many=True).data, ttl
+
+
+def _build_tenders(ttl):
+    tenders = list(tender_list_queryset())
+    return TenderSerializer(tenders, many=True).data, seconds_until_next_deadline((t.deadline for t in tenders), ttl)
+
+
+_BUILDERS = {
+    'wells': _build_wells,
+    'tasks': _build_tasks,
+    'tenders': _build_tenders,
+}
+
+
+def _section_key(name: str, generation: str) -> str:
+    return f"api:dashboard:{name}:{generation}"
+
+
+def get_dashboard_sections() -> dict:
+    """
+    {секция: {'version': ..., 'body': gzip(JSON)}} — из кэша или собранные заново.
+    """
+    cache = response_cache()
+    generations = cache_generations(SECTIONS)
+    keys = {name: _section_key(name, generations[name]) for name in SECTIONS}
+    cached = cache.get_many(list(keys.values()))
+    ttl = getattr(settings, 'API_CACHE_TTL', 300)
+
+    sections = {}
+    for name in SECTIONS:
+        entry = cached.get(keys[name])
+        if entry is None:
+            data, timeout = _BUILDERS[name](ttl)
+            body = TimedJSONRenderer().render(data)
+            entry = {
+                'version': hashlib.sha1(body).hexdigest()[:16],
+                'body': gzip.compress(body, compresslevel=6),
+            }
+            cache.set(keys[name], entry, timeout=timeout)
+        sections[name] = entry
+    return sections
+
+
+def parse_version(token) -> dict:
+    """'<wells>.<tasks>.<tenders>' -> {секция: версия}; мусор — как будто версии нет."""
+    parts = (token or '').strip('"').split('.')
+    if len(parts) != len(SECTIONS):
+        return {}
+    return dict(zip(SECTIONS, parts))
+
+
+def render_dashboard(sections: dict, client_versions: dict) -> tuple:
+    """
+    Склеивает ответ из готовых байтов секций: (версия, тело JSON).
+    Секции, версия которых совпала с клиентской, перечислены в "unchanged" и не передаются.
+    """
+    version = '.'.join(sections[name]['version'] for name in SECTIONS)
+    unchanged = [name for name in SECTIONS if client_versions.get(name) == sections[name]['version']]
+    parts = [
+        b'"version":' + TimedJSONRenderer().render(version),
+        b'"unchanged":' + TimedJSONRenderer().render(unchanged),
+    ]
+    for name in SECTIONS:
+        if name not in unchanged:
+            parts.append(f'"{name}":'.encode() + gzip.decompress(sections[name]['body']))
+    return version, b'{' + b','.join(parts) + b'}'
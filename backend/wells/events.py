@@ -0,0 +1,198 @@
+# backend/wells/events.py
+"""
+Живые обновления дашборда (Server-Sent Events).
+
+process_summary (и пакетная запись сводок) после коммита транзакции
+публикует маленькое событие: "скважина обновлена" / "добавлен замер".
+Браузер держит одно соединение /api/events/ и по событию дозапрашивает
+/api/dashboard/?version=... — приходят только изменившиеся секции.
+
+Доставка:
+- в пределах процесса — Broadcaster: у каждого подписчика своя asyncio.Queue,
+  публикация из любого потока кладет событие в нее через call_soon_threadsafe;
+- между процессами (воркеры web, events, run_jobs) — при EVENTS_PG_NOTIFY=1
+  (по умолчанию) событие уходит через pg_notify, а поток-слушатель в каждом
+  процессе с подписчиками (LISTEN) раздает его своему Broadcaster. В этом режиме
+  локальная доставка идет тоже через Postgres, чтобы не было дублей.
+
+Поток SSE — долгоживущий асинхронный ответ, поэтому его отдает отдельный
+ASGI-процесс (config/asgi.py, events в Procfile). Остальной API остается на
+WSGI с потоками: синхронные view под ASGI держали бы соединение с БД на каждый
+запрос и делили бы пул потоков с потоками событий.
+"""
+import json
+import time
+import select
+import asyncio
+import logging
+import threading
+from django.conf import settings
+from django.db import connection, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+PG_CHANNEL = 'oil_dashboard_events'
+# Сколько событий ждет медленного клиента; при переполнении выбрасываются самые старые
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class _Subscriber:
+    __slots__ = ('loop', 'queue')
+
+    def __init__(self, loop, queue):
+        self.loop = loop
+        self.queue = queue
+
+
+def _put_dropping_oldest(queue: asyncio.Queue, event: dict):
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(event)
+
+
+class Broadcaster:
+    """Раздача событий подписчикам текущего процесса (потокобезопасно)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+
+    def subscribe(self) -> _Subscriber:
+        """Вызывается из корутины: очередь привязана к ее event loop."""
+        subscriber = _Subscriber(asyncio.get_running_loop(), asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE))
+        with self._lock:
+            self._subscribers.add(subscriber)
+        if pg_notify_enabled():
+            ensure_pg_listener()
+        return subscriber
+
+    def unsubscribe(self, subscriber: _Subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    @property
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, event: dict):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(_put_dropping_oldest, subscriber.queue, event)
+            except RuntimeError:
+                # event loop подписчика уже закрыт — соединение умерло
+                self.unsubscribe(subscriber)
+
+
+broadcaster = Broadcaster()
+
+
+def pg_notify_enabled() -> bool:
+    return bool(getattr(settings, 'EVENTS_PG_NOTIFY', False)) and connection.vendor == 'postgresql'
+
+
+def _deliver(event: dict):
+    if pg_notify_enabled():
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_notify(%s, %s)", [PG_CHANNEL, json.dumps(event, separators=(',', ':'))])
+            return
+        except Exception:
+            logger.exception("pg_notify не прошел, событие доставлено только в текущем процессе")
+    broadcaster.publish(event)
+
+
+def publish_event(event_type: str, **payload):
+    """
+    Публикует событие {'type': ..., ...} после коммита текущей транзакции
+    (откаченные изменения на экраны не попадают). payload — только JSON-значения.
+    """
+    event = {'type': event_type, **payload}
+    transaction.on_commit(lambda: _deliver(event))
+
+
+def publish_well_events(well, log_entries=()):
+    """События обработки сводок: скважина обновлена и по одному на каждый новый замер."""
+    publish_event('well', well_id=well.pk, name=well.name)
+    for log_entry in log_entries:
+        publish_event(
+            'mud_log', well_id=well.pk, mud_log_id=log_entry.pk,
+            is_out_of_norm=bool(log_entry.is_out_of_norm),
+        )
+
+
+# --- Postgres LISTEN: один поток на процесс, запускается с первым подписчиком ---
+
+_listener_lock = threading.Lock()
+_listener_thread = None
+
+
+def ensure_pg_listener():
+    global _listener_thread
+    with _listener_lock:
+        if _listener_thread is None or not _listener_thread.is_alive():
+            _listener_thread = threading.Thread(target=_listen_forever, name='events-pg-listener', daemon=True)
+            _listener_thread.start()
+
+
+def _listen_forever():
+    backoff = 1
+    while True:
+        wrapper = connections.create_connection('default')
+        try:
+            wrapper.connect()
+            wrapper.set_autocommit(True)
+            raw = wrapper.connection
+            with raw.cursor() as cursor:
+                cursor.execute(f"LISTEN {PG_CHANNEL}")
+            backoff = 1
+            while True:
+                # Таймаут — чтобы замечать оборванное соединение
+                if select.select([raw], [], [], 30) == ([], [], []):
+                    with raw.cursor() as cursor:
+                        cursor.execute("SELECT 1")
+                    continue
+                raw.poll()
+                while raw.notifies:
+                    notify = raw.notifies.pop(0)
+                    try:
+                        broadcaster.publish(json.loads(notify.payload))
+                    except ValueError:
+                        logger.warning("Некорректное событие из %s: %r", PG_CHANNEL, notify.payload)
+        except Exception:
+            logger.exception("Слушатель событий Postgres упал, переподключение через %s с", backoff)
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+        finally:
+            try:
+                wrapper.close()
+            except Exception:
+                pass
+
+
+# --- Формат SSE ---
+
+def format_sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False, separators=(',', ':'))}\n\n"
+
+
+async def event_stream(heartbeat: float, retry_ms: int = 3000):
+    """
+    Асинхронный генератор кадров SSE для одного клиента.
+    Комментарий-пинг раз в heartbeat секунд не дает прокси закрыть
+    простаивающее соединение и позволяет заметить ушедшего клиента.
+    """
+    subscriber = broadcaster.subscribe()
+    try:
+        yield f"retry: {retry_ms}\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            yield format_sse(event)
+    finally:
+        broadcaster.unsubscribe(subscriber)
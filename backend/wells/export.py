@@ -0,0 +1,272 @@
+# backend/wells/export.py
+"""
+Выгрузка истории замеров в CSV/XLSX потоком: /api/mud-logs/export/
+
+Строки читаются серверным курсором (.iterator(chunk_size=...)) и отдаются
+клиенту кусками по ROWS_PER_CHUNK строк по мере чтения. Выгрузка миллиона
+строк начинается сразу и занимает в памяти воркера один кусок, а не весь
+результат.
+
+XLSX собирается без сторонних библиотек: это zip с XML-листами, и
+zipfile умеет писать в поток без seek (размеры — в дескрипторах после
+данных). Лист Excel вмещает 1 048 576 строк, поэтому длинная выгрузка
+продолжается на следующих листах; список листов (workbook.xml)
+пишется в конце архива.
+
+Под ASGI (uvicorn) Django читает синхронный итератор ответа целиком
+в память, поэтому там отдается асинхронная обертка, забирающая куски
+по одному через sync_to_async.
+
+Замеры из архива (wells/archive.py) подмешиваются к строкам своей скважины.
+"""
+import io
+import csv
+import heapq
+import zipfile
+from datetime import datetime
+from itertools import groupby
+from operator import attrgetter
+from xml.sax.saxutils import escape
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+from .models import Well, MudParameterLog, MudLogArchive
+from .timeseries import TIMESERIES_PARAMS
+from .archive import archived_logs
+
+ITERATOR_CHUNK_SIZE = 2000
+ROWS_PER_CHUNK = 1000
+XLSX_MAX_ROWS = 1048576
+EXPORT_FORMATS = ('csv', 'xlsx')
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+EXPORT_PARAMS = TIMESERIES_PARAMS
+HEADERS = ["Скважина", "Время замера", "Глубина (м)", "Секция"] + [
+    str(MudParameterLog._meta.get_field(param).verbose_name) for param in EXPORT_PARAMS
+] + ["Вне нормы"]
+
+
+def export_queryset(well_id=None, time_from=None, time_to=None, is_out_of_norm=None):
+    """Замеры для выгрузки: по скважинам, внутри скважины — по времени (индекс mudlog_well_time_id_idx)."""
+    logs = MudParameterLog.objects.select_related('well').only('well__name', *(
+        field.name for field in MudParameterLog._meta.concrete_fields if field.name != 'raw_unparsed_params'
+    ))
+    if well_id is not None:
+        logs = logs.filter(well_id=well_id)
+    if time_from:
+        logs = logs.filter(measurement_time__gte=time_from)
+    if time_to:
+        logs = logs.filter(measurement_time__lte=time_to)
+    if is_out_of_norm is not None:
+        logs = logs.filter(is_out_of_norm=is_out_of_norm)
+    return logs.order_by('well_id', 'measurement_time', 'id')
+
+
+def iter_export_logs(well_id=None, time_from=None, time_to=None, is_out_of_norm=None):
+    """Замеры из БД серверным курсором, с архивными замерами на месте их скважины."""
+    filters = {'time_from': time_from, 'time_to': time_to, 'is_out_of_norm': is_out_of_norm}
+    archives = MudLogArchive.objects.all()
+    if well_id is not None:
+        archives = archives.filter(well_id=well_id)
+    pending = sorted(set(archives.values_list('well_id', flat=True)))
+    logs = export_queryset(well_id, **filters).iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+    if not pending:
+        yield from logs
+        return
+
+    wells = Well.objects.only('name').in_bulk(pending)
+    sort_key = attrgetter('measurement_time', 'id')
+
+    def archived_for(archived_well_id):
+        well_logs = archived_logs([archived_well_id], **filters)
+        for log_entry in well_logs:
+            log_entry.well = wells[archived_well_id]
+        return sorted(well_logs, key=sort_key)
+
+    for current_well_id, group in groupby(logs, key=attrgetter('well_id')):
+        while pending and pending[0] < current_well_id:
+            yield from archived_for(pending.pop(0))
+        if pending and pending[0] == current_well_id:
+            yield from heapq.merge(archived_for(pending.pop(0)), group, key=sort_key)
+        else:
+            yield from group
+    for archived_well_id in pending:
+        yield from archived_for(archived_well_id)
+
+
+def _local(moment) -> datetime:
+    return timezone.localtime(moment).replace(tzinfo=None)
+
+
+# --- CSV ---
+
+def iter_csv(logs):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff') # BOM: Excel иначе откроет UTF-8 как cp1251
+    writer.writerow(HEADERS)
+    for number, log_entry in enumerate(logs, 1):
+        writer.writerow([
+            log_entry.well.name,
+            f"{_local(log_entry.measurement_time):%Y-%m-%d %H:%M:%S}",
+            log_entry.depth,
+            log_entry.get_section_display() if log_entry.section else None,
+            *(getattr(log_entry, param) for param in EXPORT_PARAMS),
+            "да" if log_entry.is_out_of_norm else "нет",
+        ])
+        if number % ROWS_PER_CHUNK == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+# --- XLSX ---
+
+_NS = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+_REL_NS = 'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"'
+_XML = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+_STYLES = (
+    f'{_XML}<styleSheet {_NS}>'
+    '<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm:ss"/></numFmts>'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="3">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+    '</cellXfs><cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles></styleSheet>'
+)
+_EXCEL_EPOCH = datetime(1899, 12, 30)
+
+
+def _text_cell(value, style: int = 0) -> str:
+    if value is None:
+        return '<c/>'
+    style_attr = f' s="{style}"' if style else ''
+    return f'<c t="inlineStr"{style_attr}><is><t>{escape(str(value))}</t></is></c>'
+
+
+def _number_cell(value) -> str:
+    return '<c/>' if value is None else f'<c><v>{value!r}</v></c>'
+
+
+def _xlsx_row(log_entry) -> str:
+    serial = (_local(log_entry.measurement_time) - _EXCEL_EPOCH).total_seconds() / 86400
+    cells = [
+        _text_cell(log_entry.well.name),
+        f'<c s="1"><v>{serial!r}</v></c>',
+        _number_cell(log_entry.depth),
+        _text_cell(log_entry.get_section_display() if log_entry.section else None),
+        *(_number_cell(getattr(log_entry, param)) for param in EXPORT_PARAMS),
+        f'<c t="b"><v>{int(bool(log_entry.is_out_of_norm))}</v></c>',
+    ]
+    return f'<row>{"".join(cells)}</row>'
+
+
+class _StreamSink(io.RawIOBase):
+    """Файл без seek для zipfile: записанное забирается кусками через drain()."""
+
+    def __init__(self):
+        self._parts = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def iter_xlsx(logs):
+    sink = _StreamSink()
+    archive = zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED)
+    header = '<row>' + ''.join(_text_cell(title, style=2) for title in HEADERS) + '</row>'
+    sheet_count = 0
+    logs = iter(logs)
+    first = next(logs, None)
+
+    while sheet_count == 0 or first is not None:
+        sheet_count += 1
+        # размер листа заранее неизвестен — zip64 на случай больших выгрузок
+        with archive.open(f'xl/worksheets/sheet{sheet_count}.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(f'{_XML}<worksheet {_NS}><sheetData>{header}'.encode())
+            rows = []
+            written = 1
+            while first is not None and written < XLSX_MAX_ROWS:
+                rows.append(_xlsx_row(first))
+                written += 1
+                first = next(logs, None)
+                if len(rows) == ROWS_PER_CHUNK:
+                    sheet.write(''.join(rows).encode())
+                    rows = []
+                    yield sink.drain()
+            sheet.write((''.join(rows) + '</sheetData></worksheet>').encode())
+        yield sink.drain()
+
+    sheets = range(1, sheet_count + 1)
+    archive.writestr('[Content_Types].xml', (
+        f'{_XML}<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        + ''.join(
+            f'<Override PartName="/xl/worksheets/sheet{number}.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            for number in sheets
+        ) + '</Types>'
+    ))
+    archive.writestr('_rels/.rels', (
+        f'{_XML}<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/></Relationships>'
+    ))
+    archive.writestr('xl/workbook.xml', (
+        f'{_XML}<workbook {_NS} {_REL_NS}><sheets>'
+        + ''.join(f'<sheet name="Замеры {number}" sheetId="{number}" r:id="rId{number}"/>' for number in sheets)
+        + '</sheets></workbook>'
+    ))
+    archive.writestr('xl/_rels/workbook.xml.rels', (
+        f'{_XML}<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        + ''.join(
+            f'<Relationship Id="rId{number}" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+            f'Target="worksheets/sheet{number}.xml"/>'
+            for number in sheets
+        )
+        + f'<Relationship Id="rId{sheet_count + 1}" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+        '</Relationships>'
+    ))
+    archive.writestr('xl/styles.xml', _STYLES)
+    archive.close()
+    yield sink.drain()
+
+
+def iter_export(export_format: str, **filters):
+    logs = iter_export_logs(**filters)
+    return iter_csv(logs) if export_format == 'csv' else iter_xlsx(logs)
+
+
+async def as_async_iterator(chunks):
+    """Куски синхронного генератора по одному в потоке Django (для ASGI)."""
+    next_chunk = sync_to_async(next)
+    try:
+        while True:
+            chunk = await next_chunk(chunks, None)
+            if chunk is None:
+                break
+            yield chunk
+    finally:
+        # Клиент оборвал загрузку — закрываем генератор и серверный курсор
+        await sync_to_async(chunks.close)()
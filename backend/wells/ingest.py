@@ -0,0 +1,418 @@
+# backend/wells/ingest.py
+import copy
+import logging
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from .models import Well, MudParameterLog, ProcessedSummary, ReceivedSummary, Job
+from .jobs import build_job
+from .parser import parse_summary, extract_mud_parameters, summary_fingerprint
+from .validator import validate_mud_parameters, update_well_section_by_depth
+from .norm_index import warm_norm_indexes
+from .rules_engine import run_all_rules
+from .notifications import send_telegram_alert
+from .response_cache import invalidate_response_cache
+from .events import publish_well_events
+from .metrics import stage_timer
+from .rollups import add_logs_to_rollups
+from .summary_history import summary_entry, save_unrecognized_summaries
+from .serializers import SummaryItemSerializer
+
+logger = logging.getLogger(__name__)
+
+# Ограничение на размер одного пакета сводок
+MAX_SUMMARIES_PER_BATCH = 500
+
+
+def find_processed_summaries(content_hashes) -> dict:
+    """
+    Ищет уже обработанные сводки по отпечаткам одним запросом.
+    Возвращает {content_hash: ProcessedSummary}.
+    """
+    processed = ProcessedSummary.objects.filter(content_hash__in=list(content_hashes)).select_related('well')
+    return {record.content_hash: record for record in processed}
+
+
+def duplicate_result(index, record: ProcessedSummary) -> dict:
+    """Результат для сводки, которая уже была обработана раньше."""
+    return {
+        'index': index,
+        'status': 'duplicate',
+        'well_id': record.well_id,
+        'well_name': record.well.name,
+        'mud_log_id': record.mud_log_id,
+    }
+
+
+def apply_summary_to_well(well: Well, parsed_data: dict, telegram_chat_id=None, telegram_topic_id=None) -> list:
+    """
+    Переносит данные сводки в объект скважины.
+    Ничего не сохраняет! Возвращает список измененных полей.
+    """
+    fields_to_update = []
+
+    # Обновляем поля из парсера
+    for key, value in parsed_data.items():
+        if key != 'name' and hasattr(well, key):
+            setattr(well, key, value)
+            fields_to_update.append(key)
+
+    # Логика авто-привязки
+    if telegram_chat_id and not well.telegram_chat_id:
+        well.telegram_chat_id = telegram_chat_id
+        well.telegram_topic_id = telegram_topic_id
+        fields_to_update.extend(['telegram_chat_id', 'telegram_topic_id'])
+
+    # Логика авто-обновления секции
+    current_depth_from_parser = parsed_data.get('current_depth')
+    if current_depth_from_parser is not None:
+        new_section = update_well_section_by_depth(well, current_depth_from_parser)
+        if new_section:
+            well.current_section = new_section
+            fields_to_update.append('current_section')
+
+    if fields_to_update:
+        # bulk_update и save(update_fields=...) не трогают auto_now сами,
+        # а по updated_at дашборд понимает, что данные изменились (ETag, сортировка)
+        well.updated_at = timezone.now()
+        fields_to_update.append('updated_at')
+
+    return list(dict.fromkeys(fields_to_update)) # убираем дубликаты, сохраняя порядок
+
+
+def build_mud_log(well: Well, parsed_data: dict, parsed_mud_params: dict) -> MudParameterLog:
+    """
+    Валидирует параметры раствора и создает (не сохраняя) запись лога.
+    """
+    current_depth = parsed_data.get('current_depth', well.current_depth)
+    with stage_timer('validate'):
+        has_deviation = validate_mud_parameters(well, parsed_mud_params, current_depth)
+    parsed_mud_params['is_out_of_norm'] = has_deviation
+    return MudParameterLog(well=well, depth=current_depth, section=well.current_section, **parsed_mud_params)
+
+
+def build_alert_message(well: Well, alerts_dict: dict) -> str | None:
+    """
+    Собирает текст оповещения из тревог движка правил. Если тревог нет — None.
+    """
+    if not (alerts_dict['critical'] or alerts_dict['warning']):
+        return None
+
+    header = f"🔔 <b>Оповещение {well.name}</b>\n\n"
+
+    message_parts = []
+    if alerts_dict['warning']:
+        message_parts.extend(alerts_dict['warning'])
+    if alerts_dict['critical']:
+        message_parts.extend(alerts_dict['critical'])
+
+    return header + "\n\n".join(message_parts)
+
+
+def notify_alerts(well: Well, alerts_dict: dict, raise_on_error: bool = False):
+    """
+    Отправляет оповещение в Telegram, если движок правил нашел тревоги.
+    """
+    full_message = build_alert_message(well, alerts_dict)
+    if full_message is None:
+        logger.info("Движок правил сработал, но не сгенерировал текста для тревог. Уведомление не отправлено.")
+        return
+
+    # AI-анализ (get_ai_analysis) пока отключен
+
+    logger.info("--- ГОТОВИМСЯ ОТПРАВИТЬ В TELEGRAM ---")
+    logger.info(repr(full_message))
+    logger.info("-------------------------------------")
+    send_telegram_alert(well, full_message, raise_on_error=raise_on_error)
+
+
+def post_processing_job(log_entry: MudParameterLog):
+    """
+    Создает (не сохраняя) задачу на правила и уведомление для нового лога.
+    В задачу кладется состояние скважины на момент сводки: к моменту
+    выполнения скважина может уже уйти глубже.
+    """
+    return build_job('process_mud_log', {
+        'mud_log_id': log_entry.pk,
+        'current_depth': log_entry.well.current_depth,
+        'current_section': log_entry.well.current_section,
+    })
+
+
+def post_process_mud_log(payload: dict):
+    """
+    Обработчик фоновой задачи 'process_mud_log': движок правил и уведомление в Telegram.
+    Ошибка отправки пробрасывается, чтобы очередь повторила задачу.
+    """
+    try:
+        log_entry = MudParameterLog.objects.select_related('well').get(pk=payload['mud_log_id'])
+    except MudParameterLog.DoesNotExist:
+        logger.warning(f"Лог параметров {payload['mud_log_id']} уже удален. Задача пропущена.")
+        return
+
+    well = log_entry.well
+    well.current_depth = payload.get('current_depth', well.current_depth)
+    well.current_section = payload.get('current_section', well.current_section)
+
+    with stage_timer('rules'):
+        alerts_dict = run_all_rules(log_entry)
+    with stage_timer('notify'):
+        notify_alerts(well, alerts_dict, raise_on_error=True)
+
+
+def save_parsed_summaries(
+    parsed_items: list, update_wells: bool = True, enqueue_post_processing: bool = False, unrecognized=(),
+) -> dict:
+    """
+    Записывает пакет уже разобранных сводок.
+
+    parsed_items — список кортежей (index, item, parsed_data, parsed_mud_params),
+    где item — исходный словарь (chat_id, topic_id, необязательные
+    measurement_time и content_hash). Для сводок с content_hash в той же
+    транзакции сохраняется ProcessedSummary; если отпечаток уже занят
+    параллельным запросом, уникальный индекс откатит весь пакет (IntegrityError) —
+    повтор без занятых сводок делает save_unprocessed_summaries.
+    enqueue_post_processing=True — в той же транзакции ставит в очередь
+    задачи на правила и уведомления для созданных логов.
+    unrecognized — записи истории без скважины (summary_entry), пишутся в той же
+    транзакции через save_unrecognized_summaries.
+    Одним пакетом находит/создает скважины, подгружает их нормы и в одной
+    транзакции записывает обновления скважин (bulk_update), логи параметров
+    (bulk_create) и историю сводок (ReceivedSummary; measurement_time из item
+    становится временем получения). Число запросов к БД не зависит от
+    количества сводок.
+
+    Возвращает {index: результат}; в результате лежит созданный log_entry (или None)
+    и, если задачи ставились в очередь, job_id.
+    """
+    results = {}
+    if not parsed_items:
+        if unrecognized:
+            save_unrecognized_summaries(unrecognized)
+        return results
+
+    names = {parsed_data['name'] for _, _, parsed_data, _ in parsed_items}
+    wells_to_update = {}
+    update_fields = set()
+    logs = []
+    measurement_times = []
+    processed = []
+    history = []
+
+    with transaction.atomic():
+        save_unrecognized_summaries(unrecognized)
+
+        # --- Находим или создаем все скважины разом ---
+        existing_names = set(Well.objects.filter(name__in=names).values_list('name', flat=True))
+        new_names = names - existing_names
+        new_wells_created = bool(new_names)
+        if new_names:
+            Well.objects.bulk_create([Well(name=name) for name in sorted(new_names)])
+
+        wells_by_name = {}
+        wells = list(Well.objects.filter(name__in=names).order_by('pk'))
+        for well in wells:
+            wells_by_name.setdefault(well.name, well) # при дублях имени берем первую
+        warm_norm_indexes(wells_by_name.values())
+
+        # --- Применяем сводки по порядку, как при одиночной обработке ---
+        for index, item, parsed_data, parsed_mud_params in parsed_items:
+            well = wells_by_name[parsed_data['name']]
+            if update_wells:
+                fields = apply_summary_to_well(well, parsed_data, item.get('chat_id'), item.get('topic_id'))
+                if fields:
+                    wells_to_update[well.pk] = well
+                    update_fields.update(fields)
+
+            log_entry = None
+            if parsed_mud_params:
+                # Правила смотрят на состояние скважины на момент ЭТОЙ сводки,
+                # поэтому лог получает снимок скважины
+                log_entry = build_mud_log(copy.copy(well), parsed_data, parsed_mud_params)
+                logs.append(log_entry)
+                if item.get('measurement_time'):
+                    measurement_times.append((log_entry, item['measurement_time']))
+            if item.get('content_hash'):
+                processed.append((item['content_hash'], well, log_entry))
+            if parsed_data.get('summary_text'):
+                history.append((parsed_data['summary_text'], item, well, log_entry))
+
+            results[index] = {
+                'index': index,
+                'status': 'ok',
+                'well_id': well.pk,
+                'well_name': well.name,
+                'created': well.name in new_names,
+                'log_entry': log_entry,
+            }
+            new_names.discard(well.name)
+
+        # --- Пакетная запись ---
+        if wells_to_update:
+            Well.objects.bulk_update(list(wells_to_update.values()), sorted(update_fields))
+        if wells_to_update or new_wells_created:
+            # bulk_create/bulk_update не шлют сигналы — сбрасываем кэш списков сами (после коммита)
+            invalidate_response_cache('wells')
+        if logs:
+            MudParameterLog.objects.bulk_create(logs)
+        if measurement_times:
+            # auto_now_add перезаписывает время при вставке, поэтому
+            # историческое время замера проставляем отдельным bulk_update
+            for log_entry, measurement_time in measurement_times:
+                log_entry.measurement_time = measurement_time
+            MudParameterLog.objects.bulk_update([log for log, _ in measurement_times], ['measurement_time'])
+        if logs:
+            add_logs_to_rollups(logs)
+        if processed:
+            ProcessedSummary.objects.bulk_create([
+                ProcessedSummary(content_hash=content_hash, well=well, mud_log=log_entry)
+                for content_hash, well, log_entry in processed
+            ])
+        if history:
+            ReceivedSummary.objects.bulk_create([
+                summary_entry(
+                    text, well=well, mud_log=log_entry,
+                    content_hash=item.get('content_hash'), received_at=item.get('measurement_time'),
+                )
+                for text, item, well, log_entry in history
+            ])
+        if enqueue_post_processing and logs:
+            jobs = Job.objects.bulk_create([post_processing_job(log_entry) for log_entry in logs])
+            job_ids = {id(log_entry): job.pk for log_entry, job in zip(logs, jobs)}
+            for result in results.values():
+                if result['log_entry'] is not None:
+                    result['job_id'] = job_ids[id(result['log_entry'])]
+
+        # События для экранов (SSE) — после коммита, по одному "well" на скважину
+        logs_by_well = {}
+        for result in results.values():
+            well_logs = logs_by_well.setdefault(result['well_id'], [])
+            if result['log_entry'] is not None:
+                well_logs.append(result['log_entry'])
+        for well in wells_by_name.values():
+            if well.pk in logs_by_well:
+                publish_well_events(well, logs_by_well[well.pk])
+
+    return results
+
+
+def save_unprocessed_summaries(parsed_items: list, **options) -> tuple[dict, dict]:
+    """
+    save_parsed_summaries, устойчивая к гонке повторов: если часть сводок пакета
+    между проверкой отпечатков и записью успел записать параллельный запрос
+    (релей повторил пакет), пакет откатывается и один раз записывается заново
+    без них.
+
+    Возвращает (результаты save_parsed_summaries, {index: ProcessedSummary}
+    для сводок, которые записал другой запрос).
+    """
+    try:
+        return save_parsed_summaries(parsed_items, **options), {}
+    except IntegrityError:
+        already_processed = find_processed_summaries({
+            item['content_hash'] for _, item, _, _ in parsed_items if item.get('content_hash')
+        })
+        if not already_processed:
+            raise
+        logger.info(f"Сводки пакета уже записаны параллельным запросом: {len(already_processed)}. Повторяем запись без них.")
+
+    taken = {}
+    remaining = []
+    for parsed_item in parsed_items:
+        index, item = parsed_item[:2]
+        if item.get('content_hash') in already_processed:
+            taken[index] = already_processed[item['content_hash']]
+        else:
+            remaining.append(parsed_item)
+    return save_parsed_summaries(remaining, **options), taken
+
+
+def process_summary_batch(items: list) -> list:
+    """
+    Пакетная обработка сводок (например, очередь релея после простоя).
+
+    Элементы проверяет SummaryItemSerializer: в запись идут только text, chat_id
+    и topic_id, неверный элемент получает свою ошибку, а не роняет пакет.
+    Сначала отсеивает уже обработанные сводки (по отпечатку, одним запросом),
+    разбирает остальные и записывает их одним пакетом (см. save_parsed_summaries).
+    Правила и уведомления выполняет воркер очереди (run_jobs).
+
+    Возвращает результат для каждого элемента в исходном порядке.
+    """
+    results = [None] * len(items)
+    valid_items = {}
+    hashes = {}
+
+    # --- Шаг 1: Проверка элементов, отпечатки и отсев повторов ---
+    for index, item in enumerate(items):
+        serializer = SummaryItemSerializer(data=item)
+        if not serializer.is_valid():
+            if not isinstance(item, dict) or not item.get('text'):
+                results[index] = {'index': index, 'status': 'error', 'error': 'No text provided'}
+            else:
+                results[index] = {
+                    'index': index, 'status': 'error', 'error': 'Invalid summary', 'fields': serializer.errors,
+                }
+            continue
+        valid_items[index] = serializer.validated_data
+        hashes[index] = summary_fingerprint(serializer.validated_data['text'])
+
+    already_processed = find_processed_summaries(set(hashes.values()))
+    first_index_by_hash = {}
+    repeated_in_batch = {}
+    parsed_items = []
+    unrecognized = []
+
+    # --- Шаг 2: Парсим только новые сводки ---
+    for index, content_hash in hashes.items():
+        if content_hash in already_processed:
+            results[index] = duplicate_result(index, already_processed[content_hash])
+            continue
+        if content_hash in first_index_by_hash:
+            repeated_in_batch[index] = first_index_by_hash[content_hash]
+            continue
+        first_index_by_hash[content_hash] = index
+
+        summary_text = valid_items[index]['text']
+        with stage_timer('parse'):
+            parsed_data = parse_summary(summary_text)
+            parsed_mud_params = extract_mud_parameters(summary_text) if parsed_data.get('name') else None
+        if not parsed_data.get('name'):
+            results[index] = {'index': index, 'status': 'error', 'error': 'Could not find well name in summary'}
+            unrecognized.append(summary_entry(summary_text, content_hash=content_hash))
+            continue
+
+        item = {
+            'chat_id': valid_items[index].get('chat_id'),
+            'topic_id': valid_items[index].get('topic_id'),
+            'content_hash': content_hash,
+        }
+        parsed_items.append((index, item, parsed_data, parsed_mud_params))
+
+    # --- Шаг 3: Пакетная запись; правила и уведомления уходят в очередь задач ---
+    # Нераспознанные сводки — в историю без скважины (их разберет replay_summaries
+    # после правки парсера), в той же транзакции, что и пакет
+    saved, taken = save_unprocessed_summaries(parsed_items, unrecognized=unrecognized, enqueue_post_processing=True)
+    for index, record in taken.items():
+        results[index] = duplicate_result(index, record)
+    for index, result in saved.items():
+        log_entry = result.pop('log_entry')
+        result['mud_log_id'] = log_entry.pk if log_entry else None
+        if log_entry is not None:
+            result['is_out_of_norm'] = log_entry.is_out_of_norm
+        results[index] = result
+
+    # Повтор внутри пакета повторяет результат первой копии, но без записи и уведомления
+    for index, first_index in repeated_in_batch.items():
+        first = results[first_index]
+        if first['status'] == 'ok':
+            results[index] = {
+                'index': index,
+                'status': 'duplicate',
+                'well_id': first['well_id'],
+                'well_name': first['well_name'],
+                'mud_log_id': first['mud_log_id'],
+            }
+        else:
+            results[index] = {**first, 'index': index}
+
+    return results
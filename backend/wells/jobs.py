@@ -0,0 +1,124 @@
+# backend/wells/jobs.py
+"""
+Простая очередь фоновых задач поверх таблицы Job.
+
+Задача ставится в очередь в той же транзакции, что и данные, которые она
+обрабатывает, поэтому не теряется и не выполняется раньше коммита.
+Воркер (manage.py run_jobs) забирает задачи через SELECT ... FOR UPDATE
+SKIP LOCKED, так что можно запускать несколько воркеров параллельно.
+"""
+import logging
+import traceback
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Тип задачи -> функция-обработчик (принимает payload).
+# Пути строками, чтобы не было циклических импортов.
+JOB_HANDLERS = {
+    'process_mud_log': 'wells.ingest.post_process_mud_log',
+}
+
+RETRY_BASE_DELAY = 30 # секунд; далее 60, 120, 240...
+RETRY_MAX_DELAY = 60 * 60
+
+
+def build_job(kind: str, payload: dict, run_after=None) -> Job:
+    """Создает (не сохраняя) задачу — для bulk_create."""
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Неизвестный тип задачи: {kind}")
+    return Job(kind=kind, payload=payload, run_after=run_after or timezone.now())
+
+
+def enqueue_job(kind: str, payload: dict, run_after=None) -> Job:
+    """Ставит задачу в очередь."""
+    job = build_job(kind, payload, run_after)
+    job.save()
+    return job
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Экспоненциальная пауза перед следующей попыткой."""
+    return timedelta(seconds=min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY))
+
+
+def claim_jobs(limit: int) -> list:
+    """
+    Забирает до limit готовых к выполнению задач и помечает их как выполняющиеся.
+    Задачи, уже взятые другим воркером, пропускаются (skip_locked).
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.Status.PENDING, run_after__lte=now)
+            .order_by('run_after', 'pk')[:limit]
+        )
+        if not jobs:
+            return []
+        Job.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status=Job.Status.RUNNING, attempts=F('attempts') + 1, updated_at=now
+        )
+    for job in jobs:
+        job.status = Job.Status.RUNNING
+        job.attempts += 1
+    return jobs
+
+
+def run_job(job: Job) -> bool:
+    """
+    Выполняет одну задачу и записывает результат.
+    При ошибке задача возвращается в очередь с паузой, после max_attempts — FAILED.
+    """
+    try:
+        handler = import_string(JOB_HANDLERS[job.kind])
+        handler(job.payload)
+    except Exception as e:
+        job.last_error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            job.status = Job.Status.FAILED
+            logger.error(f"Задача {job} провалилась окончательно после {job.attempts} попыток: {e}")
+        else:
+            job.status = Job.Status.PENDING
+            job.run_after = timezone.now() + retry_delay(job.attempts)
+            logger.warning(f"Задача {job} завершилась ошибкой (попытка {job.attempts}), повтор после {job.run_after}: {e}")
+        job.save(update_fields=['status', 'run_after', 'last_error', 'updated_at'])
+        return False
+
+    job.status = Job.Status.DONE
+    job.last_error = ''
+    job.save(update_fields=['status', 'last_error', 'updated_at'])
+    return True
+
+
+def release_jobs(jobs: list):
+    """Возвращает в очередь забранные, но не начатые задачи (воркер останавливается)."""
+    if jobs:
+        Job.objects.filter(pk__in=[job.pk for job in jobs], status=Job.Status.RUNNING).update(
+            status=Job.Status.PENDING, attempts=F('attempts') - 1, updated_at=timezone.now()
+        )
+
+
+def requeue_stale_jobs(stale_after: timedelta) -> int:
+    """
+    Возвращает в очередь задачи, "зависшие" в статусе RUNNING
+    (воркер упал или был убит посреди выполнения).
+    """
+    return Job.objects.filter(
+        status=Job.Status.RUNNING,
+        updated_at__lt=timezone.now() - stale_after,
+    ).update(status=Job.Status.PENDING, run_after=timezone.now(), updated_at=timezone.now())
+
+
+def delete_done_jobs(older_than: timedelta) -> int:
+    """Удаляет давно выполненные задачи, чтобы таблица не росла бесконечно."""
+    deleted, _ = Job.objects.filter(
+        status=Job.Status.DONE,
+        updated_at__lt=timezone.now() - older_than,
+    ).delete()
+    return deleted
@@ -0,0 +1,34 @@
+# backend/wells/management/commands/archive_mud_logs.py
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from wells.archive import archive_mud_logs
+
+
+class Command(BaseCommand):
+    help = (
+        "Переносит старые замеры неактивных скважин из БД в сжатые файлы архива "
+        "(история и графики читают их прозрачно)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--well', type=int, action='append', dest='well_ids', help="ID скважины (можно несколько раз)")
+        parser.add_argument(
+            '--days', type=int, default=settings.MUD_ARCHIVE_AFTER_DAYS,
+            help="Архивировать замеры старше стольких дней (по умолчанию MUD_ARCHIVE_AFTER_DAYS)",
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Только посчитать, ничего не переносить")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        stats = archive_mud_logs(well_ids=options['well_ids'], cutoff=cutoff, dry_run=options['dry_run'])
+        elapsed = time.monotonic() - started
+
+        prefix = "[dry-run] " if options['dry_run'] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}Скважин: {stats['wells']}, замеров в архиве: {stats['logs']}, "
+            f"размер файлов: {stats['bytes'] / 1024:.0f} КБ за {elapsed:.1f} с."
+        ))
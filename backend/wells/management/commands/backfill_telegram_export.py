@@ -0,0 +1,171 @@
+# backend/wells/management/commands/backfill_telegram_export.py
+import os
+import json
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from wells.ingest import save_unprocessed_summaries, find_processed_summaries
+from wells.telegram_export import (
+    ExportFormatError, iter_export_messages, message_text, message_time, parse_export_chunk,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Загружает исторические сводки из экспорта чата Telegram (result.json). "
+        "Файл читается потоком, сообщения разбираются пулом процессов, "
+        "запись в БД идет пачками. Прогресс сохраняется в файл-чекпоинт, "
+        "прерванный запуск продолжается с места остановки."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('export_path', help="Путь к result.json")
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help="Число процессов для разбора (по умолчанию — все ядра)"
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help="Сколько сообщений разбирать и записывать за одну пачку"
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help="Файл чекпоинта (по умолчанию <export_path>.checkpoint.json)"
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help="Игнорировать чекпоинт и начать с начала файла"
+        )
+        parser.add_argument(
+            '--logs-only', action='store_true',
+            help="Только записывать логи параметров, не обновляя поля скважин"
+        )
+
+    def handle(self, *args, **options):
+        export_path = os.path.abspath(options['export_path'])
+        if not os.path.isfile(export_path):
+            raise CommandError(f"Файл '{export_path}' не найден.")
+        if options['workers'] < 1 or options['chunk_size'] < 1:
+            raise CommandError("--workers и --chunk-size должны быть больше нуля.")
+
+        self.checkpoint_path = options['checkpoint'] or f"{export_path}.checkpoint.json"
+        self.update_wells = not options['logs_only']
+        self.state = self._load_checkpoint(export_path, options['restart'])
+
+        if self.state['offset']:
+            self.stdout.write(
+                f"Продолжаем с байта {self.state['offset']} "
+                f"(уже обработано сообщений: {self.state['messages']})."
+            )
+
+        workers = options['workers']
+        max_pending = workers * 2 # сколько пачек может ждать записи — держит память ровной
+        pending = deque()
+
+        try:
+            with open(export_path, 'rb') as export_file, ProcessPoolExecutor(max_workers=workers) as pool:
+                messages = iter_export_messages(export_file, self.state['offset'])
+                for chunk, end_offset, read_count in self._chunks(messages, options['chunk_size']):
+                    pending.append((pool.submit(parse_export_chunk, chunk), end_offset, read_count))
+                    if len(pending) >= max_pending:
+                        self._write_batch(*pending.popleft())
+                while pending:
+                    self._write_batch(*pending.popleft())
+        except ExportFormatError as e:
+            raise CommandError(str(e))
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING(
+                f"Прервано. Прогресс сохранен в {self.checkpoint_path}, "
+                "повторный запуск продолжит с места остановки."
+            ))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Готово: сообщений {self.state['messages']}, сводок {self.state['summaries']}, "
+            f"записей параметров {self.state['logs']}, пропущено повторов {self.state['duplicates']}."
+        ))
+
+    def _chunks(self, messages, chunk_size):
+        """
+        Собирает сообщения в пачки для воркеров.
+        Отдает (пачка, смещение после последнего сообщения, сколько сообщений прочитано).
+        """
+        chunk = []
+        read_count = 0
+        end_offset = None
+        for message, end_offset in messages:
+            read_count += 1
+            if message.get('type') == 'message':
+                text = message_text(message)
+                if text:
+                    chunk.append((message.get('id'), message_time(message), text))
+            if read_count >= chunk_size:
+                yield chunk, end_offset, read_count
+                chunk, read_count = [], 0
+        if read_count:
+            yield chunk, end_offset, read_count
+
+    def _write_batch(self, future, end_offset, read_count):
+        """
+        Записывает разобранную пачку одной транзакцией и сдвигает чекпоинт.
+        """
+        parsed = future.result()
+        # Сводки, которые уже есть в БД (прошли через API или прошлый импорт), пропускаем
+        already_processed = find_processed_summaries({content_hash for _, _, content_hash, _, _ in parsed})
+
+        parsed_items = []
+        seen_hashes = set(already_processed)
+        for message_id, date, content_hash, parsed_data, parsed_mud_params in parsed:
+            if content_hash in seen_hashes:
+                self.state['duplicates'] += 1
+                continue
+            seen_hashes.add(content_hash)
+            if date is not None and timezone.is_naive(date):
+                date = timezone.make_aware(date) # старые экспорты пишут локальное время
+            item = {'measurement_time': date, 'content_hash': content_hash}
+            parsed_items.append((message_id, item, parsed_data, parsed_mud_params))
+
+        results, taken = save_unprocessed_summaries(parsed_items, update_wells=self.update_wells)
+        self.state['duplicates'] += len(taken)
+
+        self.state['offset'] = end_offset
+        self.state['messages'] += read_count
+        self.state['summaries'] += len(results)
+        self.state['logs'] += sum(1 for result in results.values() if result['log_entry'] is not None)
+        self._save_checkpoint()
+
+        self.stdout.write(
+            f"Сообщений: {self.state['messages']}, сводок: {self.state['summaries']}, "
+            f"записей параметров: {self.state['logs']}, повторов: {self.state['duplicates']}"
+        )
+
+    def _load_checkpoint(self, export_path, restart):
+        state = {
+            'export_path': export_path,
+            'size': os.path.getsize(export_path),
+            'offset': 0,
+            'messages': 0,
+            'summaries': 0,
+            'logs': 0,
+            'duplicates': 0,
+        }
+        if restart or not os.path.exists(self.checkpoint_path):
+            return state
+
+        with open(self.checkpoint_path, encoding='utf-8') as f:
+            saved = json.load(f)
+        if saved.get('export_path') != export_path or saved.get('size') != state['size']:
+            raise CommandError(
+                f"Чекпоинт {self.checkpoint_path} относится к другому файлу. "
+                "Удалите его или запустите с --restart."
+            )
+        state.update(saved)
+        return state
+
+    def _save_checkpoint(self):
+        # Пишем во временный файл и подменяем, чтобы чекпоинт не побился при обрыве
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.checkpoint_path)
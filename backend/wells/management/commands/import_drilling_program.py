@@ -0,0 +1,61 @@
+# backend/wells/management/commands/import_drilling_program.py
+import time
+from pathlib import Path
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from wells.models import Well
+from wells.program_import import read_table, parse_program, apply_program
+
+
+class Command(BaseCommand):
+    help = (
+        "Загружает программу промывки из таблицы (XLSX или CSV: строка на интервал) "
+        "на одну или сразу несколько скважин."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help="Файл программы (.xlsx или .csv)")
+        parser.add_argument('--well', type=int, action='append', dest='well_ids', default=[], help="ID скважины (можно несколько раз)")
+        parser.add_argument('--well-name', action='append', dest='well_names', default=[], help="Название скважины (можно несколько раз)")
+        parser.add_argument('--name', help="Название программы (по умолчанию — имя файла)")
+        parser.add_argument('--replace', action='store_true', help="Заменить уже существующие программы скважин")
+        parser.add_argument('--dry-run', action='store_true', help="Только проверить файл, ничего не записывать")
+
+    def handle(self, *args, **options):
+        path = Path(options['file'])
+        started = time.monotonic()
+        try:
+            with path.open('rb') as f:
+                intervals = parse_program(read_table(f, path.name))
+        except OSError as e:
+            raise CommandError(f"Не удалось открыть файл: {e}")
+        except ValidationError as e:
+            raise CommandError("\n".join(e.messages))
+
+        wells = list(Well.objects.filter(pk__in=options['well_ids'])) + list(
+            Well.objects.filter(name__in=options['well_names'])
+        )
+        missing = (set(options['well_ids']) - {well.pk for well in wells}) | (
+            set(options['well_names']) - {well.name for well in wells}
+        )
+        if missing:
+            raise CommandError(f"Скважины не найдены: {', '.join(map(str, sorted(missing, key=str)))}")
+        wells = list({well.pk: well for well in wells}.values())
+
+        sections = len({interval.section for interval in intervals})
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(
+                f"[dry-run] Файл в порядке: секций {sections}, интервалов {len(intervals)}. Скважин: {len(wells)}."
+            ))
+            return
+
+        try:
+            stats = apply_program(intervals, wells, options['name'] or path.stem, replace=options['replace'])
+        except ValidationError as e:
+            raise CommandError("\n".join(e.messages))
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Программа загружена на {stats['wells']} скв. (заменено: {stats['replaced']}): "
+            f"секций {stats['sections']}, интервалов {stats['intervals']} за {elapsed:.1f} с. "
+            f"Перепроверено замеров: {stats['revalidated_logs']}."
+        ))
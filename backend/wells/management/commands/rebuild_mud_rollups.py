@@ -0,0 +1,35 @@
+# backend/wells/management/commands/rebuild_mud_rollups.py
+import time
+from argparse import ArgumentTypeError
+from datetime import datetime
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from wells.rollups import rebuild_rollups
+
+
+def parse_moment(value: str):
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise ArgumentTypeError(f"Неверная дата: {value} (нужен формат ГГГГ-ММ-ДД или ISO 8601)")
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересобирает часовые и суточные сводки параметров раствора из истории замеров "
+        "(первичное заполнение или восстановление после ручных правок в базе)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--well', type=int, action='append', dest='well_ids', help="ID скважины (можно несколько раз)")
+        parser.add_argument('--from', dest='time_from', type=parse_moment, help="С даты (сутки целиком)")
+        parser.add_argument('--to', dest='time_to', type=parse_moment, help="По дату включительно (сутки целиком)")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        created = rebuild_rollups(
+            well_ids=options['well_ids'], time_from=options['time_from'], time_to=options['time_to'],
+        )
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"Записано строк сводки: {created} за {elapsed:.1f} с."))
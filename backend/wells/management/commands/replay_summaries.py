@@ -0,0 +1,134 @@
+# backend/wells/management/commands/replay_summaries.py
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from wells.models import ReceivedSummary
+from wells.rollups import rebuild_rollups
+from wells.trends import invalidate_trend_buffer
+from wells.summary_history import parse_history_chunk, attach_unassigned_chunk, archived_until, replay_chunk
+
+
+class Command(BaseCommand):
+    help = (
+        "Заново разбирает историю сводок (после исправления парсера): привязывает "
+        "нераспознанные сводки к скважинам, пересчитывает поля скважин и записи "
+        "параметров раствора. Сводки разбираются пулом процессов, запись идет "
+        "пачками. Правила и уведомления не запускаются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--well', type=int, action='append', dest='well_ids', help="ID скважины (можно несколько раз)")
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help="Число процессов для разбора (по умолчанию — все ядра)"
+        )
+        parser.add_argument('--chunk-size', type=int, default=500, help="Сколько сводок разбирать и записывать за одну пачку")
+        parser.add_argument('--dry-run', action='store_true', help="Все посчитать и откатить, ничего не записывая")
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['chunk_size'] < 1:
+            raise CommandError("--workers и --chunk-size должны быть больше нуля.")
+        self.workers = options['workers']
+        self.chunk_size = options['chunk_size']
+        self.stats = dict.fromkeys((
+            'attached', 'wells_created', 'summaries', 'archived', 'logs_updated', 'logs_created', 'logs_deleted',
+        ), 0)
+
+        started = time.monotonic()
+        if options['dry_run']:
+            with transaction.atomic():
+                wells = self._replay(options['well_ids'])
+                transaction.set_rollback(True)
+        else:
+            wells = self._replay(options['well_ids'])
+        elapsed = time.monotonic() - started
+
+        stats = self.stats
+        self.stdout.write(self.style.SUCCESS(
+            f"{'[dry-run] ' if options['dry_run'] else ''}Скважин: {len(wells)}, сводок: {stats['summaries']} "
+            f"(до архива, без замеров: {stats['archived']}), привязано нераспознанных: {stats['attached']} "
+            f"(новых скважин: {stats['wells_created']}). Замеры: обновлено {stats['logs_updated']}, "
+            f"создано {stats['logs_created']}, удалено {stats['logs_deleted']}. {elapsed:.1f} с."
+        ))
+
+    def _replay(self, well_ids) -> dict:
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            # Нераспознанные сводки — первыми: привязанные к скважинам повторятся вместе с остальными
+            if not well_ids:
+                for rows, parsed in self._parsed(pool, self._unassigned_chunks()):
+                    attach_unassigned_chunk([(entry_id, content_hash) for entry_id, content_hash, _ in rows], parsed, self.stats)
+
+            wells = {}
+            archive_times = archived_until(well_ids)
+            for rows, parsed in self._parsed(pool, self._history_chunks(well_ids)):
+                replay_chunk([row[:4] for row in rows], parsed, wells, archive_times, self.stats)
+                self.stdout.write(f"Сводок: {self.stats['summaries']}, скважин: {len(wells)}")
+
+        if wells:
+            rebuild_rollups(sorted(wells))
+            for well_id in wells:
+                transaction.on_commit(lambda well_id=well_id: invalidate_trend_buffer(well_id))
+        return wells
+
+    def _parsed(self, pool, chunks):
+        """Отдает (пачка, результат разбора) по порядку; впереди разбирается не больше workers * 2 пачек."""
+        pending = deque()
+        for rows in chunks:
+            # BinaryField из Postgres — memoryview, в процесс-воркер передаем bytes
+            pending.append((rows, pool.submit(parse_history_chunk, [(row[0], bytes(row[-1])) for row in rows])))
+            if len(pending) >= self.workers * 2:
+                rows, future = pending.popleft()
+                yield rows, future.result()
+        while pending:
+            rows, future = pending.popleft()
+            yield rows, future.result()
+
+    def _unassigned_chunks(self):
+        """Сводки без скважины пачками: (id, content_hash, compressed_text), по возрастанию id."""
+        last_id = 0
+        while True:
+            rows = list(
+                ReceivedSummary.objects.filter(well__isnull=True, pk__gt=last_id).order_by('pk')
+                .values_list('id', 'content_hash', 'compressed_text')[:self.chunk_size]
+            )
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield rows
+
+    def _history_chunks(self, well_ids):
+        """
+        История скважин пачками: (id, well_id, received_at, mud_log_id, compressed_text),
+        по скважинам, внутри скважины — по времени получения. Историю скважины читаем
+        страницами по chunk_size с ключом (received_at, id): в памяти не больше пачки,
+        сколько бы сводок ни было у скважины. Пачка пишет только свои строки истории,
+        поэтому чтение следующих страниц не пересекается с записью разобранных.
+        """
+        summaries = ReceivedSummary.objects.filter(well__isnull=False)
+        if well_ids:
+            summaries = summaries.filter(well_id__in=well_ids)
+        chunk = []
+        for well_id in summaries.order_by('well_id').values_list('well_id', flat=True).distinct():
+            history = ReceivedSummary.objects.filter(well_id=well_id).order_by('received_at', 'id')
+            page = history
+            while True:
+                limit = self.chunk_size - len(chunk)
+                rows = list(page.values_list(
+                    'id', 'well_id', 'received_at', 'mud_log_id', 'compressed_text',
+                )[:limit])
+                chunk += rows
+                if len(chunk) >= self.chunk_size:
+                    yield chunk
+                    chunk = []
+                if len(rows) < limit:
+                    break
+                last_id, _, last_received_at = rows[-1][:3]
+                page = history.filter(
+                    Q(received_at__gt=last_received_at) | Q(received_at=last_received_at, pk__gt=last_id)
+                )
+        if chunk:
+            yield chunk
@@ -0,0 +1,32 @@
+# backend/wells/management/commands/revalidate_mud_logs.py
+import time
+from django.core.management.base import BaseCommand
+from wells.revalidation import revalidate_mud_logs
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает флаг 'Выход за пределы нормы' у истории замеров по текущим нормам "
+        "программ промывки (например, после правки интервалов в админке)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--well', type=int, action='append', dest='well_ids', help="ID скважины (можно несколько раз)")
+        parser.add_argument('--dry-run', action='store_true', help="Только посчитать изменения, ничего не записывать")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        stats = revalidate_mud_logs(well_ids=options['well_ids'], dry_run=options['dry_run'])
+        elapsed = time.monotonic() - started
+
+        prefix = "[dry-run] " if options['dry_run'] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}Проверено логов: {stats['checked']} за {elapsed:.1f} с. "
+            f"Изменено: {stats['changed']} (выход за норму: +{stats['set_out_of_norm']}, снято: {stats['cleared']})."
+        ))
+        if stats['skipped']:
+            self.stdout.write(self.style.WARNING(
+                f"Не проверено: {stats['skipped']} — замеры без глубины/секции (записаны до миграции 0012), "
+                f"у них остался прежний флаг. Из них {stats['skipped_replayable']} есть в истории сводок: "
+                f"их восстановит replay_summaries, после него запустите перепроверку еще раз."
+            ))
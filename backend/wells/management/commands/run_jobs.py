@@ -0,0 +1,83 @@
+# backend/wells/management/commands/run_jobs.py
+import time
+import signal
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from wells.jobs import claim_jobs, run_job, release_jobs, requeue_stale_jobs, delete_done_jobs
+
+HOUSEKEEPING_INTERVAL = 60 # секунд между проверками "зависших" и старых задач
+
+
+class Command(BaseCommand):
+    help = (
+        "Воркер очереди фоновых задач (правила и уведомления после приема сводок). "
+        "Работает до SIGTERM/Ctrl+C; текущая задача при остановке доделывается."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Выполнить готовые задачи и выйти")
+        parser.add_argument('--batch-size', type=int, default=20, help="Сколько задач забирать за раз")
+        parser.add_argument(
+            '--threads', type=int, default=8,
+            help="Сколько задач выполнять параллельно (отправка в разные чаты не ждет друг друга)"
+        )
+        parser.add_argument('--sleep', type=float, default=1.0, help="Пауза (сек), когда очередь пуста")
+        parser.add_argument(
+            '--stale-after', type=int, default=600,
+            help="Через сколько секунд задача в статусе 'Выполняется' считается зависшей"
+        )
+        parser.add_argument(
+            '--keep-done-days', type=int, default=7,
+            help="Сколько дней хранить выполненные задачи"
+        )
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        stale_after = timedelta(seconds=options['stale_after'])
+        keep_done = timedelta(days=options['keep_done_days'])
+        last_housekeeping = 0
+        processed = failed = 0
+
+        self.stdout.write("Воркер очереди запущен.")
+        executor = ThreadPoolExecutor(max_workers=max(options['threads'], 1))
+        while not self.stopping:
+            close_old_connections() # долгоживущий процесс: не держим "протухшие" соединения
+
+            if time.monotonic() - last_housekeeping > HOUSEKEEPING_INTERVAL:
+                requeued = requeue_stale_jobs(stale_after)
+                if requeued:
+                    self.stdout.write(self.style.WARNING(f"Возвращено в очередь зависших задач: {requeued}"))
+                delete_done_jobs(keep_done)
+                last_housekeeping = time.monotonic()
+
+            jobs = claim_jobs(options['batch_size'])
+            for result in executor.map(self._run_job, jobs):
+                if result is True:
+                    processed += 1
+                elif result is False:
+                    failed += 1
+
+            if not jobs:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+
+        executor.shutdown()
+        self.stdout.write(f"Воркер остановлен. Выполнено: {processed}, с ошибкой: {failed}.")
+
+    def _run_job(self, job):
+        """Выполняется в потоке пула. None — задача не начата из-за остановки."""
+        if self.stopping:
+            # Остановка: еще не начатые задачи из пачки отдаем обратно в очередь
+            release_jobs([job])
+            return None
+        close_old_connections() # у каждого потока свое соединение с БД
+        return run_job(job)
+
+    def _stop(self, signum, frame):
+        self.stopping = True
@@ -0,0 +1,300 @@
+# backend/wells/metrics.py
+"""
+Метрики производительности в формате Prometheus (/metrics).
+
+MetricsMiddleware для каждого маршрута (view_name) записывает:
+- время ответа (гистограмма http_request_duration_seconds),
+- число и время SQL-запросов (connection.execute_wrapper),
+- время сериализации (serializer.data сериализаторов ответов с
+  TimedSerializerMixin и рендер TimedJSONRenderer, без SQL внутри них).
+Этапы обработки сводки (parse, validate, rules, notify, ai) меряются
+явно через stage_timer.
+
+Метрики копятся в памяти процесса, а раз в METRICS_FLUSH_INTERVAL секунд
+снимок процесса кладется в общий кэш 'api' (см. response_cache.py). /metrics
+складывает снимки всех живых процессов — веб-воркеров и run_jobs, — поэтому
+неважно, в какой воркер попал запрос Prometheus. Снимок умершего процесса
+исчезает через METRICS_PROCESS_TTL секунд.
+"""
+import os
+import time
+import socket
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from .response_cache import response_cache
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+# имя -> (тип, описание, границы корзин гистограммы)
+METRICS = {
+    'http_requests_total': ('counter', "Число запросов", None),
+    'http_request_duration_seconds': ('histogram', "Время обработки запроса", LATENCY_BUCKETS),
+    'http_request_db_queries': ('histogram', "SQL-запросов на один запрос", QUERY_COUNT_BUCKETS),
+    'http_request_db_seconds': ('histogram', "Время SQL на один запрос", LATENCY_BUCKETS),
+    'http_request_serializer_seconds': ('histogram', "Время сериализации на один запрос", LATENCY_BUCKETS),
+    'summary_stage_duration_seconds': ('histogram', "Время этапов обработки сводки", LATENCY_BUCKETS),
+}
+
+_lock = threading.Lock()
+# (имя, метки) -> число (счетчик) или [по корзинам..., сумма, количество] (гистограмма)
+_values = {}
+_last_flush = 0.0
+_PROCESS_ID = f"{socket.gethostname()}:{os.getpid()}"
+_PROCESSES_KEY = 'metrics:processes'
+
+
+def _process_key(process_id: str) -> str:
+    return f"metrics:process:{process_id}"
+
+
+def inc(name: str, value: float = 1, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _values[key] = _values.get(key, 0) + value
+    _maybe_flush()
+
+
+def observe(name: str, value: float, **labels):
+    buckets = METRICS[name][2]
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        entry = _values.get(key)
+        if entry is None:
+            entry = _values[key] = [0] * (len(buckets) + 1) + [0.0, 0]
+        entry[bisect_left(buckets, value)] += 1 # последняя корзина — +Inf
+        entry[-2] += value
+        entry[-1] += 1
+    _maybe_flush()
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """
+    Время этапа обработки сводки: with stage_timer('parse'): ...
+    или декоратором: @stage_timer('ai').
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe('summary_stage_duration_seconds', time.perf_counter() - start, stage=stage)
+
+
+# --- Общий снимок всех процессов ---
+
+def _snapshot() -> dict:
+    with _lock:
+        return {key: list(value) if isinstance(value, list) else value for key, value in _values.items()}
+
+
+def flush_metrics():
+    """Кладет снимок метрик процесса в общий кэш."""
+    global _last_flush
+    _last_flush = time.monotonic()
+    cache = response_cache()
+    cache.set(_process_key(_PROCESS_ID), _snapshot(), timeout=getattr(settings, 'METRICS_PROCESS_TTL', 3600))
+    processes = cache.get(_PROCESSES_KEY) or []
+    if _PROCESS_ID not in processes:
+        cache.set(_PROCESSES_KEY, processes + [_PROCESS_ID], timeout=None)
+
+
+def _maybe_flush():
+    if time.monotonic() - _last_flush >= getattr(settings, 'METRICS_FLUSH_INTERVAL', 10):
+        try:
+            flush_metrics()
+        except Exception:
+            pass # метрики не должны ронять запрос
+
+
+def collect_metrics() -> dict:
+    """Сумма снимков всех живых процессов."""
+    flush_metrics()
+    cache = response_cache()
+    processes = cache.get(_PROCESSES_KEY) or []
+    snapshots = cache.get_many([_process_key(process_id) for process_id in processes])
+    alive = [process_id for process_id in processes if _process_key(process_id) in snapshots]
+    if len(alive) != len(processes):
+        cache.set(_PROCESSES_KEY, alive, timeout=None)
+
+    total = {}
+    for snapshot in snapshots.values():
+        for key, value in snapshot.items():
+            if isinstance(value, list):
+                current = total.setdefault(key, [0] * len(value))
+                for i, item in enumerate(value):
+                    current[i] += item
+            else:
+                total[key] = total.get(key, 0) + value
+    return total
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_metrics() -> str:
+    """Текстовый формат Prometheus (version=0.0.4)."""
+    values = collect_metrics()
+    lines = []
+    for name, (kind, description, buckets) in METRICS.items():
+        series = sorted(
+            ((labels, value) for (metric, labels), value in values.items() if metric == name),
+            key=lambda item: str(item[0]),
+        )
+        if not series:
+            continue
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in series:
+            if kind == 'counter':
+                lines.append(f"{name}{_format_labels(labels)} {_format_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(list(buckets) + ['+Inf'], value[:-2]):
+                cumulative += count
+                le = bound if bound == '+Inf' else _format_number(float(bound))
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_number(float(value[-2]))}")
+            lines.append(f"{name}_count{_format_labels(labels)} {value[-1]}")
+    return '\n'.join(lines) + '\n'
+
+
+# --- Замеры запроса ---
+
+class _RequestStats:
+    __slots__ = ('queries', 'db_time', 'serializer_time', 'serializer_depth')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Обертка connection.execute_wrapper
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+
+_current_request = ContextVar('metrics_request', default=None)
+
+
+@contextmanager
+def serializer_timer():
+    """
+    Время сериализации текущего запроса (без SQL внутри нее). Вложенные
+    замеры не складываются: меряется только самый внешний.
+    """
+    stats = _current_request.get()
+    if stats is None or stats.serializer_depth:
+        # вне запроса или вложенный вызов (уже меряется снаружи)
+        yield
+        return
+    stats.serializer_depth += 1
+    start = time.perf_counter()
+    db_time_before = stats.db_time
+    try:
+        yield
+    finally:
+        stats.serializer_depth -= 1
+        # SQL ленивых queryset'ов внутри сериализации учтен в db_time
+        stats.serializer_time += (time.perf_counter() - start) - (stats.db_time - db_time_before)
+
+
+class TimedSerializerMixin:
+    """
+    Замер serializer.data для сериализаторов ответов. Для many=True в Meta
+    нужен list_serializer_class = TimedListSerializer.
+    """
+
+    @property
+    def data(self):
+        with serializer_timer():
+            return super().data
+
+
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    pass
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """JSONRenderer с замером времени рендера (DEFAULT_RENDERER_CLASSES в settings)."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with serializer_timer():
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class MetricsMiddleware:
+    """
+    Время, SQL и сериализация по маршрутам (метка route — имя URL).
+
+    Время ответа меряется до того, как готов объект ответа: у потоковых
+    ответов (выгрузка замеров, поток событий SSE) в него попадает только
+    время до начала потока, а чтение потока — нет. Под ASGI (процесс events)
+    middleware работает асинхронно, без лишнего перехода в поток; SQL там
+    не считается — запросы синхронного кода идут в других потоках.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = _RequestStats()
+        token = _current_request.set(stats)
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(stats):
+                response = self.get_response(request)
+        finally:
+            _current_request.reset(token)
+        self._observe(request, response, stats, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        stats = _RequestStats()
+        token = _current_request.set(stats)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_request.reset(token)
+        self._observe(request, response, stats, time.perf_counter() - start)
+        return response
+
+    def _observe(self, request, response, stats: _RequestStats, duration: float):
+        match = getattr(request, 'resolver_match', None)
+        labels = {'route': match.view_name if match else 'unmatched', 'method': request.method}
+        inc('http_requests_total', status=response.status_code, **labels)
+        observe('http_request_duration_seconds', duration, **labels)
+        observe('http_request_db_queries', stats.queries, **labels)
+        observe('http_request_db_seconds', stats.db_time, **labels)
+        observe('http_request_serializer_seconds', stats.serializer_time, **labels)
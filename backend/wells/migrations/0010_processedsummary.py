@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wells', '0009_chemicalreagent_mudtype_depthintervalnorms_mud_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessedSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64, unique=True, verbose_name='Хэш нормализованной сводки')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата обработки')),
+                ('mud_log', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='wells.mudparameterlog', verbose_name='Созданная запись параметров')),
+                ('well', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='processed_summaries', to='wells.well', verbose_name='Скважина')),
+            ],
+            options={
+                'verbose_name': 'Обработанная сводка',
+                'verbose_name_plural': 'Обработанные сводки',
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wells', '0011_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mudparameterlog',
+            name='depth',
+            field=models.FloatField(blank=True, null=True, verbose_name='Забой на момент замера (м)'),
+        ),
+        migrations.AddField(
+            model_name='mudparameterlog',
+            name='section',
+            field=models.CharField(blank=True, choices=[('Направление', 'Направление'), ('Кондуктор', 'Кондуктор'), ('Тех.колонна (промеж.)', 'Техническая колонна (промежуточная)'), ('Экс. колонна', 'Эксплуатационная колонна'), ('Экс. хвостовик', 'Эксплуатационный хвостовик')], max_length=50, null=True, verbose_name='Секция на момент замера'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wells', '0012_mudparameterlog_depth_section'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mudparameterlog',
+            index=models.Index(fields=['well', 'measurement_time', 'id'], name='mudlog_well_time_id_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wells', '0013_mudparameterlog_well_time_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='nvpincident',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Дата обновления'),
+            preserve_default=False,
+        ),
+    ]
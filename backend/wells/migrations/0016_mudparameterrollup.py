@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wells', '0015_changes_tombstones_updated_at_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MudParameterRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Час'), ('day', 'Сутки')], max_length=10, verbose_name='Период')),
+                ('bucket_start', models.DateTimeField(verbose_name='Начало периода')),
+                ('parameter', models.CharField(max_length=50, verbose_name='Параметр')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Замеров')),
+                ('out_of_norm_count', models.PositiveIntegerField(default=0, verbose_name='Замеров вне нормы')),
+                ('total', models.FloatField(default=0, verbose_name='Сумма значений')),
+                ('min_value', models.FloatField(verbose_name='Минимум')),
+                ('max_value', models.FloatField(verbose_name='Максимум')),
+                ('well', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mud_rollups', to='wells.well', verbose_name='Скважина')),
+            ],
+            options={
+                'verbose_name': 'Сводка замеров за период',
+                'verbose_name_plural': 'Сводки замеров за периоды',
+                'constraints': [models.UniqueConstraint(fields=('well', 'period', 'parameter', 'bucket_start'), name='mud_rollup_bucket_uniq')],
+            },
+        ),
+    ]
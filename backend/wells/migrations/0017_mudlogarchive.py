@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wells', '0016_mudparameterrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MudLogArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.CharField(max_length=255, verbose_name='Файл в хранилище')),
+                ('log_count', models.PositiveIntegerField(verbose_name='Замеров')),
+                ('time_from', models.DateTimeField(verbose_name='Первый замер')),
+                ('time_to', models.DateTimeField(verbose_name='Последний замер')),
+                ('min_log_id', models.BigIntegerField(verbose_name='Минимальный ID замера')),
+                ('max_log_id', models.BigIntegerField(verbose_name='Максимальный ID замера')),
+                ('sha256', models.CharField(max_length=64, verbose_name='Контрольная сумма файла')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата архивации')),
+                ('well', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mud_log_archives', to='wells.well', verbose_name='Скважина')),
+            ],
+            options={
+                'verbose_name': 'Архив замеров',
+                'verbose_name_plural': 'Архивы замеров',
+                'ordering': ['well', 'time_from'],
+            },
+        ),
+    ]
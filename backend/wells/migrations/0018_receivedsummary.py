@@ -0,0 +1,107 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:29
+
+import re
+import zlib
+import hashlib
+import unicodedata
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+# Копии логики wells/parser.py на момент миграции: данные переносятся так,
+# как их понимал код этой версии, даже если парсер потом изменится.
+
+_MUD_PARAMS_RE = re.compile(r'Параметры бурового раствора:\s*(.*)', re.DOTALL | re.IGNORECASE)
+
+
+def summary_fingerprint(text):
+    """sha256 от текста: NFKC, пробелы схлопнуты, пустые строки убраны."""
+    normalized = unicodedata.normalize('NFKC', text)
+    normalized = '\n'.join(' '.join(line.split()) for line in normalized.splitlines() if line.strip())
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def has_mud_parameters(text):
+    """
+    Непуст ли extract_mud_parameters(text): блок параметров есть и в нем что-то
+    кроме пробелов, ';' и ',' — разобранный параметр или нераспознанный остаток.
+    """
+    match = _MUD_PARAMS_RE.search(text)
+    return bool(match and re.search(r'[^\s;,]', match.group(1)))
+
+
+def copy_last_summaries(apps, schema_editor):
+    """
+    Последние сводки скважин — первыми записями истории. Время и замер сводки
+    берем из ProcessedSummary; сводки старше нее (без отпечатка) с параметрами
+    раствора связываем с последним замером скважины — его записал тот же запрос.
+    Без ссылки на замер повтор истории (replay_summaries) создал бы его второй раз.
+    """
+    Well = apps.get_model('wells', 'Well')
+    ReceivedSummary = apps.get_model('wells', 'ReceivedSummary')
+    ProcessedSummary = apps.get_model('wells', 'ProcessedSummary')
+    MudParameterLog = apps.get_model('wells', 'MudParameterLog')
+
+    entries = []
+    wells = Well.objects.exclude(last_summary_text__isnull=True).exclude(last_summary_text='')
+    for well_id, text, updated_at in wells.values_list('pk', 'last_summary_text', 'updated_at').iterator():
+        entry = ReceivedSummary(
+            well_id=well_id,
+            content_hash=summary_fingerprint(text),
+            compressed_text=zlib.compress(text.encode('utf-8'), 6),
+            received_at=updated_at,
+        )
+        processed = ProcessedSummary.objects.filter(content_hash=entry.content_hash).first()
+        if processed:
+            entry.mud_log_id = processed.mud_log_id
+            entry.received_at = processed.created_at
+        elif has_mud_parameters(text):
+            last_log = MudParameterLog.objects.filter(well_id=well_id).order_by('-measurement_time', '-id').first()
+            if last_log:
+                entry.mud_log_id = last_log.pk
+                entry.received_at = last_log.measurement_time
+        entries.append(entry)
+    ReceivedSummary.objects.bulk_create(entries, batch_size=500)
+
+
+def restore_last_summaries(apps, schema_editor):
+    Well = apps.get_model('wells', 'Well')
+    ReceivedSummary = apps.get_model('wells', 'ReceivedSummary')
+    wells = []
+    for well in Well.objects.all():
+        latest = ReceivedSummary.objects.filter(well=well).order_by('-received_at', '-id').first()
+        if latest:
+            well.last_summary_text = zlib.decompress(bytes(latest.compressed_text)).decode('utf-8')
+            wells.append(well)
+    Well.objects.bulk_update(wells, ['last_summary_text'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wells', '0017_mudlogarchive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReceivedSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(db_index=True, max_length=64, verbose_name='Хэш нормализованной сводки')),
+                ('compressed_text', models.BinaryField(verbose_name='Текст сводки (zlib)')),
+                ('received_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Время получения')),
+                ('mud_log', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='wells.mudparameterlog', verbose_name='Созданная запись параметров')),
+                ('well', models.ForeignKey(blank=True, help_text='Пусто, если в сводке не нашлось названия скважины.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='received_summaries', to='wells.well', verbose_name='Скважина')),
+            ],
+            options={
+                'verbose_name': 'Полученная сводка',
+                'verbose_name_plural': 'История сводок',
+                'indexes': [models.Index(fields=['well', 'received_at', 'id'], name='summary_well_received_idx')],
+            },
+        ),
+        migrations.RunPython(copy_last_summaries, restore_last_summaries),
+        migrations.RemoveField(
+            model_name='well',
+            name='last_summary_text',
+        ),
+    ]
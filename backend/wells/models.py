@@ -1,6 +1,7 @@
 # backend/wells/models.py
 
 from django.db import models
+from django.utils import timezone
 
 # Создаем класс "Choices" для удобного хранения вариантов секций
 class WellSection(models.TextChoices):
@@ -27,7 +28,7 @@ class Well(models.Model):
     
     current_operations = models.TextField(verbose_name="Текущие работы", blank=True)
     
-    last_summary_text = models.TextField(verbose_name="Последняя сводка", blank=True, null=True)
+    # Текст сводок — в ReceivedSummary (последняя сводка: wells/summary_history.py)
     # has_nvp = models.BooleanField(default=False, verbose_name="Были ли НВП по нашей вине")
     # nvp_details = models.TextField(verbose_name="Информация по НВП", blank=True, null=True)
     
@@ -47,6 +48,10 @@ class Well(models.Model):
         verbose_name = "Скважина"
         verbose_name_plural = "Скважины"
         ordering = ['-updated_at']
+        indexes = [
+            # Выборка изменений с курсора (/api/changes/)
+            models.Index(fields=['updated_at'], name='well_updated_at_idx'),
+        ]
 
 
 # НОВАЯ МОДЕЛЬ ДЛЯ ИНЦИДЕНТОВ НВП
@@ -55,6 +60,7 @@ class NVPIncident(models.Model):
     incident_date = models.DateField(verbose_name="Дата инцидента")
     duration = models.CharField(max_length=100, verbose_name="Потерянное время (текст)", blank=True)
     description = models.TextField(verbose_name="Описание инцидента")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
 
     def __str__(self):
         return f"НВП на {self.well.name} от {self.incident_date}"
@@ -63,6 +69,9 @@ class NVPIncident(models.Model):
         verbose_name = "Инцидент НВП"
         verbose_name_plural = "Инциденты НВП"
         ordering = ['-incident_date'] # Сортируем от новых к старым
+        indexes = [
+            models.Index(fields=['updated_at'], name='nvp_updated_at_idx'),
+        ]
 
 class Task(models.Model):
     title = models.CharField(max_length=255, verbose_name="Название задачи")
@@ -84,6 +93,9 @@ class Task(models.Model):
         verbose_name = "Задача"
         verbose_name_plural = "Задачи"
         ordering = ['deadline'] # Сортируем по сроку выполнения
+        indexes = [
+            models.Index(fields=['updated_at'], name='task_updated_at_idx'),
+        ]
 
 
 class Tender(models.Model):
@@ -120,10 +132,23 @@ class Tender(models.Model):
         verbose_name = "Тендер"
         verbose_name_plural = "Тендеры"
         ordering = ['-updated_at']
+        indexes = [
+            models.Index(fields=['updated_at'], name='tender_updated_at_idx'),
+        ]
 
 class MudParameterLog(models.Model):
     well = models.ForeignKey(Well, on_delete=models.CASCADE, related_name='mud_logs', verbose_name="Скважина")
     measurement_time = models.DateTimeField(auto_now_add=True, verbose_name="Время замера")
+
+    # Где был сделан замер — по этим полям лог можно перепроверить по нормам задним числом
+    depth = models.FloatField(verbose_name="Забой на момент замера (м)", null=True, blank=True)
+    section = models.CharField(
+        max_length=50,
+        choices=WellSection.choices,
+        null=True,
+        blank=True,
+        verbose_name="Секция на момент замера"
+    )
     
     # Основные параметры
     density = models.FloatField(verbose_name="Плотность (Пл)", null=True, blank=True)
@@ -166,6 +191,159 @@ class MudParameterLog(models.Model):
 
     class Meta:
         ordering = ['-measurement_time']
+        indexes = [
+            # История скважины по времени и курсорная пагинация по (measurement_time, id)
+            models.Index(fields=['well', 'measurement_time', 'id'], name='mudlog_well_time_id_idx'),
+        ]
+
+
+# Сводка замеров по часам/суткам: для отчетов и графиков за недели и месяцы
+# вместо десятков тысяч сырых логов. Пополняется при записи каждого лога
+# (wells/rollups.py), пересобирается командой rebuild_mud_rollups.
+class MudParameterRollup(models.Model):
+    class Period(models.TextChoices):
+        HOUR = 'hour', 'Час'
+        DAY = 'day', 'Сутки'
+
+    well = models.ForeignKey(Well, on_delete=models.CASCADE, related_name='mud_rollups', verbose_name="Скважина")
+    period = models.CharField(max_length=10, choices=Period.choices, verbose_name="Период")
+    bucket_start = models.DateTimeField(verbose_name="Начало периода")
+    parameter = models.CharField(max_length=50, verbose_name="Параметр")
+
+    count = models.PositiveIntegerField(default=0, verbose_name="Замеров")
+    out_of_norm_count = models.PositiveIntegerField(default=0, verbose_name="Замеров вне нормы")
+    # Сумма, а не среднее: так агрегат складывается при добавлении замеров
+    total = models.FloatField(default=0, verbose_name="Сумма значений")
+    min_value = models.FloatField(verbose_name="Минимум")
+    max_value = models.FloatField(verbose_name="Максимум")
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def __str__(self):
+        return f"{self.well_id} {self.parameter} {self.get_period_display()} {self.bucket_start:%Y-%m-%d %H:%M}"
+
+    class Meta:
+        verbose_name = "Сводка замеров за период"
+        verbose_name_plural = "Сводки замеров за периоды"
+        constraints = [
+            # Ключ upsert'а и индекс выборки ряда скважины по времени
+            models.UniqueConstraint(
+                fields=['well', 'period', 'parameter', 'bucket_start'], name='mud_rollup_bucket_uniq'
+            ),
+        ]
+
+
+# Архив замеров завершенных скважин: файл .npz (сжатые колонки NumPy) в
+# хранилище 'mud_archive'. Логи из архива удалены из MudParameterLog, но
+# отдаются тем же API истории (wells/archive.py, команда archive_mud_logs).
+class MudLogArchive(models.Model):
+    well = models.ForeignKey(Well, on_delete=models.CASCADE, related_name='mud_log_archives', verbose_name="Скважина")
+    file = models.CharField(max_length=255, verbose_name="Файл в хранилище")
+    log_count = models.PositiveIntegerField(verbose_name="Замеров")
+    time_from = models.DateTimeField(verbose_name="Первый замер")
+    time_to = models.DateTimeField(verbose_name="Последний замер")
+    min_log_id = models.BigIntegerField(verbose_name="Минимальный ID замера")
+    max_log_id = models.BigIntegerField(verbose_name="Максимальный ID замера")
+    sha256 = models.CharField(max_length=64, verbose_name="Контрольная сумма файла")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата архивации")
+
+    def __str__(self):
+        return f"Архив {self.well_id}: {self.log_count} замеров {self.time_from:%Y-%m-%d} — {self.time_to:%Y-%m-%d}"
+
+    class Meta:
+        verbose_name = "Архив замеров"
+        verbose_name_plural = "Архивы замеров"
+        ordering = ['well', 'time_from']
+
+
+# Журнал удалений для синхронизации изменений (/api/changes/):
+# удаленную строку нельзя найти по updated_at, поэтому о ней остается запись.
+# Старые записи чистятся сами (см. signals.py, CHANGES_TOMBSTONE_DAYS).
+class Tombstone(models.Model):
+    class Kind(models.TextChoices):
+        WELL = 'well', 'Скважина'
+        NVP_INCIDENT = 'nvp_incident', 'Инцидент НВП'
+        TASK = 'task', 'Задача'
+        TENDER = 'tender', 'Тендер'
+
+    kind = models.CharField(max_length=20, choices=Kind.choices, verbose_name="Тип объекта")
+    object_id = models.BigIntegerField(verbose_name="ID удаленного объекта")
+    # Для НВП — скважина, карточка которой изменилась (счетчик НВП)
+    well_id = models.BigIntegerField(null=True, blank=True, verbose_name="ID скважины")
+    deleted_at = models.DateTimeField(default=timezone.now, verbose_name="Дата удаления")
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.object_id} удален(а) {self.deleted_at:%Y-%m-%d %H:%M}"
+
+    class Meta:
+        verbose_name = "Удаленный объект"
+        verbose_name_plural = "Удаленные объекты"
+        ordering = ['-deleted_at']
+        indexes = [
+            models.Index(fields=['deleted_at'], name='tombstone_deleted_at_idx'),
+        ]
+
+
+# Отпечатки уже обработанных сводок — защита от повторной обработки
+# (сводку вставили дважды, релей повторил запрос по таймауту и т.п.)
+class ProcessedSummary(models.Model):
+    content_hash = models.CharField(max_length=64, unique=True, verbose_name="Хэш нормализованной сводки")
+    well = models.ForeignKey(Well, on_delete=models.CASCADE, related_name='processed_summaries', verbose_name="Скважина")
+    mud_log = models.ForeignKey(
+        MudParameterLog,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Созданная запись параметров"
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата обработки")
+
+    def __str__(self):
+        return f"Сводка {self.content_hash[:12]} ({self.well.name})"
+
+    class Meta:
+        verbose_name = "Обработанная сводка"
+        verbose_name_plural = "Обработанные сводки"
+
+
+# История полученных сводок: только добавление, текст сжат zlib.
+# Из нее можно заново разобрать все сводки после исправления парсера
+# (команда replay_summaries).
+class ReceivedSummary(models.Model):
+    well = models.ForeignKey(
+        Well,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='received_summaries',
+        verbose_name="Скважина",
+        help_text="Пусто, если в сводке не нашлось названия скважины."
+    )
+    content_hash = models.CharField(max_length=64, db_index=True, verbose_name="Хэш нормализованной сводки")
+    compressed_text = models.BinaryField(verbose_name="Текст сводки (zlib)")
+    received_at = models.DateTimeField(default=timezone.now, verbose_name="Время получения")
+    mud_log = models.ForeignKey(
+        MudParameterLog,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Созданная запись параметров"
+    )
+
+    def __str__(self):
+        return f"Сводка {self.content_hash[:12]} от {self.received_at:%d.%m.%Y %H:%M}"
+
+    class Meta:
+        verbose_name = "Полученная сводка"
+        verbose_name_plural = "История сводок"
+        indexes = [
+            # Последняя сводка скважины и повтор истории по порядку
+            models.Index(fields=['well', 'received_at', 'id'], name='summary_well_received_idx'),
+        ]
 
 
 
@@ -287,3 +465,40 @@ class DepthIntervalNorms(models.Model):
     def __str__(self):
         return f"Интервал {self.start_depth}м - {self.end_depth}м"
 
+
+# Очередь фоновых задач в БД (правила и уведомления после приема сводки).
+# Обрабатывается командой run_jobs, внешний брокер не нужен.
+class Job(models.Model):
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'В очереди'
+        RUNNING = 'running', 'Выполняется'
+        DONE = 'done', 'Выполнена'
+        FAILED = 'failed', 'Ошибка'
+
+    kind = models.CharField(max_length=100, verbose_name="Тип задачи")
+    payload = models.JSONField(default=dict, blank=True, verbose_name="Параметры")
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PENDING,
+        verbose_name="Статус"
+    )
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Попыток")
+    max_attempts = models.PositiveIntegerField(default=5, verbose_name="Максимум попыток")
+    run_after = models.DateTimeField(default=timezone.now, verbose_name="Выполнить не раньше")
+    last_error = models.TextField(blank=True, verbose_name="Последняя ошибка")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.get_status_display()})"
+
+    class Meta:
+        verbose_name = "Фоновая задача"
+        verbose_name_plural = "Фоновые задачи"
+        ordering = ['-created_at']
+        indexes = [
+            # Выборка воркером: status=pending и run_after <= now
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+        ]
@@ -0,0 +1,157 @@
+# backend/wells/norm_index.py
+"""
+Индекс норм программ промывки в памяти процесса.
+
+Для каждой скважины один раз загружается вся программа
+(DrillingProgram -> ProgramSection -> DepthIntervalNorms) и раскладывается
+в отсортированные по глубине списки. Дальше поиск интервала по глубине —
+бинарный поиск без единого запроса к БД.
+
+Сброс: сигналы post_save/post_delete моделей программы (см. signals.py)
+очищают индекс в текущем процессе. Другие процессы (воркеры gunicorn,
+run_jobs) перечитывают программу не позже чем через NORM_INDEX_TTL секунд.
+"""
+import time
+import threading
+from bisect import bisect_right
+from collections import defaultdict
+from django.conf import settings
+from .models import DrillingProgram, ProgramSection
+
+
+class _DepthTable:
+    """
+    Интервалы, отсортированные по началу. max_ends[i] — наибольший конец
+    среди первых i+1 интервалов: позволяет остановить обратный проход,
+    как только ни один более ранний интервал не дотягивается до глубины.
+    """
+    __slots__ = ('starts', 'max_ends', 'items')
+
+    def __init__(self, items):
+        self.items = sorted(items, key=lambda item: (item[0].start_depth, item[0].pk))
+        self.starts = [interval.start_depth for interval, _ in self.items]
+        self.max_ends = []
+        max_end = float('-inf')
+        for interval, _ in self.items:
+            max_end = max(max_end, interval.end_depth)
+            self.max_ends.append(max_end)
+
+    def lookup(self, depth: float) -> list:
+        """Все (interval, section_type), где start_depth <= depth <= end_depth."""
+        found = []
+        i = bisect_right(self.starts, depth)
+        while i > 0 and self.max_ends[i - 1] >= depth:
+            i -= 1
+            interval, section_type = self.items[i]
+            if interval.end_depth >= depth:
+                found.append((interval, section_type))
+        return found
+
+
+class NormIndex:
+    """Нормы одной скважины."""
+    __slots__ = ('has_program', 'loaded_at', '_section_counts', '_by_section', '_all')
+
+    def __init__(self, has_program: bool, sections=()):
+        self.has_program = has_program
+        self.loaded_at = time.monotonic()
+        self._section_counts = defaultdict(int)
+        by_section = defaultdict(list)
+        all_items = []
+        for section in sections:
+            self._section_counts[section.section_type] += 1
+            for interval in section.intervals.all():
+                by_section[section.section_type].append((interval, section.section_type))
+                all_items.append((interval, section.section_type))
+        self._by_section = {section_type: _DepthTable(items) for section_type, items in by_section.items()}
+        self._all = _DepthTable(all_items)
+
+    def section_count(self, section_type: str) -> int:
+        """Сколько секций такого типа в программе (норма — ровно одна)."""
+        return self._section_counts.get(section_type, 0)
+
+    def intervals_at(self, section_type: str, depth: float) -> list:
+        """Интервалы норм секции, в которые попадает глубина."""
+        table = self._by_section.get(section_type)
+        return [interval for interval, _ in table.lookup(depth)] if table else []
+
+    def section_at(self, depth: float):
+        """
+        Тип секции по глубине: секция первого (по id) интервала программы,
+        в который попадает глубина. None — глубина вне программы.
+        """
+        found = self._all.lookup(depth)
+        if not found:
+            return None
+        return min(found, key=lambda item: item[0].pk)[1]
+
+
+_indexes = {}
+_lock = threading.Lock()
+_generation = 0 # растет при каждом сбросе: загруженное до сброса не кладем в индекс
+
+
+def _ttl() -> float:
+    return getattr(settings, 'NORM_INDEX_TTL', 60)
+
+
+def _load(well_ids) -> dict:
+    """Загружает программы нескольких скважин: 3 запроса, сколько бы скважин ни было."""
+    program_wells = set(DrillingProgram.objects.filter(well_id__in=well_ids).values_list('well_id', flat=True))
+    sections_by_well = defaultdict(list)
+    sections = (
+        ProgramSection.objects.filter(program__well_id__in=program_wells)
+        .select_related('program')
+        .prefetch_related('intervals')
+        .order_by('pk')
+    ) if program_wells else []
+    for section in sections:
+        sections_by_well[section.program.well_id].append(section)
+    return {
+        well_id: NormIndex(well_id in program_wells, sections_by_well.get(well_id, ()))
+        for well_id in well_ids
+    }
+
+
+def _store(loaded: dict, generation: int):
+    with _lock:
+        if generation == _generation:
+            _indexes.update(loaded)
+
+
+def warm_norm_indexes(wells):
+    """
+    Гарантирует, что индексы скважин загружены и не устарели.
+    Недостающие загружаются одним пакетом; теплый индекс не делает запросов.
+    """
+    now = time.monotonic()
+    ttl = _ttl()
+    generation = _generation
+    missing = []
+    for well in wells:
+        index = _indexes.get(well.pk)
+        if index is None or now - index.loaded_at > ttl:
+            missing.append(well.pk)
+    if missing:
+        _store(_load(missing), generation)
+
+
+def get_norm_index(well) -> NormIndex:
+    """Индекс норм скважины (при необходимости загружается)."""
+    index = _indexes.get(well.pk)
+    if index is None or time.monotonic() - index.loaded_at > _ttl():
+        generation = _generation
+        index = _load([well.pk])[well.pk]
+        _store({well.pk: index}, generation)
+    return index
+
+
+def invalidate_norm_index(well_id=None):
+    """Сбрасывает индекс одной скважины или (без аргумента) всех."""
+    global _generation
+    with _lock:
+        _generation += 1
+        if well_id is None:
+            _indexes.clear()
+        else:
+            _indexes.pop(well_id, None)
@@ -0,0 +1,127 @@
+# backend/wells/norms.py
+"""
+Единая проверка параметров раствора по нормам интервала.
+
+Список пар "параметр — границы" строится один раз при импорте, проверка —
+один проход по параметрам, каждому присваивается уровень ok / warning / critical:
+- warning: вышли за min/max нормы, но в пределах допуска;
+- critical: вышли за допуск.
+И флаг is_out_of_norm (валидатор), и тексты тревог (движок правил) берутся
+из одного и того же результата.
+"""
+from typing import NamedTuple
+from django.db import models
+from .models import MudParameterLog, DepthIntervalNorms
+
+OK = 'ok'
+WARNING = 'warning'
+CRITICAL = 'critical'
+
+LOW = 'low'
+HIGH = 'high'
+
+# Допуски (в единицах параметра) за пределами нормы, до которых отклонение — только предупреждение
+NORM_TOLERANCES = {
+    'density': 0.02,
+}
+
+
+class NormCheck(NamedTuple):
+    name: str
+    verbose_name: str
+    min_attr: str
+    max_attr: str
+    tolerance: float
+
+
+class ParamResult(NamedTuple):
+    name: str
+    verbose_name: str
+    value: float
+    norm_min: float | None
+    norm_max: float | None
+    tolerance: float
+    level: str
+    violations: tuple # ((LOW|HIGH, WARNING|CRITICAL), ...)
+
+
+def _build_norm_checks() -> tuple:
+    """Числовые параметры лога, для которых в интервале норм есть колонки _min/_max."""
+    norm_fields = {field.name for field in DepthIntervalNorms._meta.get_fields()}
+    return tuple(
+        NormCheck(
+            field.name,
+            str(field.verbose_name),
+            f"{field.name}_min",
+            f"{field.name}_max",
+            NORM_TOLERANCES.get(field.name, 0),
+        )
+        for field in MudParameterLog._meta.get_fields()
+        if isinstance(field, models.FloatField)
+        and f"{field.name}_min" in norm_fields and f"{field.name}_max" in norm_fields
+    )
+
+
+NORM_CHECKS = _build_norm_checks()
+
+
+class NormEvaluation:
+    """
+    Результат проверки.
+    levels — уровень каждого проверенного параметра (есть значение и хотя бы одна граница),
+    deviations — подробности только по вышедшим за норму.
+    """
+    __slots__ = ('levels', 'deviations')
+
+    def __init__(self, levels: dict, deviations: list):
+        self.levels = levels
+        self.deviations = deviations
+
+    @property
+    def is_out_of_norm(self) -> bool:
+        return bool(self.deviations)
+
+
+def evaluate_norms(values, norms) -> NormEvaluation:
+    """
+    Проверяет параметры по нормам за один проход.
+    values — словарь параметров (из парсера) или объект с атрибутами (MudParameterLog),
+    norms — интервал норм (DepthIntervalNorms).
+    """
+    # У экземпляра модели значения полей лежат в __dict__ — читаем их без дескрипторов
+    get_value = values.get if isinstance(values, dict) else values.__dict__.get
+    levels = {}
+    deviations = []
+
+    for check in NORM_CHECKS:
+        name = check.name
+        value = get_value(name)
+        if value is None:
+            continue
+        norm_min = getattr(norms, check.min_attr)
+        norm_max = getattr(norms, check.max_attr)
+        # Проверяем только если есть хотя бы одна граница
+        if norm_min is None and norm_max is None:
+            continue
+
+        low = norm_min is not None and value < norm_min
+        high = norm_max is not None and value > norm_max
+        if not (low or high):
+            levels[name] = OK
+            continue
+
+        tolerance = check.tolerance
+        level = OK
+        violations = ()
+        if low:
+            level = CRITICAL if value < norm_min - tolerance else WARNING
+            violations = ((LOW, level),)
+        if high:
+            high_level = CRITICAL if value > norm_max + tolerance else WARNING
+            violations += ((HIGH, high_level),)
+            if level != CRITICAL:
+                level = high_level
+        levels[name] = level
+        deviations.append(ParamResult(name, check.verbose_name, value, norm_min, norm_max, tolerance, level, violations))
+
+    return NormEvaluation(levels, deviations)
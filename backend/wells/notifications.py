@@ -1,17 +1,18 @@
 # backend/wells/notifications.py
 
-import requests
 import logging
 from django.conf import settings
 from html import escape
 from .models import Well
+from .telegram_dispatcher import get_dispatcher, TelegramSendError
 
 logger = logging.getLogger(__name__)
 
-def send_telegram_alert(well: Well, message: str):
+def send_telegram_alert(well: Well, message: str, raise_on_error: bool = False):
     """
     Отправляет сообщение-тревогу в Telegram.
     Безопасно экранирует текст, сохраняя теги <b> и <i>.
+    raise_on_error=True — пробросить временную ошибку (чтобы очередь задач повторила отправку).
     """
     bot_token = getattr(settings, 'TELEGRAM_ALERTS_BOT_TOKEN', None)
     chat_id = well.telegram_chat_id
@@ -37,24 +38,17 @@ def send_telegram_alert(well: Well, message: str):
 
     # Все остальные теги останутся экранированными → Telegram не упадёт
 
-    url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-    payload = {
-        'chat_id': chat_id,
-        'text': safe,
-        'parse_mode': 'HTML',
-    }
-
-    if topic_id:
-        payload['message_thread_id'] = topic_id
-
     try:
-        response = requests.post(url, json=payload, timeout=5)
-        response.raise_for_status()
+        # Диспетчер сам держит соединение, соблюдает лимиты Telegram,
+        # режет длинные сообщения и повторяет отправку при 429/5xx
+        get_dispatcher(bot_token).send_message(chat_id, safe, topic_id=topic_id)
         logger.info(
             f"Уведомление для скважины '{well.name}' успешно отправлено в чат {chat_id}."
         )
-    except requests.exceptions.RequestException as e:
+    except TelegramSendError as e:
         logger.error(
-            f"Ошибка при отправке уведомления в Telegram для скважины '{well.name}': {e}\n"
-            f"Текст ошибки Telegram: {getattr(e.response, 'text', None)}"
+            f"Ошибка при отправке уведомления в Telegram для скважины '{well.name}': {e}"
         )
+        # Повторять имеет смысл только временные ошибки (сеть, 429, 5xx)
+        if raise_on_error and e.retryable:
+            raise
@@ -0,0 +1,203 @@
+# backend/wells/pagination.py
+"""
+Курсорная (keyset) пагинация.
+
+Вместо OFFSET курсор хранит значения ключа сортировки последней строки
+страницы, и следующая страница запрашивается условием
+"(measurement_time, id) < (t, id)" по индексу. Поэтому сотая страница
+истории стоит столько же, сколько первая.
+
+Сортировка берется из view.cursor_ordering (или ordering класса).
+Последнее поле обязано быть уникальным (обычно id), а все поля — NOT NULL.
+Для nullable-полей сортируйте по аннотации с Coalesce.
+
+Вместо queryset можно передать MergedRows: queryset плюс внешние источники
+строк (история замеров вместе с архивом, wells/archive.py). Каждый источник
+сам отдает свою страницу после курсора в нужном порядке, а страницы
+сливаются — в памяти не больше page_size + 1 строк от каждого.
+"""
+import json
+import base64
+import datetime
+import decimal
+import heapq
+import functools
+import itertools
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class MergedRows:
+    """
+    queryset и источники с методом page(ordering, values, limit) -> список
+    объектов строго после ключа values в порядке ordering (ValueError/TypeError —
+    неверный курсор). Ключи строк из разных источников не должны совпадать.
+    """
+
+    def __init__(self, queryset, *sources):
+        self.queryset = queryset
+        self.sources = sources
+
+
+class KeysetPagination(BasePagination):
+    ordering = ('-id',)
+    page_size = 50
+    max_page_size = 500
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = "Неверный курсор."
+
+    def get_ordering(self, view) -> tuple:
+        return tuple(getattr(view, 'cursor_ordering', None) or self.ordering)
+
+    def get_page_size(self, request) -> int:
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    # --- курсор ---
+
+    @staticmethod
+    def _json_default(value):
+        # Полная точность: DjangoJSONEncoder режет время до миллисекунд,
+        # и курсор между строками с одинаковыми миллисекундами зациклился бы
+        if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+            return value.isoformat()
+        if isinstance(value, decimal.Decimal):
+            return str(value)
+        raise TypeError(f"Значение {value!r} нельзя положить в курсор")
+
+    def encode_cursor(self, reverse: bool, values) -> str:
+        data = json.dumps({'r': int(reverse), 'v': values}, default=self._json_default, separators=(',', ':'))
+        return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request, size: int):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)))
+            values = data['v']
+            if not isinstance(values, list) or len(values) != size:
+                raise ValueError
+            return bool(data['r']), values
+        except (ValueError, KeyError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def _after(ordering, values) -> Q:
+        """Строки строго после ключа values в порядке ordering (лексикографически)."""
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+        return condition
+
+    @staticmethod
+    def _key(obj, ordering) -> list:
+        return [getattr(obj, field.lstrip('-')) for field in ordering]
+
+    @staticmethod
+    def _compare(key, other, ordering) -> int:
+        for field, value, other_value in zip(ordering, key, other):
+            if value != other_value:
+                result = -1 if value < other_value else 1
+                return -result if field.startswith('-') else result
+        return 0
+
+    def _merged_page(self, merged: MergedRows, ordering, values, limit: int) -> list:
+        """Страница из queryset и источников MergedRows: каждый отдает до limit строк, затем слияние."""
+        queryset = merged.queryset
+        if values is not None:
+            queryset = queryset.filter(self._after(ordering, values))
+        pages = [list(queryset.order_by(*ordering)[:limit])]
+        try:
+            pages += [source.page(ordering, values, limit) for source in merged.sources]
+        except (ValueError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+        key = functools.cmp_to_key(lambda a, b: self._compare(a, b, ordering))
+        rows = heapq.merge(*pages, key=lambda row: key(self._key(row, ordering)))
+        return list(itertools.islice(rows, limit))
+
+    # --- пагинация ---
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        ordering = self.get_ordering(view)
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request, len(ordering))
+
+        reverse = bool(cursor and cursor[0])
+        # Назад — тот же запрос с обратной сортировкой, результат разворачиваем
+        query_ordering = tuple(
+            field[1:] if field.startswith('-') else f"-{field}" for field in ordering
+        ) if reverse else ordering
+
+        if isinstance(queryset, MergedRows):
+            rows = self._merged_page(queryset, query_ordering, cursor and cursor[1], page_size + 1)
+        else:
+            if cursor:
+                queryset = queryset.filter(self._after(query_ordering, cursor[1]))
+            rows = list(queryset.order_by(*query_ordering)[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        self.next_cursor = self.previous_cursor = None
+        if rows:
+            if has_more or reverse:
+                self.next_cursor = self.encode_cursor(False, self._key(rows[-1], ordering))
+            if (has_more and reverse) or (cursor and not reverse):
+                self.previous_cursor = self.encode_cursor(True, self._key(rows[0], ordering))
+        return rows
+
+    def _link(self, cursor):
+        if cursor is None:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        return self._link(self.next_cursor)
+
+    def get_previous_link(self):
+        return self._link(self.previous_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class MudLogPagination(KeysetPagination):
+    """История замеров: новые сверху, по индексу (well, measurement_time, id)."""
+    ordering = ('-measurement_time', '-id')
+    page_size = 100
+    max_page_size = 1000
+
+
+class DashboardPagination(KeysetPagination):
+    """Списки дашборда: обычно умещаются в одну страницу."""
+    page_size = 100
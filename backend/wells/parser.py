@@ -1,5 +1,7 @@
 # backend/wells/parser.py
 import re
+import hashlib
+import unicodedata
 from datetime import datetime
 
 def parse_summary(text: str) -> dict:
@@ -46,14 +48,251 @@ def parse_summary(text: str) -> dict:
         data['current_operations'] = current_ops_match.group(1).strip()
         
 
-    # Добавляем полный текст сводки для сохранения в БД
-    data['last_summary_text'] = text
+    # Полный текст сводки — для истории сводок (ReceivedSummary)
+    data['summary_text'] = text
 
     return data
 
 
+def summary_fingerprint(text: str) -> str:
+    """
+    Отпечаток сводки: sha256 от нормализованного текста.
+    Нормализация убирает то, что меняется при копировании/пересылке,
+    но не меняет смысл: форму юникода, переводы строк, лишние пробелы
+    и пустые строки.
+    """
+    normalized = unicodedata.normalize('NFKC', text)
+    normalized = '\n'.join(' '.join(line.split()) for line in normalized.splitlines() if line.strip())
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+# ========== Однопроходный парсер параметров раствора ==========
+# Все алиасы параметров собираются в ОДНО регулярное выражение при импорте
+# модуля. Порядок альтернатив повторяет порядок шагов эталонного парсера.
+
+_DASHED_VALUE = r'\s*-+\s*([\d.,]+)'
+
+# (вид токена, первая буква алиаса, остаток алиаса, нужна ли \b, хвост со значениями)
+_MUD_TOKENS = [
+    # Шаги 1-3: берется только ПЕРВОЕ совпадение
+    ('solid_phase_content', 'Т', 'Ф', True, _DASHED_VALUE),
+    ('filtration', 'Ф', '', True, _DASHED_VALUE),
+    ('yield_point', 'Д', 'Н[СC]', True, r'\s*-*\s*([\d.,]+)'),
+    # Шаг 4: простые параметры, берется последнее непустое значение
+    ('density', 'П', 'л', True, _DASHED_VALUE),
+    ('viscosity', 'У', 'В', True, _DASHED_VALUE),
+    ('plastic_viscosity', 'П', 'В', True, _DASHED_VALUE),
+    ('ph', 'P', 'H', True, _DASHED_VALUE),
+    ('chlorides', 'C', 'L', True, _DASHED_VALUE),
+    ('calcium_hardness', 'C', 'a', True, _DASHED_VALUE),
+    ('carbonate_content', 'м', 'ел', True, _DASHED_VALUE),
+    ('carbonate_content', 'C', 'aCO3', True, _DASHED_VALUE),
+    ('potassium', 'К', 'К*', True, _DASHED_VALUE),  # в старом парсере алиас 'К+' — это регулярка
+    ('potassium', 'K', '', True, _DASHED_VALUE),
+    ('lubricant', 'с', 'мазка', True, _DASHED_VALUE),
+    ('methylene_blue_test', 'М', 'БТ', True, _DASHED_VALUE),
+    ('methylene_blue_test', 'M', 'BT', True, _DASHED_VALUE),
+    # Шаги 5-6: пары значений, берется только ПЕРВОЕ совпадение
+    ('sns', 'С', 'НС', False, r'\s*-*\s*([\d.,]+)\s*/\s*([\d.,]+)'),
+    ('pfmf', 'P', 'f/mf', False, r'\s*-*\s*([\d.,]*)\s*/\s*([\d.,]*)'),
+]
+_FIRST_MATCH_KINDS = frozenset(['solid_phase_content', 'filtration', 'yield_point', 'sns', 'pfmf'])
+
+
+def _case_variants(letters: str) -> dict:
+    """
+    Возвращает для каждой буквы все символы, которые IGNORECASE считает ей
+    равными (например, у 'с' есть редкий двойник 'ᲃ', у 'K' — знак Кельвина).
+
+    Публичного API для таблицы регистровых эквивалентов у re нет, поэтому
+    спрашиваем сам движок: один findall по всей BMP. Вызывается один раз при
+    импорте (около 20 мс), строка из 65 тыс. символов сразу освобождается,
+    в памяти остается только словарь на десяток букв. Перечислить двойники
+    вручную нельзя: без них регистрозависимый первый класс в _MUD_TOKEN_RE
+    пропустит то, что эталонный парсер с IGNORECASE находит.
+    """
+    bmp = ''.join(map(chr, range(0x10000)))
+    found = re.findall(f'[{letters}]', bmp, re.IGNORECASE)
+    return {
+        letter: ''.join(ch for ch in found if re.fullmatch(letter, ch, re.IGNORECASE))
+        for letter in letters
+    }
+
+
+def _compile_mud_tokens():
+    """
+    Собирает общее регулярное выражение. Каждая группа альтернатив начинается
+    с регистрозависимого класса символов — так движок re отбрасывает
+    неподходящие альтернативы, не заходя в них. Возвращает выражение и
+    словарь "номер последней группы -> (вид токена, номер первой группы
+    значения, берется ли только первое совпадение)".
+    """
+    # Альтернативы с одним классом первой буквы (м/М, с/С с IGNORECASE дают
+    # один класс) — в одну группу: класс проверяется один раз на группу, а не
+    # на каждую альтернативу. Разные классы не пересекаются, порядок внутри
+    # группы сохранен, поэтому в каждой позиции побеждает та же альтернатива.
+    by_class = {}
+    for token in _MUD_TOKENS:
+        by_class.setdefault(_LETTER_VARIANTS[token[1]], []).append(token)
+
+    alternatives = []
+    group_kinds = {}
+    group = 0
+    for first_class, tokens in by_class.items():
+        branches = []
+        for kind, first, rest, word_bound, tail in tokens:
+            boundary = r'\b' if word_bound else ''
+            lookbehind = f'(?<={boundary}.)' if word_bound else ''
+            branches.append(f'{lookbehind}(?i:{rest}){boundary}{tail}')
+            # Группы нумеруются по порядку в тексте выражения
+            values = re.compile(tail).groups
+            group_kinds[group + values] = (kind, group + 1, kind in _FIRST_MATCH_KINDS)
+            group += values
+        alternatives.append(f'[{first_class}](?:' + '|'.join(branches) + ')')
+
+    first_chars = ''.join(sorted(set(''.join(_LETTER_VARIANTS.values()))))
+    pattern = re.compile(f'(?=[{first_chars}])(?:' + '|'.join(alternatives) + ')')
+    return pattern, group_kinds
+
+
+_LETTER_VARIANTS = _case_variants(''.join(dict.fromkeys(first for _, first, *_ in _MUD_TOKENS)))
+_MUD_TOKEN_RE, _GROUP_KINDS = _compile_mud_tokens()
+# Символы, которые остаток теряет при сборке raw_unparsed_params
+_REST_SEPARATORS = ' \t\n\r\f\v;,'
+# То же, что re.sub(r'СL', 'CL', text, flags=re.IGNORECASE), но с быстрым
+# поиском по первой букве
+_CL_RE = re.compile(f"[{_LETTER_VARIANTS['С']}](?i:L)")
+
+
+def _to_float(raw: str):
+    """Аналог clean_value для строк из цифр, точек и запятых."""
+    if not raw:
+        return None
+    raw = raw.replace(',', '.')
+    if raw.count('.') > 1:
+        # Оставляем только первую точку: "1.2.3" -> "1.23"
+        head, _, tail = raw.partition('.')
+        raw = head + '.' + tail.replace('.', '')
+    if raw == '.':
+        return None
+    return float(raw)
+
+
 def parse_mud_parameters(text: str) -> dict:
-    """Надёжный парсер параметров бурового раствора."""
+    """
+    Надёжный парсер параметров бурового раствора.
+    Извлекает все значения за один проход по тексту и возвращает
+    тот же словарь, что и пошаговый парсер (включая raw_unparsed_params).
+    """
+    # Нормализуем CL (без латинской L заменять нечего)
+    if 'L' in text or 'l' in text:
+        text = _CL_RE.sub('CL', text)
+
+    first_matches = {}  # вид токена -> первое совпадение
+    simple_values = {}
+    leftovers = []  # совпадения, которые пошаговый парсер оставил бы в остатке
+    pieces = []
+    add_piece = pieces.append
+    group_kinds = _GROUP_KINDS
+    pos = 0
+    glued = False  # два удаляемых совпадения идут вплотную друг к другу
+
+    # Горячий цикл: на сводку приходится десяток совпадений, поэтому без лишних
+    # вызовов — float напрямую (цифры \d он понимает те же, что isdigit),
+    # _to_float только для "1.2.3", "." и пустых значений
+    for m in _MUD_TOKEN_RE.finditer(text):
+        kind, group, first_only = group_kinds[m.lastindex]
+        if first_only:
+            first = first_matches.get(kind)
+            if first is None:
+                first_matches[kind] = (m, group)
+            elif first[0].group() != m.group():
+                leftovers.append(m.group())
+                continue
+        else:
+            raw = m[group]
+            try:
+                simple_values[kind] = float(raw.replace(',', '.'))
+            except ValueError:
+                value = _to_float(raw)
+                if value is not None:
+                    simple_values[kind] = value
+        start, end = m.span()
+        if start == pos and pieces:
+            glued = True
+        add_piece(text[pos:start])
+        pos = end
+
+    pieces.append(text[pos:])
+    remaining_text = ''.join(pieces)
+    # Обычная сводка разбирается целиком: в остатке только переводы строк и
+    # разделители, совпадений (они начинаются с буквы) в нем быть не может
+    only_separators = not remaining_text.strip(_REST_SEPARATORS)
+    if only_separators:
+        rescanned = []
+    elif leftovers:
+        rescanned = [m.group() for m in _MUD_TOKEN_RE.finditer(remaining_text)]
+    else:
+        rescanned = [] if _MUD_TOKEN_RE.search(remaining_text) is None else None
+
+    # Удаление совпадений "склеивает" соседний текст. Если после этого в остатке
+    # появились новые совпадения (или изменились ожидаемые), результат зависит от
+    # порядка шагов — отдаем такой текст эталонному парсеру.
+    if glued or rescanned != leftovers or not only_separators and \
+            any(m.group() in remaining_text for m, _ in first_matches.values()):
+        return _parse_mud_parameters_sequential(text)
+
+    found = {}
+    if first_matches:
+        for field in ('solid_phase_content', 'filtration', 'yield_point'):
+            if field in first_matches:
+                m, group = first_matches[field]
+                found[field] = _to_float(m[group])
+
+    found.update(simple_values)
+
+    if 'sns' in first_matches:
+        m, group = first_matches['sns']
+        found['gel_strength_10s'] = _to_float(m.group(group))
+        found['gel_strength_10m'] = _to_float(m.group(group + 1))
+
+    if 'pfmf' in first_matches:
+        m, group = first_matches['pfmf']
+        a, b = _to_float(m.group(group)), _to_float(m.group(group + 1))
+        if a is not None:
+            found['phenolphthalein_alkalinity'] = a
+        if b is not None:
+            found['methyl_orange_alkalinity'] = b
+
+    # Остаток
+    if not only_separators:
+        rest = ' '.join(remaining_text.replace(';', ' ').replace(',', ' ').split())
+        if rest:
+            found['raw_unparsed_params'] = rest
+
+    return found
+
+
+MUD_PARAMS_RE = re.compile(r'Параметры бурового раствора:\s*(.*)', re.DOTALL | re.IGNORECASE)
+
+
+def extract_mud_parameters(summary_text: str) -> dict:
+    """
+    Находит в сводке блок параметров бурового раствора и разбирает его.
+    Если блока нет — возвращает пустой словарь.
+    """
+    mud_params_text_match = MUD_PARAMS_RE.search(summary_text)
+    if not mud_params_text_match:
+        return {}
+    return parse_mud_parameters(mud_params_text_match.group(1))
+
+
+def _parse_mud_parameters_sequential(text: str) -> dict:
+    """
+    Эталонный пошаговый парсер параметров бурового раствора.
+    Используется как запасной путь для "склеенных" сводок, где однопроходный
+    разбор не может гарантировать тот же результат.
+    """
 
     # Нормализуем CL
     remaining_text = re.sub(r'СL', 'CL', text, flags=re.IGNORECASE)
@@ -83,7 +322,7 @@ def parse_mud_parameters(text: str) -> dict:
 
         try:
             return float(cleaned)
-        except:
+        except ValueError: # isdigit пропускает и надстрочные "²", которые float не берет
             return None
 
     # ========== ШАГ 1. ТФ ==========
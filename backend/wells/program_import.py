@@ -0,0 +1,270 @@
+# backend/wells/program_import.py
+"""
+Загрузка программы промывки из таблицы (XLSX или CSV) сразу на несколько скважин.
+
+Формат — одна строка на интервал, первая строка — заголовки:
+    Секция | Начало | Конец | Тип раствора | Плотность (Пл) мин | Плотность (Пл) макс | ...
+Секция — название (как в справочнике WellSection). Тип раствора — название
+из справочника MudType, колонку можно опустить. Для норм подходят и
+заголовки по именам полей: density_min, density_max и т.д. Пустая ячейка —
+граница не задана. Десятичная запятая допускается.
+
+Перед записью таблица проверяется целиком, и все ошибки возвращаются разом
+(ValidationError со списком): у интервала начало меньше конца, min не больше
+max, а интервалы одной секции идут встык — без перекрытий и без разрывов.
+
+Запись — одна транзакция и по одному bulk_create на программы, секции и
+интервалы, сколько бы ни было скважин. bulk_create не шлет сигналы, поэтому
+индекс норм сбрасывается явно, а история замеров скважин перепроверяется
+по новым нормам.
+"""
+import io
+import csv
+from typing import NamedTuple
+from openpyxl import load_workbook
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from .models import WellSection, MudType, DrillingProgram, ProgramSection, DepthIntervalNorms
+from .norms import NORM_CHECKS
+from .norm_index import invalidate_norm_index
+from .revalidation import revalidate_mud_logs
+
+SECTION_COLUMN = 'section'
+START_COLUMN = 'start_depth'
+END_COLUMN = 'end_depth'
+MUD_TYPE_COLUMN = 'mud_type'
+
+
+def _normalize(header) -> str:
+    return ' '.join(str(header or '').replace('ё', 'е').lower().split())
+
+
+def _build_column_aliases() -> dict:
+    """Нормализованный заголовок -> поле DepthIntervalNorms (или служебная колонка)."""
+    aliases = {
+        'секция': SECTION_COLUMN, 'тип секции': SECTION_COLUMN, SECTION_COLUMN: SECTION_COLUMN,
+        'начало': START_COLUMN, 'начало интервала': START_COLUMN, 'начало интервала (м)': START_COLUMN,
+        'от': START_COLUMN, START_COLUMN: START_COLUMN,
+        'конец': END_COLUMN, 'конец интервала': END_COLUMN, 'конец интервала (м)': END_COLUMN,
+        'до': END_COLUMN, END_COLUMN: END_COLUMN,
+        'тип раствора': MUD_TYPE_COLUMN, 'раствор': MUD_TYPE_COLUMN, MUD_TYPE_COLUMN: MUD_TYPE_COLUMN,
+    }
+    for check in NORM_CHECKS:
+        verbose = _normalize(check.verbose_name)
+        for attr, suffixes in ((check.min_attr, ('мин', 'min')), (check.max_attr, ('макс', 'max'))):
+            aliases[attr] = attr
+            for suffix in suffixes:
+                aliases[f'{verbose} {suffix}'] = attr
+    return aliases
+
+
+COLUMN_ALIASES = _build_column_aliases()
+SECTION_ALIASES = {
+    _normalize(value): value for value in WellSection.values
+} | {
+    _normalize(label): value for value, label in WellSection.choices
+}
+NORM_ATTRS = tuple(attr for check in NORM_CHECKS for attr in (check.min_attr, check.max_attr))
+
+
+class ParsedInterval(NamedTuple):
+    row: int # номер строки в файле (для сообщений)
+    section: str
+    start_depth: float
+    end_depth: float
+    mud_type: str | None
+    norms: dict # поле *_min/*_max -> значение
+
+
+# --- Чтение таблицы ---
+
+def _read_csv(content: bytes) -> list:
+    text = content.decode('utf-8-sig')
+    try:
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=';,\t')
+    except csv.Error:
+        dialect = csv.excel
+    return list(csv.reader(io.StringIO(text), dialect))
+
+
+def _read_xlsx(content: bytes) -> list:
+    workbook = load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+    try:
+        return [list(row) for row in workbook.worksheets[0].iter_rows(values_only=True)]
+    finally:
+        workbook.close()
+
+
+def read_table(file_obj, filename: str) -> list:
+    """Строки первого листа XLSX или CSV (список списков значений)."""
+    content = file_obj.read()
+    if filename.lower().endswith(('.xlsx', '.xlsm')):
+        try:
+            return _read_xlsx(content)
+        except Exception as e:
+            raise ValidationError(f"Не удалось прочитать файл Excel: {e}")
+    try:
+        return _read_csv(content)
+    except UnicodeDecodeError:
+        raise ValidationError("CSV должен быть в кодировке UTF-8.")
+
+
+def _number(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    value = str(value).strip().replace(' ', '').replace(',', '.')
+    return float(value) if value else None
+
+
+# --- Разбор и проверка ---
+
+def parse_program(rows: list) -> list:
+    """Интервалы программы из строк таблицы. Все ошибки — одним ValidationError."""
+    errors = []
+    rows = [(number, row) for number, row in enumerate(rows, 1) if any(str(cell or '').strip() for cell in row)]
+    if not rows:
+        raise ValidationError("Файл пуст.")
+
+    header_row, header = rows[0]
+    columns = {}
+    for index, title in enumerate(header):
+        field = COLUMN_ALIASES.get(_normalize(title))
+        if field is None:
+            if _normalize(title):
+                errors.append(f"Строка {header_row}: неизвестная колонка «{title}».")
+            continue
+        if field in columns:
+            errors.append(f"Строка {header_row}: колонка «{title}» повторяется.")
+        columns[field] = index
+    for required, title in ((SECTION_COLUMN, 'Секция'), (START_COLUMN, 'Начало'), (END_COLUMN, 'Конец')):
+        if required not in columns:
+            errors.append(f"Нет обязательной колонки «{title}».")
+    if errors:
+        raise ValidationError(errors)
+
+    intervals = []
+    for number, row in rows[1:]:
+        def cell(field):
+            index = columns.get(field)
+            return row[index] if index is not None and index < len(row) else None
+
+        section = SECTION_ALIASES.get(_normalize(cell(SECTION_COLUMN)))
+        if section is None:
+            errors.append(f"Строка {number}: неизвестная секция «{cell(SECTION_COLUMN)}».")
+            continue
+        values = {}
+        for field in (START_COLUMN, END_COLUMN) + NORM_ATTRS:
+            try:
+                values[field] = _number(cell(field))
+            except ValueError:
+                errors.append(f"Строка {number}: «{cell(field)}» — не число ({field}).")
+                values[field] = None
+        if values[START_COLUMN] is None or values[END_COLUMN] is None:
+            errors.append(f"Строка {number}: не указаны начало и конец интервала.")
+            continue
+        if values[START_COLUMN] >= values[END_COLUMN]:
+            errors.append(f"Строка {number}: начало интервала ({values[START_COLUMN]}) не меньше конца ({values[END_COLUMN]}).")
+        for check in NORM_CHECKS:
+            norm_min, norm_max = values[check.min_attr], values[check.max_attr]
+            if norm_min is not None and norm_max is not None and norm_min > norm_max:
+                errors.append(f"Строка {number}: {check.verbose_name} — min {norm_min} больше max {norm_max}.")
+        mud_type = str(cell(MUD_TYPE_COLUMN) or '').strip() or None
+        intervals.append(ParsedInterval(
+            number, section, values[START_COLUMN], values[END_COLUMN], mud_type,
+            {attr: values[attr] for attr in NORM_ATTRS},
+        ))
+
+    errors += _check_continuity(intervals)
+    if not intervals and not errors:
+        errors.append("В файле нет ни одного интервала.")
+    if errors:
+        raise ValidationError(errors)
+    return intervals
+
+
+def _check_continuity(intervals: list) -> list:
+    """Интервалы каждой секции должны идти встык: без перекрытий и разрывов."""
+    errors = []
+    by_section = {}
+    for interval in intervals:
+        by_section.setdefault(interval.section, []).append(interval)
+    for section, section_intervals in by_section.items():
+        section_intervals.sort(key=lambda interval: interval.start_depth)
+        for previous, current in zip(section_intervals, section_intervals[1:]):
+            if current.start_depth < previous.end_depth:
+                errors.append(
+                    f"Секция «{section}»: интервалы в строках {previous.row} и {current.row} перекрываются "
+                    f"({previous.start_depth}–{previous.end_depth} и {current.start_depth}–{current.end_depth})."
+                )
+            elif current.start_depth > previous.end_depth:
+                errors.append(
+                    f"Секция «{section}»: разрыв {previous.end_depth}–{current.start_depth} м "
+                    f"между строками {previous.row} и {current.row}."
+                )
+    return errors
+
+
+def _resolve_mud_types(intervals: list) -> dict:
+    names = {interval.mud_type for interval in intervals if interval.mud_type}
+    found = {mud_type.name.lower(): mud_type for mud_type in MudType.objects.filter(name__in=names)}
+    if len(found) < len(names):
+        # имена в справочнике могут отличаться регистром
+        found |= {mud_type.name.lower(): mud_type for mud_type in MudType.objects.all()}
+    missing = sorted(name for name in names if name.lower() not in found)
+    if missing:
+        raise ValidationError([f"Тип раствора «{name}» не найден в справочнике." for name in missing])
+    return found
+
+
+# --- Запись ---
+
+def apply_program(intervals: list, wells, name: str, replace: bool = False) -> dict:
+    """
+    Создает программу из intervals на каждой скважине wells.
+    Скважины, у которых программа уже есть, — ошибка, если не replace.
+    """
+    wells = list(wells)
+    if not wells:
+        raise ValidationError("Не выбрано ни одной скважины.")
+    mud_types = _resolve_mud_types(intervals)
+    sections = list(dict.fromkeys(interval.section for interval in intervals))
+
+    with transaction.atomic():
+        existing = DrillingProgram.objects.filter(well__in=wells)
+        if not replace and existing.exists():
+            names = ", ".join(existing.order_by('well__name').values_list('well__name', flat=True))
+            raise ValidationError(f"У скважин уже есть программа промывки: {names}.")
+        replaced = existing.delete()[1].get(DrillingProgram._meta.label, 0) if replace else 0
+
+        programs = DrillingProgram.objects.bulk_create([DrillingProgram(well=well, name=name) for well in wells])
+        program_sections = ProgramSection.objects.bulk_create([
+            ProgramSection(program=program, section_type=section) for program in programs for section in sections
+        ])
+        section_by_key = {(item.program_id, item.section_type): item for item in program_sections}
+        norms = DepthIntervalNorms.objects.bulk_create([
+            DepthIntervalNorms(
+                section=section_by_key[(program.pk, interval.section)],
+                start_depth=interval.start_depth,
+                end_depth=interval.end_depth,
+                mud_type=mud_types[interval.mud_type.lower()] if interval.mud_type else None,
+                **interval.norms,
+            )
+            for program in programs for interval in intervals
+        ])
+        transaction.on_commit(invalidate_norm_index)
+
+    revalidation = revalidate_mud_logs(well_ids=[well.pk for well in wells])
+    return {
+        'wells': len(programs),
+        'replaced': replaced,
+        'sections': len(program_sections),
+        'intervals': len(norms),
+        'revalidated_logs': revalidation['checked'],
+    }
+
+
+def import_program_file(file_obj, filename: str, wells, name: str, replace: bool = False) -> dict:
+    """Чтение, проверка и запись — для команды и действия админки."""
+    return apply_program(parse_program(read_table(file_obj, filename)), wells, name, replace=replace)
@@ -0,0 +1,130 @@
+# backend/wells/response_cache.py
+"""
+Кэш готовых ответов списков дашборда (/wells/, /tasks/, /tenders/).
+
+В кэше (алиас 'api' в CACHES: файловый по умолчанию, Redis — если задан
+REDIS_URL) лежат уже отрендеренные и сжатые gzip байты ответа вместе с
+ETag/Last-Modified. Теплое чтение — два обращения к кэшу, без запросов к БД
+и без сериализаторов; клиенту, который понимает gzip, байты отдаются как есть.
+
+Сброс точный, по группам: у каждой группы есть "поколение" в кэше, оно входит
+в ключ записей. Сигналы post_save/post_delete моделей группы (см. signals.py)
+после коммита транзакции меняют поколение — старые записи больше не читаются
+и доживают до TTL. Массовые записи без сигналов (bulk_update в ingest)
+вызывают invalidate_response_cache сами.
+"""
+import gzip
+import uuid
+import hashlib
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import parse_http_date_safe
+from .models import Well, NVPIncident, Task, Tender
+
+CACHE_ALIAS = 'api'
+
+# Группа кэша -> модели, от которых зависят ее ответы
+CACHE_GROUPS = {
+    'wells': (Well, NVPIncident),
+    'tasks': (Task,),
+    'tenders': (Tender,),
+}
+
+
+def response_cache():
+    return caches[CACHE_ALIAS]
+
+
+def _generation_key(group: str) -> str:
+    return f"api:generation:{group}"
+
+
+def cache_generations(groups) -> dict:
+    """Текущие поколения групп ({группа: токен}), одним обращением к кэшу."""
+    cache = response_cache()
+    keys = {group: _generation_key(group) for group in groups}
+    found = cache.get_many(list(keys.values()))
+    generations = {}
+    for group, key in keys.items():
+        generation = found.get(key)
+        if generation is None:
+            cache.add(key, uuid.uuid4().hex, timeout=None)
+            generation = cache.get(key)
+        generations[group] = generation
+    return generations
+
+
+def invalidate_response_cache(*groups):
+    """
+    Сбрасывает закэшированные ответы групп (без аргументов — всех).
+    Внутри транзакции сброс откладывается до коммита: иначе параллельный
+    запрос успел бы закэшировать старые данные под новым поколением.
+    """
+    groups = groups or tuple(CACHE_GROUPS)
+
+    def bump():
+        response_cache().set_many({_generation_key(group): uuid.uuid4().hex for group in groups}, timeout=None)
+
+    transaction.on_commit(bump)
+
+
+def groups_for_model(model) -> list:
+    return [group for group, models in CACHE_GROUPS.items() if model in models]
+
+
+class CachedListMixin:
+    """
+    Кэширует ответы list(). Ставится в MRO перед ConditionalListMixin:
+    промах кэша проходит обычный путь (валидатор, запрос, сериализация),
+    а отрендеренный ответ 200 сохраняется в finalize_response.
+    """
+    cache_group = None
+
+    def get_cache_timeout(self, request) -> int:
+        return getattr(settings, 'API_CACHE_TTL', 300)
+
+    def _response_cache_key(self, request) -> str:
+        source = "|".join([request.get_full_path(), request.accepted_media_type or ''])
+        digest = hashlib.sha1(source.encode()).hexdigest()
+        return f"api:response:{self.cache_group}:{cache_generations([self.cache_group])[self.cache_group]}:{digest}"
+
+    def list(self, request, *args, **kwargs):
+        self._cache_key = self._response_cache_key(request)
+        entry = response_cache().get(self._cache_key)
+        if entry is None:
+            return super().list(request, *args, **kwargs)
+
+        self._cache_key = None # отдаем из кэша — сохранять нечего
+        response = get_conditional_response(request, etag=entry['etag'], last_modified=entry['last_modified'])
+        if response is None:
+            if 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+                response = HttpResponse(entry['body'], content_type=entry['content_type'])
+                response['Content-Encoding'] = 'gzip'
+                # Как GZipMiddleware: сжатое представление получает слабый ETag
+                response['ETag'] = entry['etag'] if entry['etag'].startswith('W/') else f"W/{entry['etag']}"
+            else:
+                response = HttpResponse(gzip.decompress(entry['body']), content_type=entry['content_type'])
+                response['ETag'] = entry['etag']
+            if entry['last_modified_http']:
+                response['Last-Modified'] = entry['last_modified_http']
+        patch_vary_headers(response, ('Accept', 'Accept-Encoding'))
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        cache_key = getattr(self, '_cache_key', None)
+        if cache_key and response.status_code == 200 and response.has_header('ETag'):
+            response.render()
+            last_modified_http = response.get('Last-Modified')
+            response_cache().set(cache_key, {
+                'body': gzip.compress(response.content, compresslevel=6),
+                'content_type': response['Content-Type'],
+                'etag': response['ETag'],
+                'last_modified': parse_http_date_safe(last_modified_http) if last_modified_http else None,
+                'last_modified_http': last_modified_http,
+            }, timeout=self.get_cache_timeout(request))
+        return response
@@ -0,0 +1,185 @@
+# backend/wells/revalidation.py
+"""
+Перепроверка флага is_out_of_norm у истории замеров (после правки норм в админке).
+
+Логи читаются пачками и превращаются в массивы NumPy; для каждой скважины
+все ее логи пачки сверяются со всей таблицей интервалов одной векторной
+операцией. Логика та же, что у validate_mud_parameters + evaluate_norms:
+- норма берется, только если секция такого типа в программе одна и глубина
+  попадает ровно в один ее интервал, иначе отклонения нет;
+- отклонение — значение меньше *_min или больше *_max (без допусков).
+
+Логи без глубины/секции (записанные до миграции 0012) пропускаются и
+сохраняют прежний флаг: восстановить эти поля не из чего — в строке Well
+только текущие забой и секция. Исключение — замеры, у которых в истории
+сводок (ReceivedSummary) есть исходный текст: replay_summaries обновляет
+их на месте, с глубиной и секцией, после чего перепроверка их учтет. Сколько
+таких — в stats['skipped_replayable'].
+"""
+import logging
+from collections import defaultdict
+import numpy as np
+from django.db.models import Count, Q
+from .models import MudParameterLog, ProgramSection, DepthIntervalNorms, WellSection, ReceivedSummary
+from .norms import NORM_CHECKS
+
+logger = logging.getLogger(__name__)
+
+PARAM_NAMES = [check.name for check in NORM_CHECKS]
+MIN_ATTRS = [check.min_attr for check in NORM_CHECKS]
+MAX_ATTRS = [check.max_attr for check in NORM_CHECKS]
+
+SECTION_CODES = {section: code for code, section in enumerate(WellSection.values)}
+
+LOG_CHUNK_SIZE = 100_000
+UPDATE_CHUNK_SIZE = 5_000
+
+
+class WellNormArrays:
+    """Интервалы норм одной скважины в виде массивов (столбцы mins/maxs — PARAM_NAMES)."""
+    __slots__ = ('section', 'start', 'end', 'mins', 'maxs', 'section_ok')
+
+    def __init__(self, rows, section_counts):
+        columns = list(zip(*rows)) if rows else [()] * (3 + 2 * len(PARAM_NAMES))
+        # Неизвестный тип секции в программе (-2) не совпадет ни с одним логом (-1 или код)
+        self.section = np.array([SECTION_CODES.get(section, -2) for section in columns[0]], dtype=np.int64)
+        self.start = np.array(columns[1], dtype=float)
+        self.end = np.array(columns[2], dtype=float)
+        n_params = len(PARAM_NAMES)
+        self.mins = np.array(columns[3:3 + n_params], dtype=float).reshape(n_params, -1).T
+        self.maxs = np.array(columns[3 + n_params:], dtype=float).reshape(n_params, -1).T
+        # Норма применима, только если секция такого типа в программе ровно одна
+        self.section_ok = np.array(
+            [section_counts.get(section, 0) == 1 for section in WellSection.values], dtype=bool
+        )
+
+    def match(self, depth, section):
+        """
+        Интервал норм для каждого лога: (индексы интервалов, маска "норма применима").
+        section — коды SECTION_CODES (-1 — неизвестна). Где маска False, индекс не имеет смысла.
+        """
+        n_logs = len(depth)
+        if not len(self.start):
+            return np.zeros(n_logs, dtype=np.int64), np.zeros(n_logs, dtype=bool)
+
+        # match[i, j]: лог i попадает в интервал j своей секции
+        match = (
+            (section[:, None] == self.section[None, :])
+            & (self.start[None, :] <= depth[:, None])
+            & (depth[:, None] <= self.end[None, :])
+        )
+        applicable = match.sum(axis=1) == 1
+        applicable &= (section >= 0) & self.section_ok[np.clip(section, 0, None)]
+        return match.argmax(axis=1), applicable
+
+    def evaluate(self, depth, section, values):
+        """Векторно считает is_out_of_norm для логов (массивы одинаковой длины)."""
+        if not len(self.start):
+            return np.zeros(len(depth), dtype=bool)
+        interval, applicable = self.match(depth, section)
+        # Сравнения с NaN (нет значения или нет границы) дают False — как пропуск в evaluate_norms
+        out_of_norm = ((values < self.mins[interval]) | (values > self.maxs[interval])).any(axis=1)
+        return out_of_norm & applicable
+
+
+def load_well_norm_arrays(well_ids) -> dict:
+    """Таблицы норм для набора скважин: два запроса на всех."""
+    section_counts = defaultdict(dict)
+    counts = (
+        ProgramSection.objects.filter(program__well_id__in=well_ids)
+        .values_list('program__well_id', 'section_type')
+        .annotate(n=Count('id'))
+    )
+    for well_id, section_type, n in counts:
+        section_counts[well_id][section_type] = n
+
+    rows_by_well = defaultdict(list)
+    intervals = DepthIntervalNorms.objects.filter(section__program__well_id__in=well_ids).values_list(
+        'section__program__well_id', 'section__section_type', 'start_depth', 'end_depth', *MIN_ATTRS, *MAX_ATTRS
+    )
+    for well_id, *row in intervals:
+        rows_by_well[well_id].append(row)
+
+    return {well_id: WellNormArrays(rows_by_well.get(well_id, []), section_counts.get(well_id, {})) for well_id in well_ids}
+
+
+def _write_flags(ids, value: bool):
+    ids = ids.tolist()
+    for start in range(0, len(ids), UPDATE_CHUNK_SIZE):
+        MudParameterLog.objects.filter(pk__in=ids[start:start + UPDATE_CHUNK_SIZE]).update(is_out_of_norm=value)
+
+
+def revalidate_mud_logs(well_ids=None, dry_run: bool = False) -> dict:
+    """
+    Пересчитывает is_out_of_norm для логов указанных скважин (или всех)
+    и записывает только изменившиеся флаги. Возвращает статистику.
+    """
+    logs = MudParameterLog.objects.all()
+    if well_ids is not None:
+        logs = logs.filter(well_id__in=list(well_ids))
+
+    skipped = logs.filter(Q(depth__isnull=True) | Q(section__isnull=True))
+    stats = {
+        'checked': 0,
+        'changed': 0,
+        'set_out_of_norm': 0,
+        'cleared': 0,
+        'skipped': skipped.count(),
+        'skipped_replayable': 0,
+    }
+    if stats['skipped']:
+        stats['skipped_replayable'] = (
+            ReceivedSummary.objects.filter(mud_log__in=skipped).values('mud_log').distinct().count()
+        )
+    logs = logs.filter(depth__isnull=False, section__isnull=False)
+    norms_by_well = {}
+    changed_wells = set()
+    last_id = 0
+
+    while True:
+        rows = list(
+            logs.filter(pk__gt=last_id).order_by('pk')
+            .values_list('pk', 'well_id', 'is_out_of_norm', 'depth', 'section', *PARAM_NAMES)[:LOG_CHUNK_SIZE]
+        )
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        columns = list(zip(*rows))
+        ids = np.array(columns[0], dtype=np.int64)
+        wells = np.array(columns[1], dtype=np.int64)
+        current = np.array(columns[2], dtype=bool)
+        depth = np.array(columns[3], dtype=float)
+        section = np.array([SECTION_CODES.get(value, -1) for value in columns[4]], dtype=np.int64)
+        values = np.array(columns[5:], dtype=float).T # None -> NaN
+
+        # Группируем логи пачки по скважинам: одна сортировка вместо маски на каждую скважину
+        order = np.argsort(wells, kind='stable')
+        chunk_wells, starts = np.unique(wells[order], return_index=True)
+        missing = [int(well_id) for well_id in chunk_wells if int(well_id) not in norms_by_well]
+        if missing:
+            norms_by_well.update(load_well_norm_arrays(missing))
+
+        new = np.zeros(len(ids), dtype=bool)
+        for well_id, selected in zip(chunk_wells, np.split(order, starts[1:])):
+            new[selected] = norms_by_well[int(well_id)].evaluate(depth[selected], section[selected], values[selected])
+
+        changed = new != current
+        to_set, to_clear = ids[changed & new], ids[changed & ~new]
+        stats['checked'] += len(ids)
+        stats['changed'] += int(changed.sum())
+        stats['set_out_of_norm'] += len(to_set)
+        stats['cleared'] += len(to_clear)
+
+        if not dry_run:
+            _write_flags(to_set, True)
+            _write_flags(to_clear, False)
+            changed_wells.update(int(well_id) for well_id in np.unique(wells[changed]))
+
+    if changed_wells:
+        # Счетчики "вне нормы" в часовых/суточных сводках устарели
+        from .rollups import rebuild_rollups # rollups -> timeseries -> revalidation
+        rebuild_rollups(sorted(changed_wells))
+
+    logger.info(f"Перепроверка истории замеров: {stats}")
+    return stats
@@ -0,0 +1,287 @@
+# backend/wells/rollups.py
+"""
+Часовые и суточные сводки параметров раствора (MudParameterRollup).
+
+Для каждой скважины, параметра и часа/суток хранятся min, max, сумма,
+число замеров и число замеров вне нормы. Графики и отчеты за недели
+читают сотни строк сводки вместо десятков тысяч сырых логов.
+
+Пополнение инкрементальное: при записи замеров (process_summary, пакетный
+прием) их значения добавляются к сводке одним upsert'ом
+(INSERT ... ON CONFLICT DO UPDATE), в той же транзакции, что и сами логи.
+Удаление или правка лога (админка) и перепроверка флагов по нормам
+пересобирают затронутые сутки скважины из сырых логов. Полная пересборка
+(backfill) — команда rebuild_mud_rollups.
+
+Границы часов и суток — в часовом поясе проекта (TIME_ZONE).
+"""
+import threading
+from datetime import timedelta
+import numpy as np
+from django.db import connection, transaction
+from django.db.models import Count, Sum, Min, Max, Q
+from django.db.models.functions import TruncHour, TruncDay
+from django.utils import timezone
+from .models import MudParameterLog, MudParameterRollup
+from .timeseries import TIMESERIES_PARAMS
+from .archive import iter_archives, to_microseconds, from_microseconds
+
+ROLLUP_PARAMS = TIMESERIES_PARAMS
+PERIODS = (MudParameterRollup.Period.HOUR, MudParameterRollup.Period.DAY)
+TRUNC_FUNCTIONS = {
+    MudParameterRollup.Period.HOUR: TruncHour,
+    MudParameterRollup.Period.DAY: TruncDay,
+}
+INSERT_CHUNK_SIZE = 5000
+# Шаг, на который делятся смещения часовых поясов: замеры одного 15-минутного
+# слота UTC всегда попадают в одни и те же локальные час и сутки
+_SLOT_MICROSECONDS = 15 * 60 * 1_000_000
+
+# Функции "меньшее/большее из двух" для upsert'а
+_UPSERT_FUNCTIONS = {
+    'postgresql': ('LEAST', 'GREATEST'),
+    'sqlite': ('MIN', 'MAX'),
+}
+
+
+def bucket_start(moment, period: str):
+    local = timezone.localtime(moment)
+    if period == MudParameterRollup.Period.HOUR:
+        return local.replace(minute=0, second=0, microsecond=0)
+    return local.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def collect_log_buckets(logs) -> dict:
+    """
+    Складывает замеры по корзинам в памяти:
+    {(well_id, period, parameter, bucket_start): [count, out_of_norm_count, total, min, max]}
+    """
+    buckets = {}
+    for log_entry in logs:
+        out_of_norm = int(bool(log_entry.is_out_of_norm))
+        starts = [(period, bucket_start(log_entry.measurement_time, period)) for period in PERIODS]
+        for param in ROLLUP_PARAMS:
+            value = getattr(log_entry, param)
+            if value is None:
+                continue
+            for period, start in starts:
+                key = (log_entry.well_id, period, param, start)
+                entry = buckets.get(key)
+                if entry is None:
+                    buckets[key] = [1, out_of_norm, value, value, value]
+                else:
+                    entry[0] += 1
+                    entry[1] += out_of_norm
+                    entry[2] += value
+                    entry[3] = min(entry[3], value)
+                    entry[4] = max(entry[4], value)
+    return buckets
+
+
+def _upsert_sql() -> str:
+    least, greatest = _UPSERT_FUNCTIONS[connection.vendor]
+    quote = connection.ops.quote_name
+    table = quote(MudParameterRollup._meta.db_table)
+    key_columns = ['well_id', 'period', 'parameter', 'bucket_start']
+    columns = key_columns + ['count', 'out_of_norm_count', 'total', 'min_value', 'max_value']
+    updates = [
+        f"{quote(name)} = {table}.{quote(name)} + EXCLUDED.{quote(name)}"
+        for name in ('count', 'out_of_norm_count', 'total')
+    ] + [
+        f"{quote('min_value')} = {least}({table}.{quote('min_value')}, EXCLUDED.{quote('min_value')})",
+        f"{quote('max_value')} = {greatest}({table}.{quote('max_value')}, EXCLUDED.{quote('max_value')})",
+    ]
+    return (
+        f"INSERT INTO {table} ({', '.join(quote(name) for name in columns)}) "
+        f"VALUES ({', '.join(['%s'] * len(columns))}) "
+        f"ON CONFLICT ({', '.join(quote(name) for name in key_columns)}) DO UPDATE SET {', '.join(updates)}"
+    )
+
+
+def _upsert_buckets(buckets: dict):
+    if not buckets:
+        return
+    adapt = connection.ops.adapt_datetimefield_value
+    rows = [
+        (well_id, period, param, adapt(start), *entry)
+        for (well_id, period, param, start), entry in buckets.items()
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(_upsert_sql(), rows)
+
+
+def add_logs_to_rollups(logs):
+    """
+    Добавляет новые замеры к сводкам. У логов уже должны быть окончательные
+    measurement_time и is_out_of_norm. Один executemany на весь пакет.
+    """
+    _upsert_buckets(collect_log_buckets(logs))
+
+
+def collect_archive_buckets(well_id: int, columns: dict, start=None, end=None) -> dict:
+    """
+    То же, что collect_log_buckets, но прямо по колонкам архива (wells/archive.py)
+    за start <= время < end, без объектов MudParameterLog. Корзина считается
+    один раз на 15-минутный слот, значения складываются через np.bincount.
+    """
+    times = columns['measurement_time']
+    mask = np.ones(len(times), dtype=bool)
+    if start:
+        mask &= times >= to_microseconds(start)
+    if end:
+        mask &= times < to_microseconds(end)
+    if not mask.any():
+        return {}
+    slots, slot_index = np.unique(times[mask] // _SLOT_MICROSECONDS, return_inverse=True)
+    out_of_norm = columns['is_out_of_norm'][mask].astype(np.int64)
+
+    buckets = {}
+    for period in PERIODS:
+        starts = {}
+        slot_bucket = np.array([
+            starts.setdefault(bucket_start(from_microseconds(slot * _SLOT_MICROSECONDS), period), len(starts))
+            for slot in slots.tolist()
+        ])
+        bucket_index = slot_bucket[slot_index]
+        size = len(starts)
+        for param in ROLLUP_PARAMS:
+            values = columns[param][mask]
+            present = ~np.isnan(values)
+            if not present.any():
+                continue
+            index, values = bucket_index[present], values[present]
+            counts = np.bincount(index, minlength=size)
+            bad = np.bincount(index, weights=out_of_norm[present], minlength=size)
+            totals = np.bincount(index, weights=values, minlength=size)
+            minimums = np.full(size, np.inf)
+            maximums = np.full(size, -np.inf)
+            np.minimum.at(minimums, index, values)
+            np.maximum.at(maximums, index, values)
+            for moment, i in starts.items():
+                if counts[i]:
+                    buckets[(well_id, period, param, moment)] = [
+                        int(counts[i]), int(bad[i]), float(totals[i]), float(minimums[i]), float(maximums[i]),
+                    ]
+    return buckets
+
+
+def _day_range(time_from, time_to):
+    """Расширяет период до целых суток: пересобираются и часовые, и суточные корзины."""
+    start = bucket_start(time_from, MudParameterRollup.Period.DAY) if time_from else None
+    end = bucket_start(time_to, MudParameterRollup.Period.DAY) + timedelta(days=1) if time_to else None
+    return start, end
+
+
+def rebuild_rollups(well_ids=None, time_from=None, time_to=None) -> int:
+    """
+    Пересобирает сводки из сырых логов (скважины well_ids или все, период
+    time_from..time_to или вся история). Агрегирует база: один GROUP BY
+    на период по всем параметрам сразу; замеры из архивов (wells/archive.py)
+    досчитываются upsert'ом по одному архиву — в памяти не больше одного
+    файла. Возвращает число строк сводки.
+    """
+    start, end = _day_range(time_from, time_to)
+    logs = MudParameterLog.objects.all()
+    rollups = MudParameterRollup.objects.all()
+    if well_ids is not None:
+        logs = logs.filter(well_id__in=list(well_ids))
+        rollups = rollups.filter(well_id__in=list(well_ids))
+    if start:
+        logs = logs.filter(measurement_time__gte=start)
+        rollups = rollups.filter(bucket_start__gte=start)
+    if end:
+        logs = logs.filter(measurement_time__lt=end)
+        rollups = rollups.filter(bucket_start__lt=end)
+
+    aggregates = {}
+    for param in ROLLUP_PARAMS:
+        aggregates[f'n_{param}'] = Count(param)
+        aggregates[f'bad_{param}'] = Count(param, filter=Q(is_out_of_norm=True))
+        aggregates[f'sum_{param}'] = Sum(param)
+        aggregates[f'min_{param}'] = Min(param)
+        aggregates[f'max_{param}'] = Max(param)
+
+    created = 0
+    with transaction.atomic():
+        rollups.delete()
+        for period in PERIODS:
+            trunc = TRUNC_FUNCTIONS[period]('measurement_time', tzinfo=timezone.get_current_timezone())
+            rows = logs.annotate(bucket=trunc).values('well_id', 'bucket').annotate(**aggregates).order_by()
+            batch = []
+            for row in rows.iterator(chunk_size=2000):
+                for param in ROLLUP_PARAMS:
+                    if not row[f'n_{param}']:
+                        continue
+                    batch.append(MudParameterRollup(
+                        well_id=row['well_id'], period=period, parameter=param, bucket_start=row['bucket'],
+                        count=row[f'n_{param}'], out_of_norm_count=row[f'bad_{param}'], total=row[f'sum_{param}'],
+                        min_value=row[f'min_{param}'], max_value=row[f'max_{param}'],
+                    ))
+                if len(batch) >= INSERT_CHUNK_SIZE:
+                    MudParameterRollup.objects.bulk_create(batch)
+                    created += len(batch)
+                    batch = []
+            MudParameterRollup.objects.bulk_create(batch)
+            created += len(batch)
+        for archive, columns in iter_archives(well_ids, start, end, cache=False):
+            _upsert_buckets(collect_archive_buckets(archive.well_id, columns, start, end))
+    return created
+
+
+# --- Пересборка затронутых суток после удаления/правки логов ---
+
+_pending = threading.local()
+
+
+def _rebuild_pending_days():
+    days = getattr(_pending, 'days', None)
+    _pending.days = None
+    if not days:
+        return
+    by_well = {}
+    for well_id, day in days:
+        by_well.setdefault(well_id, []).append(day)
+    for well_id, well_days in by_well.items():
+        if None in well_days:
+            rebuild_rollups([well_id])
+        else:
+            rebuild_rollups([well_id], min(well_days), max(well_days))
+
+
+def schedule_rollup_rebuild(well_id: int, moment=None):
+    """
+    Сутки скважины, в которые попадает moment (None — вся история скважины),
+    пересоберутся после коммита. Удаление сотни логов одной скважины дает
+    одну пересборку, а не сотню: первый коллбэк забирает все накопленное,
+    остальные находят пустой набор.
+    """
+    days = getattr(_pending, 'days', None)
+    if days is None:
+        days = _pending.days = set()
+    days.add((well_id, bucket_start(moment, MudParameterRollup.Period.DAY) if moment else None))
+    transaction.on_commit(_rebuild_pending_days)
+
+
+def rollup_series(well_id: int, period: str, params, time_from=None, time_to=None) -> dict:
+    """Ряды сводки скважины: {param: {t, min, max, mean, count, out_of_norm}} (t — мс Unix-времени)."""
+    rollups = MudParameterRollup.objects.filter(well_id=well_id, period=period, parameter__in=params)
+    if time_from:
+        rollups = rollups.filter(bucket_start__gte=bucket_start(time_from, period))
+    if time_to:
+        rollups = rollups.filter(bucket_start__lte=time_to)
+    series = {
+        param: {'t': [], 'min': [], 'max': [], 'mean': [], 'count': [], 'out_of_norm': []}
+        for param in params
+    }
+    rows = rollups.order_by('parameter', 'bucket_start').values_list(
+        'parameter', 'bucket_start', 'count', 'out_of_norm_count', 'total', 'min_value', 'max_value'
+    )
+    for param, start, count, out_of_norm, total, min_value, max_value in rows:
+        item = series[param]
+        item['t'].append(int(start.timestamp() * 1000))
+        item['min'].append(min_value)
+        item['max'].append(max_value)
+        item['mean'].append(total / count)
+        item['count'].append(count)
+        item['out_of_norm'].append(out_of_norm)
+    return series
@@ -1,7 +1,9 @@
 # backend/wells/rules_engine.py
 import logging
-from django.db import models
 from .models import MudParameterLog, Well
+from .norms import evaluate_norms, CRITICAL, LOW
+from .validator import get_interval_norms
+from .trends import check_trends
 
 logger = logging.getLogger(__name__)
 
@@ -33,53 +35,22 @@ def check_bicarbonate_risk(params: MudParameterLog) -> tuple[str, str] | None:
 
 def check_basic_norms(params: MudParameterLog, norms) -> dict:
     """
-    Проверяет выход за min/max нормы с учетом допусков.
+    Проверяет выход за min/max нормы с учетом допусков (см. norms.evaluate_norms).
     Возвращает словарь {'critical': [...], 'warning': [...]}.
     """
     alerts = get_default_alerts_dict()
-    
-    TOLERANCES = {
-        'density': 0.02,
-    }
 
-    param_fields = [f for f in MudParameterLog._meta.get_fields() if isinstance(f, models.FloatField)]
-
-    for field in param_fields:
-        param_name = field.name
-        measured_value = getattr(params, param_name)
-        if measured_value is None: continue
-
-        norm_min = getattr(norms, f"{param_name}_min", None)
-        norm_max = getattr(norms, f"{param_name}_max", None)
-        tolerance = TOLERANCES.get(param_name, 0)
-        verbose_name = field.verbose_name
-
-        # Проверяем только если есть хотя бы одна граница
-        if norm_min is not None or norm_max is not None:
-            # Определяем "жесткие" и "мягкие" границы
-            hard_min = (norm_min - tolerance) if norm_min is not None else None
-            hard_max = (norm_max + tolerance) if norm_max is not None else None
-            soft_min = norm_min
-            soft_max = norm_max
-
-            # --- Логика трехуровневой проверки ---
-            if (hard_min is not None and measured_value < hard_min):
-                msg = (f"🔴 <b>КРИТИЧЕСКОЕ ОТКЛОНЕНИЕ (НИЖЕ НОРМЫ):</b> {verbose_name}\n"
-                       f"<i>Факт: <b>{measured_value}</b>, Норма: [{norm_min}-{norm_max}], Допуск: {tolerance}</i>")
-                alerts['critical'].append(msg)
-            elif (soft_min is not None and measured_value < soft_min):
-                msg = (f"🟡 <b>Предупреждение (выход за норму):</b> {verbose_name}\n"
-                       f"<i>Факт: <b>{measured_value}</b> (в допуске), Норма: {norm_min}</i>")
-                alerts['warning'].append(msg)
-            
-            if (hard_max is not None and measured_value > hard_max):
-                msg = (f"🔴 <b>КРИТИЧЕСКОЕ ОТКЛОНЕНИЕ (ВЫШЕ НОРМЫ):</b> {verbose_name}\n"
-                       f"<i>Факт: <b>{measured_value}</b>, Норма: [{norm_min}-{norm_max}], Допуск: {tolerance}</i>")
-                alerts['critical'].append(msg)
-            elif (soft_max is not None and measured_value > soft_max):
-                msg = (f"🟡 <b>Предупреждение (выход за норму):</b> {verbose_name}\n"
-                       f"<i>Факт: <b>{measured_value}</b> (в допуске), Норма: {soft_max}</i>")
-                alerts['warning'].append(msg)
+    for result in evaluate_norms(params, norms).deviations:
+        for side, level in result.violations:
+            if level == CRITICAL:
+                direction = "НИЖЕ НОРМЫ" if side == LOW else "ВЫШЕ НОРМЫ"
+                msg = (f"🔴 <b>КРИТИЧЕСКОЕ ОТКЛОНЕНИЕ ({direction}):</b> {result.verbose_name}\n"
+                       f"<i>Факт: <b>{result.value}</b>, Норма: [{result.norm_min}-{result.norm_max}], Допуск: {result.tolerance}</i>")
+            else:
+                norm = result.norm_min if side == LOW else result.norm_max
+                msg = (f"🟡 <b>Предупреждение (выход за норму):</b> {result.verbose_name}\n"
+                       f"<i>Факт: <b>{result.value}</b> (в допуске), Норма: {norm}</i>")
+            alerts[level].append(msg)
 
     return alerts
 
@@ -99,21 +70,19 @@ def run_all_rules(log_entry: MudParameterLog) -> dict:
         final_alerts[level].append(message)
 
     # 2. Запускаем проверку по базовым нормам
-    try:
-        # Вот правильная логика поиска
-        current_program_section = log_entry.well.drilling_program.sections.get(section_type=log_entry.well.current_section)
-        interval_norms = current_program_section.intervals.get(
-            start_depth__lte=log_entry.well.current_depth,
-            end_depth__gte=log_entry.well.current_depth
-        )
-        
+    # (по индексу норм — без запросов к БД, если индекс скважины уже загружен)
+    interval_norms = get_interval_norms(well, well.current_depth)
+    if interval_norms is not None:
         basic_alerts = check_basic_norms(log_entry, interval_norms)
         final_alerts['critical'].extend(basic_alerts['critical'])
         final_alerts['warning'].extend(basic_alerts['warning'])
-        
-    except Exception as e:
-        # Логируем конкретную ошибку
-        logger.warning(f"Нормы для скважины {well.name} не найдены. Ошибка: {e}")
+    else:
+        logger.warning(f"Нормы для скважины {well.name} не найдены.")
+
+    # 3. Правила по трендам (по буферу последних замеров в памяти)
+    trend_alerts = check_trends(log_entry)
+    final_alerts['critical'].extend(trend_alerts['critical'])
+    final_alerts['warning'].extend(trend_alerts['warning'])
 
     logger.info(f"Движок правил обнаружил {len(final_alerts['critical'])} крит. и {len(final_alerts['warning'])} предупр. тревог.")
     return final_alerts
\ No newline at end of file
@@ -1,18 +1,84 @@
 # backend/wells/serializers.py
 
+from django.db.models import Count
 from rest_framework import serializers
-from .models import Well,Task, NVPIncident, Tender 
+from .models import Well,Task, NVPIncident, Tender, MudParameterLog, MudParameterRollup
+from .timeseries import TIMESERIES_PARAMS, DEFAULT_POINTS, MAX_POINTS
+from .export import EXPORT_FORMATS
+from .summary_history import latest_summary_subquery, has_summary_expression, latest_summary_text
+from .metrics import TimedSerializerMixin, TimedListSerializer
 
-class NVPIncidentSerializer(serializers.ModelSerializer):
+
+def _query_param_list(request, name) -> list:
+    """?name=a,b&name=c -> ['a', 'b', 'c']"""
+    values = []
+    for raw in request.query_params.getlist(name):
+        values.extend(value.strip() for value in raw.split(',') if value.strip())
+    return values
+
+
+class SparseFieldsetsMixin:
+    """
+    Разреженные наборы полей по параметрам запроса:
+    ?fields=id,name — вернуть только перечисленные поля;
+    ?expand=nvp_incidents — добавить вложенные связи из Meta.expandable_fields.
+
+    optimize_queryset() подгоняет запрос под итоговый набор полей:
+    Meta.prefetch_fields  {поле: lookup для prefetch_related},
+    Meta.annotated_fields {поле: выражение для annotate},
+    Meta.deferred_fields  (поля модели, которые не читаем из БД, если их не просили).
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None:
+            return
+
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+        expand = _query_param_list(request, 'expand')
+        unknown = [name for name in expand if name not in expandable]
+        if unknown:
+            raise serializers.ValidationError({'expand': [f"Нельзя раскрыть: {', '.join(unknown)}. Доступно: {', '.join(expandable) or '-'}"]})
+        for name in expand:
+            serializer_class, serializer_kwargs = expandable[name]
+            self.fields[name] = serializer_class(**serializer_kwargs)
+
+        requested = _query_param_list(request, 'fields')
+        if requested:
+            unknown = [name for name in requested if name not in self.fields]
+            if unknown:
+                raise serializers.ValidationError({'fields': [f"Неизвестные поля: {', '.join(unknown)}"]})
+            keep = set(requested) | set(expand)
+            for name in list(self.fields):
+                if name not in keep:
+                    self.fields.pop(name)
+
+    def optimize_queryset(self, queryset):
+        fields = self.fields
+        prefetches = [lookup for name, lookup in getattr(self.Meta, 'prefetch_fields', {}).items() if name in fields]
+        annotations = {name: expression for name, expression in getattr(self.Meta, 'annotated_fields', {}).items() if name in fields}
+        deferred = [name for name in getattr(self.Meta, 'deferred_fields', ()) if name not in fields]
+        if prefetches:
+            queryset = queryset.prefetch_related(*prefetches)
+        if annotations:
+            queryset = queryset.annotate(**annotations)
+        if deferred:
+            queryset = queryset.defer(*deferred)
+        return queryset
+
+class NVPIncidentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
+        list_serializer_class = TimedListSerializer
         model = NVPIncident
         fields = ['id', 'incident_date', 'duration', 'description']
 
-class WellSerializer(serializers.ModelSerializer):
+class WellSerializer(TimedSerializerMixin, SparseFieldsetsMixin, serializers.ModelSerializer):
     # Добавляем "человекочитаемое" представление для поля с выбором
     current_section_display = serializers.CharField(source='get_current_section_display', read_only=True)
     nvp_incidents = NVPIncidentSerializer(many=True, read_only=True)
+    last_summary_text = serializers.SerializerMethodField()
     class Meta:
+        list_serializer_class = TimedListSerializer
         model = Well
         fields = [
             'id', 'name', 'is_active', 'engineers', 'current_depth', 'planned_depth', 
@@ -20,21 +86,130 @@ class WellSerializer(serializers.ModelSerializer):
             'has_overspending', 'overspending_details', 'created_at', 'updated_at',
             'nvp_incidents','last_summary_text' # <-- новое поле
         ] # Включаем все поля из модели в API
+        prefetch_fields = {'nvp_incidents': 'nvp_incidents'}
+        # Текст сводки — из истории сводок, сжатым, тем же запросом
+        annotated_fields = {'last_summary_text': latest_summary_subquery()}
+
+    def get_last_summary_text(self, well):
+        return latest_summary_text(well)
 
 
-class TaskSerializer(serializers.ModelSerializer):
+class WellListSerializer(TimedSerializerMixin, SparseFieldsetsMixin, serializers.ModelSerializer):
+    """
+    Компактная карточка скважины для списка (GET /wells/):
+    без текста сводки и списка НВП — только их наличие/количество.
+    Полные данные — в карточке скважины или через ?expand=nvp_incidents / ?fields=.
+    """
+    current_section_display = serializers.CharField(source='get_current_section_display', read_only=True)
+    nvp_incident_count = serializers.IntegerField(read_only=True)
+    has_summary = serializers.BooleanField(read_only=True)
+
     class Meta:
+        list_serializer_class = TimedListSerializer
+        model = Well
+        fields = [
+            'id', 'name', 'is_active', 'engineers', 'current_depth', 'planned_depth',
+            'current_section', 'current_section_display', 'current_operations',
+            'has_overspending', 'updated_at', 'nvp_incident_count', 'has_summary',
+        ]
+        expandable_fields = {
+            'nvp_incidents': (NVPIncidentSerializer, {'many': True, 'read_only': True}),
+        }
+        prefetch_fields = {'nvp_incidents': 'nvp_incidents'}
+        annotated_fields = {
+            'nvp_incident_count': Count('nvp_incidents'),
+            'has_summary': has_summary_expression(),
+        }
+        deferred_fields = ('overspending_details',)
+
+
+class TaskSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        list_serializer_class = TimedListSerializer
         model = Task
         fields = '__all__'
 
-class TenderSerializer(serializers.ModelSerializer):
+class TenderSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     # Добавляем "человеческое" имя статуса
     status_display = serializers.CharField(source='get_status_display', read_only=True)
 
     class Meta:
+        list_serializer_class = TimedListSerializer
         model = Tender
         fields = '__all__'
 
+class MudParameterLogSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    section_display = serializers.CharField(source='get_section_display', read_only=True)
+
+    class Meta:
+        list_serializer_class = TimedListSerializer
+        model = MudParameterLog
+        exclude = ['well']
+
+
+class MudLogFilterSerializer(serializers.Serializer):
+    """Фильтры истории замеров: ?from=...&to=...&is_out_of_norm=true"""
+
+    def get_fields(self):
+        # from — зарезервированное слово, атрибутом класса такое поле не объявить
+        return {
+            'from': serializers.DateTimeField(source='time_from', required=False),
+            'to': serializers.DateTimeField(source='time_to', required=False),
+            'is_out_of_norm': serializers.BooleanField(required=False, allow_null=True, default=None),
+        }
+
+
+class MudLogExportSerializer(MudLogFilterSerializer):
+    """Выгрузка истории: ?format=csv|xlsx&well=<id>&from=...&to=...&is_out_of_norm=true"""
+
+    def get_fields(self):
+        return super().get_fields() | {
+            'format': serializers.ChoiceField(choices=EXPORT_FORMATS, default='csv'),
+            'well': serializers.IntegerField(source='well_id', required=False),
+        }
+
+
+class TimeSeriesQuerySerializer(serializers.Serializer):
+    """?params=density,viscosity&points=500&from=...&to=..."""
+    scalar_fields = ('points', 'from', 'to')
+
+    def get_fields(self):
+        return {
+            'params': serializers.ListField(child=serializers.ChoiceField(choices=TIMESERIES_PARAMS), allow_empty=False),
+            'points': serializers.IntegerField(min_value=3, max_value=MAX_POINTS, default=DEFAULT_POINTS),
+            'from': serializers.DateTimeField(source='time_from', required=False),
+            'to': serializers.DateTimeField(source='time_to', required=False),
+        }
+
+    def to_internal_value(self, data):
+        # params приходит строкой через запятую (или несколькими ?params=)
+        data = {key: data.get(key) for key in self.scalar_fields if data.get(key)} | {
+            'params': [param.strip() for raw in data.getlist('params') for param in raw.split(',') if param.strip()],
+        }
+        return super().to_internal_value(data)
+
+
+class RollupQuerySerializer(TimeSeriesQuerySerializer):
+    """?period=hour|day&params=density,viscosity&from=...&to=..."""
+    scalar_fields = ('period', 'from', 'to')
+
+    def get_fields(self):
+        fields = super().get_fields()
+        del fields['points']
+        fields['period'] = serializers.ChoiceField(
+            choices=MudParameterRollup.Period.choices, default=MudParameterRollup.Period.HOUR,
+        )
+        return fields
+
+
+
+class SummaryItemSerializer(serializers.Serializer):
+    """Элемент пакета process-summaries. Время замера клиент не задает — это время приема."""
+    text = serializers.CharField(trim_whitespace=False)
+    chat_id = serializers.IntegerField(required=False, allow_null=True)
+    topic_id = serializers.IntegerField(required=False, allow_null=True)
+
+
 class WellLinkTelegramSerializer(serializers.Serializer):
     name = serializers.CharField(max_length=255)
     telegram_chat_id = serializers.IntegerField() # Используем IntegerField для приема данных
@@ -0,0 +1,102 @@
+# backend/wells/signals.py
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import (
+    DrillingProgram, ProgramSection, DepthIntervalNorms, MudParameterLog, Well, NVPIncident, Task, Tender, Tombstone,
+    MudLogArchive,
+)
+from .norm_index import invalidate_norm_index
+from .trends import invalidate_trend_buffer
+from .rollups import schedule_rollup_rebuild
+from .archive import delete_archive_file
+from .response_cache import invalidate_response_cache, groups_for_model
+
+
+@receiver([post_save, post_delete], sender=DrillingProgram)
+@receiver([post_save, post_delete], sender=ProgramSection)
+@receiver([post_save, post_delete], sender=DepthIntervalNorms)
+def reset_norm_index(sender, **kwargs):
+    """
+    Программу промывки поменяли (обычно через админку) — сбрасываем индекс норм.
+    Сбрасываем целиком: правки редкие, а поиск скважины по интервалу стоил бы запросов.
+    """
+    invalidate_norm_index()
+
+
+@receiver(post_save, sender=MudParameterLog)
+def reset_trend_buffer_on_edit(sender, instance, created, **kwargs):
+    """
+    Замер исправили вручную — буфер трендов скважины перечитается.
+    Новые замеры попадают в буфер сами (rules_engine), их не трогаем.
+    """
+    if not created:
+        invalidate_trend_buffer(instance.well_id)
+
+
+@receiver(post_delete, sender=MudParameterLog)
+def reset_trend_buffer_on_delete(sender, instance, **kwargs):
+    invalidate_trend_buffer(instance.well_id)
+
+
+@receiver(post_save, sender=MudParameterLog)
+def rebuild_rollups_on_edit(sender, instance, created, **kwargs):
+    """
+    Замер исправили вручную — пересобираем сводки скважины целиком:
+    время замера могли перенести в другие сутки, а старое значение уже неизвестно.
+    Новые замеры добавляются к сводкам при приеме (add_logs_to_rollups).
+    """
+    if not created:
+        schedule_rollup_rebuild(instance.well_id)
+
+
+@receiver(post_delete, sender=MudParameterLog)
+def rebuild_rollups_on_delete(sender, instance, origin=None, **kwargs):
+    """Удалили замер — пересобираем его сутки. При удалении скважины сводки уходят каскадом."""
+    if isinstance(origin, Well) or getattr(origin, 'model', None) is Well:
+        return
+    schedule_rollup_rebuild(instance.well_id, instance.measurement_time)
+
+
+@receiver([post_save, post_delete], sender=Well)
+@receiver([post_save, post_delete], sender=NVPIncident)
+@receiver([post_save, post_delete], sender=Task)
+@receiver([post_save, post_delete], sender=Tender)
+def reset_response_cache(sender, **kwargs):
+    """Сбрасываем закэшированные списки дашборда, в которых участвует модель."""
+    invalidate_response_cache(*groups_for_model(sender))
+
+
+@receiver(post_delete, sender=MudLogArchive)
+def remove_archive_file(sender, instance, **kwargs):
+    """Архив удален (обычно вместе со скважиной) — файл из хранилища тоже, после коммита."""
+    transaction.on_commit(lambda: delete_archive_file(instance.file))
+
+
+TOMBSTONE_KINDS = {
+    Well: Tombstone.Kind.WELL,
+    NVPIncident: Tombstone.Kind.NVP_INCIDENT,
+    Task: Tombstone.Kind.TASK,
+    Tender: Tombstone.Kind.TENDER,
+}
+
+
+@receiver(post_delete, sender=Well)
+@receiver(post_delete, sender=NVPIncident)
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Tender)
+def record_tombstone(sender, instance, **kwargs):
+    """
+    Запоминаем удаление для синхронизации изменений (wells/changes.py).
+    Заодно чистим журнал от записей старше CHANGES_TOMBSTONE_DAYS — удаления редкие.
+    """
+    Tombstone.objects.create(
+        kind=TOMBSTONE_KINDS[sender],
+        object_id=instance.pk,
+        well_id=instance.well_id if sender is NVPIncident else None,
+    )
+    expired = timezone.now() - timedelta(days=getattr(settings, 'CHANGES_TOMBSTONE_DAYS', 30))
+    Tombstone.objects.filter(deleted_at__lt=expired).delete()
@@ -0,0 +1,289 @@
+# backend/wells/summary_history.py
+"""
+История полученных сводок (ReceivedSummary) и ее повтор.
+
+Каждая принятая сводка — и одиночная, и из пакета, и из выгрузки Telegram —
+дописывается в историю: сжатый zlib текст, отпечаток (summary_fingerprint),
+скважина и время получения. Сводки, в которых парсер не нашел названия
+скважины, тоже сохраняются — без скважины. Текст сводки больше не лежит
+в строке Well и не читается с каждой скважиной; "последняя сводка" в API —
+подзапрос к истории.
+
+Повтор (replay_summaries) после исправления парсера разбирает историю заново:
+- сводки без скважины, в которых теперь нашлось название, привязываются
+  к скважине (при необходимости новой);
+- поля скважин (забой, секция, работы, инженеры) пересчитываются проходом
+  по сводкам скважины по порядку;
+- замер, созданный из сводки, обновляется на месте (id и время сохраняются),
+  недостающий — создается, лишний (параметров в сводке больше нет) — удаляется;
+  у сводки без ссылки на замер (перенесенные миграцией 0018) сначала ищется
+  непривязанный замер скважины в пределах ADOPT_WINDOW от времени получения;
+- сводки раствора пересобираются для затронутых скважин.
+Правила и уведомления при повторе не запускаются. Замеры, ушедшие в холодный
+архив (wells/archive.py), не трогаются: архив неизменяем.
+
+Текст и отпечаток в истории не меняются никогда; повтор обновляет только
+ссылки на скважину и созданный замер.
+"""
+import copy
+import zlib
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Exists, Max, OuterRef, Subquery
+from django.utils import timezone
+from .models import Well, MudParameterLog, ReceivedSummary, ProcessedSummary, MudLogArchive
+from .parser import parse_summary, extract_mud_parameters, summary_fingerprint
+from .norm_index import warm_norm_indexes
+from .response_cache import invalidate_response_cache
+
+COMPRESSION_LEVEL = 6
+ADOPT_WINDOW = timedelta(minutes=1)
+
+# Поля замера, которые пересчитываются при повторе (время замера сохраняется)
+REPLAY_LOG_FIELDS = tuple(
+    field.name for field in MudParameterLog._meta.concrete_fields
+    if field.name not in ('id', 'well', 'measurement_time')
+)
+
+
+def compress_summary(text: str) -> bytes:
+    return zlib.compress(text.encode('utf-8'), COMPRESSION_LEVEL)
+
+
+def decompress_summary(data) -> str:
+    return zlib.decompress(bytes(data)).decode('utf-8')
+
+
+def summary_entry(text: str, well=None, mud_log=None, content_hash: str = None, received_at=None) -> ReceivedSummary:
+    """Запись истории (не сохраненная)."""
+    return ReceivedSummary(
+        well=well,
+        mud_log=mud_log,
+        content_hash=content_hash or summary_fingerprint(text),
+        compressed_text=compress_summary(text),
+        received_at=received_at or timezone.now(),
+    )
+
+
+def save_unrecognized_summaries(entries: list) -> int:
+    """
+    Сохраняет сводки без скважины (записи summary_entry), кроме тех, что уже
+    лежат в истории без скважины с тем же отпечатком: релей повторяет
+    нераспознанную сводку при каждом ответе с ошибкой. Возвращает число новых записей.
+    """
+    if not entries:
+        return 0
+    stored = set(
+        ReceivedSummary.objects.filter(well__isnull=True, content_hash__in={entry.content_hash for entry in entries})
+        .values_list('content_hash', flat=True)
+    )
+    new_entries = []
+    for entry in entries:
+        if entry.content_hash not in stored:
+            stored.add(entry.content_hash)
+            new_entries.append(entry)
+    ReceivedSummary.objects.bulk_create(new_entries)
+    return len(new_entries)
+
+
+# --- Последняя сводка скважины ---
+
+def latest_summary_subquery():
+    """Сжатый текст последней сводки скважины — для annotate() по скважинам."""
+    return Subquery(
+        ReceivedSummary.objects.filter(well=OuterRef('pk'))
+        .order_by('-received_at', '-id')
+        .values('compressed_text')[:1]
+    )
+
+
+def has_summary_expression():
+    return Exists(ReceivedSummary.objects.filter(well=OuterRef('pk')))
+
+
+def latest_summary_text(well: Well) -> str | None:
+    """
+    Текст последней сводки. Берет аннотацию last_summary_text (см.
+    latest_summary_subquery), а без нее — одним запросом.
+    """
+    if 'last_summary_text' in well.__dict__:
+        compressed = well.last_summary_text
+    else:
+        compressed = (
+            ReceivedSummary.objects.filter(well=well).order_by('-received_at', '-id')
+            .values_list('compressed_text', flat=True).first()
+        )
+    return decompress_summary(compressed) if compressed is not None else None
+
+
+# --- Повтор ---
+
+def parse_history_chunk(rows: list) -> list:
+    """
+    Разбирает пачку сводок истории (выполняется в процессе-воркере).
+    На вход — список (id, compressed_text), на выход — (id, parsed_data, parsed_mud_params).
+    """
+    parsed = []
+    for entry_id, compressed in rows:
+        text = decompress_summary(compressed)
+        parsed_data = parse_summary(text)
+        parsed_mud_params = extract_mud_parameters(text) if parsed_data.get('name') else None
+        parsed.append((entry_id, parsed_data, parsed_mud_params))
+    return parsed
+
+
+def attach_unassigned_chunk(rows: list, parsed: list, stats: dict):
+    """
+    Привязывает к скважинам сводки без скважины, в которых парсер теперь
+    находит название. rows — список (id, content_hash). Сводку, которая
+    позже уже была обработана (есть ProcessedSummary), не трогаем: ее
+    замер уже есть.
+    """
+    named = {
+        entry_id: parsed_data['name']
+        for entry_id, parsed_data, _ in parsed if parsed_data.get('name')
+    }
+    if not named:
+        return
+    hashes = dict(rows)
+    processed = set(
+        ProcessedSummary.objects.filter(content_hash__in=[hashes[entry_id] for entry_id in named])
+        .values_list('content_hash', flat=True)
+    )
+    attach = {}
+    for entry_id, name in named.items():
+        if hashes[entry_id] not in processed:
+            processed.add(hashes[entry_id]) # повтор того же текста в истории привязываем один раз
+            attach[entry_id] = name
+
+    with transaction.atomic():
+        names = set(attach.values())
+        existing = set(Well.objects.filter(name__in=names).values_list('name', flat=True))
+        Well.objects.bulk_create([Well(name=name) for name in sorted(names - existing)])
+        wells_by_name = {}
+        for well in Well.objects.filter(name__in=names).order_by('pk'):
+            wells_by_name.setdefault(well.name, well) # при дублях имени берем первую
+        entries = ReceivedSummary.objects.in_bulk(list(attach))
+        for entry_id, name in attach.items():
+            entries[entry_id].well = wells_by_name[name]
+        ReceivedSummary.objects.bulk_update(list(entries.values()), ['well'])
+        ProcessedSummary.objects.bulk_create([
+            ProcessedSummary(content_hash=entry.content_hash, well=entry.well) for entry in entries.values()
+        ], ignore_conflicts=True)
+        if names - existing:
+            invalidate_response_cache('wells')
+    stats['attached'] += len(attach)
+    stats['wells_created'] += len(names - existing)
+
+
+def archived_until(well_ids=None) -> dict:
+    """{well_id: время последнего замера в архиве} — более ранние сводки не повторяем."""
+    archives = MudLogArchive.objects.all()
+    if well_ids is not None:
+        archives = archives.filter(well_id__in=list(well_ids))
+    return dict(archives.values('well_id').annotate(until=Max('time_to')).values_list('well_id', 'until'))
+
+
+def _unlinked_logs(rows: list) -> dict:
+    """
+    Замеры скважин около времени получения сводок rows, на которые не ссылается
+    ни одна сводка истории: {well_id: [(measurement_time, id), ...]}.
+    """
+    if not rows:
+        return {}
+    times = [received_at for _, _, received_at, _ in rows]
+    logs = MudParameterLog.objects.filter(
+        well_id__in={well_id for _, well_id, _, _ in rows},
+        measurement_time__gte=min(times) - ADOPT_WINDOW,
+        measurement_time__lte=max(times) + ADOPT_WINDOW,
+    ).exclude(
+        Exists(ReceivedSummary.objects.filter(mud_log=OuterRef('pk')))
+    ).values_list('well_id', 'measurement_time', 'id')
+    unlinked = {}
+    for well_id, measurement_time, log_id in logs:
+        unlinked.setdefault(well_id, []).append((measurement_time, log_id))
+    return unlinked
+
+
+def _adopt_log(candidates: list, received_at):
+    """Ближайший по времени к сводке непривязанный замер (и убирает его из кандидатов)."""
+    near = [item for item in candidates if abs(item[0] - received_at) <= ADOPT_WINDOW]
+    if not near:
+        return None
+    best = min(near, key=lambda item: abs(item[0] - received_at))
+    candidates.remove(best)
+    return best[1]
+
+
+def replay_chunk(rows: list, parsed: list, wells: dict, archive_times: dict, stats: dict):
+    """
+    Применяет разобранную пачку истории. rows — список
+    (id, well_id, received_at, mud_log_id) в порядке истории скважин;
+    wells — {well_id: Well}, живет между пачками: состояние скважины
+    переходит из пачки в пачку.
+    """
+    from .ingest import apply_summary_to_well, build_mud_log # ingest сам пишет историю
+
+    new_wells = Well.objects.in_bulk({well_id for _, well_id, _, _ in rows} - wells.keys())
+    warm_norm_indexes(new_wells.values())
+    wells.update(new_wells)
+    linked_logs = set(
+        MudParameterLog.objects.filter(pk__in=[log_id for *_, log_id in rows if log_id])
+        .values_list('pk', flat=True)
+    )
+
+    unlinked = _unlinked_logs([row for row in rows if row[3] not in linked_logs])
+
+    wells_to_update = {}
+    update_fields = set()
+    logs_to_update = []
+    logs_to_create = []
+    logs_to_delete = []
+    links = []
+    for (entry_id, well_id, received_at, log_id), (_, parsed_data, parsed_mud_params) in zip(rows, parsed):
+        well = wells[well_id]
+        fields = apply_summary_to_well(well, parsed_data)
+        if fields:
+            wells_to_update[well.pk] = well
+            update_fields.update(fields)
+
+        if well_id in archive_times and received_at <= archive_times[well_id]:
+            stats['archived'] += 1
+            continue
+        if parsed_mud_params:
+            log_entry = build_mud_log(copy.copy(well), parsed_data, parsed_mud_params)
+            if log_id not in linked_logs:
+                log_id = _adopt_log(unlinked.get(well_id, []), received_at)
+                if log_id:
+                    links.append(ReceivedSummary(pk=entry_id, mud_log_id=log_id))
+            if log_id:
+                log_entry.pk = log_id
+                logs_to_update.append(log_entry)
+            else:
+                log_entry.measurement_time = received_at
+                logs_to_create.append((entry_id, log_entry))
+        elif log_id in linked_logs:
+            logs_to_delete.append(log_id)
+
+    with transaction.atomic():
+        if wells_to_update:
+            Well.objects.bulk_update(list(wells_to_update.values()), sorted(update_fields))
+            invalidate_response_cache('wells')
+        MudParameterLog.objects.bulk_update(logs_to_update, REPLAY_LOG_FIELDS, batch_size=1000)
+        if logs_to_create:
+            created = [log_entry for _, log_entry in logs_to_create]
+            times = [log_entry.measurement_time for log_entry in created]
+            MudParameterLog.objects.bulk_create(created, batch_size=1000)
+            # auto_now_add перезаписал время — возвращаем время получения сводки
+            for log_entry, measurement_time in zip(created, times):
+                log_entry.measurement_time = measurement_time
+            MudParameterLog.objects.bulk_update(created, ['measurement_time'], batch_size=1000)
+            links += [ReceivedSummary(pk=entry_id, mud_log=log_entry) for entry_id, log_entry in logs_to_create]
+        ReceivedSummary.objects.bulk_update(links, ['mud_log'], batch_size=1000)
+        if logs_to_delete:
+            MudParameterLog.objects.filter(pk__in=logs_to_delete).delete()
+
+    stats['summaries'] += len(rows)
+    stats['logs_updated'] += len(logs_to_update)
+    stats['logs_created'] += len(logs_to_create)
+    stats['logs_deleted'] += len(logs_to_delete)
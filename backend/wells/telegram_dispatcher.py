@@ -0,0 +1,294 @@
+# backend/wells/telegram_dispatcher.py
+"""
+Отправка сообщений в Telegram Bot API с учетом лимитов.
+
+- одно постоянное HTTP-соединение (пул requests.Session) вместо нового на каждое сообщение;
+- token bucket на бота целиком и на каждый чат: сообщения уходят с максимальной
+  скоростью, которую разрешает Telegram, а не упираются в 429;
+- сообщения длиннее 4096 символов режутся на части по абзацам/строкам,
+  не разрывая HTML-теги и сущности;
+- повторы с экспоненциальной паузой, при 429 — ровно столько, сколько просит retry_after.
+
+Диспетчер потокобезопасен: воркер очереди может отправлять из нескольких потоков.
+"""
+import re
+import time
+import random
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_MESSAGE_LENGTH = 4096
+
+
+class TelegramSendError(Exception):
+    """
+    Не удалось отправить сообщение.
+    retryable=False — повтор не поможет (неверный chat_id, бот удален из группы и т.п.).
+    """
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class TokenBucket:
+    """
+    Классический token bucket: rate токенов в секунду, не больше capacity в запасе.
+    acquire() блокирует поток, пока не появится токен.
+    """
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Забирает токен и возвращает 0 — или возвращает, сколько секунд подождать."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        while True:
+            wait = self._reserve()
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    def block_for(self, seconds: float):
+        """Telegram попросил подождать (429 retry_after): до этого момента токенов нет."""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = 0
+            self.updated_at = self.blocked_until
+
+
+# Тег или HTML-сущность: резать внутри них нельзя
+_HTML_TOKEN_RE = re.compile(r'<[^<>]*>|&#?\w+;')
+_HTML_TAG_RE = re.compile(r'<[^<>]*>')
+_TAG_NAME_RE = re.compile(r'</?\s*([\w-]+)')
+
+
+def _html_tokens(text: str) -> list:
+    """Текст по неделимым кускам: теги и сущности целиком, остальное — по символу."""
+    tokens = []
+    pos = 0
+    for m in _HTML_TOKEN_RE.finditer(text):
+        tokens.extend(text[pos:m.start()])
+        tokens.append(m.group())
+        pos = m.end()
+    tokens.extend(text[pos:])
+    return tokens
+
+
+def _apply_tag(open_tags: list, token: str) -> list:
+    """Стек открытых тегов [(имя, открывающий тег), ...] после токена."""
+    if not token.startswith('<') or len(token) == 1 or token.endswith('/>'):
+        return open_tags
+    name = _TAG_NAME_RE.match(token)
+    if name is None:
+        return open_tags
+    name = name.group(1).lower()
+    if not token.startswith('</'):
+        return open_tags + [(name, token)]
+    for i in range(len(open_tags) - 1, -1, -1):
+        if open_tags[i][0] == name:
+            return open_tags[:i] + open_tags[i + 1:]
+    return open_tags
+
+
+def _closing_tags(open_tags: list) -> str:
+    return ''.join(f'</{name}>' for name, _ in reversed(open_tags))
+
+
+def split_message(text: str, limit: int = MAX_MESSAGE_LENGTH, html: bool = True) -> list:
+    """
+    Режет текст на части не длиннее limit.
+    Сначала по абзацам (между тревогами), затем по строкам, затем по пробелам,
+    и только в крайнем случае — посреди слова.
+
+    html=True (parse_mode=HTML): теги и сущности (&lt; и т.п.) не разрезаются,
+    открытые на месте разреза теги закрываются в конце части и заново
+    открываются в начале следующей — иначе Telegram отвечает 400 на разметку.
+    """
+    if len(text) <= limit:
+        return [text] if text else []
+    tokens = _html_tokens(text) if html else list(text)
+
+    parts = []
+    open_tags = []
+    start = 0
+    while start < len(tokens):
+        prefix = ''.join(tag for _, tag in open_tags)
+        size = len(prefix)
+        tags = open_tags
+        cuts = {} # разделитель -> (номер токена, открытые теги) для последнего такого места
+        end = start
+        while end < len(tokens):
+            token = tokens[end]
+            if end > start:
+                for separator in ('\n\n', '\n', ' '):
+                    if ''.join(tokens[end:end + len(separator)]) == separator:
+                        cuts[separator] = (end, tags)
+                        break
+            next_tags = _apply_tag(tags, token) if html else tags
+            if size + len(token) + len(_closing_tags(next_tags)) > limit:
+                break
+            size += len(token)
+            tags = next_tags
+            end += 1
+
+        if end == len(tokens):
+            cut, cut_tags = end, tags
+        else:
+            cut, cut_tags = next(
+                (cuts[separator] for separator in ('\n\n', '\n', ' ') if separator in cuts),
+                (max(end, start + 1), tags if end > start else _apply_tag(tags, tokens[start])),
+            )
+        body = ''.join(tokens[start:cut]).rstrip()
+        part = prefix + body + _closing_tags(cut_tags)
+        if (_HTML_TAG_RE.sub('', part) if html else part).strip(): # часть из одних тегов Telegram не примет
+            parts.append(part)
+
+        open_tags = cut_tags
+        start = cut
+        while start < len(tokens) and tokens[start].isspace():
+            start += 1
+    return parts
+
+
+class TelegramDispatcher:
+    def __init__(
+        self,
+        bot_token: str,
+        api_url: str = 'https://api.telegram.org',
+        global_rate: float = 30,
+        chat_rate: float = 1,
+        group_rate_per_minute: float = 20,
+        pool_size: int = 10,
+        timeout: float = 10,
+        max_attempts: int = 5,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+    ):
+        self.url = f"{api_url.rstrip('/')}/bot{bot_token}/sendMessage"
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate_per_minute / 60
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self.global_bucket = TokenBucket(global_rate, capacity=global_rate)
+        self._chat_buckets = {}
+        self._chat_buckets_lock = threading.Lock()
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        with self._chat_buckets_lock:
+            bucket = self._chat_buckets.get(chat_id)
+            if bucket is None:
+                # Отрицательный id — группа/супергруппа: у них лимит строже
+                rate = self.group_rate if int(chat_id) < 0 else self.chat_rate
+                bucket = self._chat_buckets[chat_id] = TokenBucket(rate)
+            return bucket
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_base * 2 ** (attempt - 1), self.backoff_max)
+        return delay * random.uniform(0.5, 1) # джиттер, чтобы повторы не шли залпом
+
+    def send_message(self, chat_id, text: str, topic_id=None, parse_mode: str = 'HTML') -> list:
+        """
+        Отправляет текст (при необходимости несколькими сообщениями).
+        Возвращает список ответов Telegram по частям; при неудаче — TelegramSendError.
+        """
+        results = []
+        for part in split_message(text, html=parse_mode == 'HTML'):
+            payload = {'chat_id': chat_id, 'text': part}
+            if parse_mode:
+                payload['parse_mode'] = parse_mode
+            if topic_id:
+                payload['message_thread_id'] = topic_id
+            results.append(self._send(chat_id, payload))
+        return results
+
+    def _send(self, chat_id, payload: dict) -> dict:
+        chat_bucket = self._chat_bucket(chat_id)
+        last_error = None
+
+        for attempt in range(1, self.max_attempts + 1):
+            # Сначала очередь чата, потом общий лимит — чтобы не держать общий токен в ожидании
+            chat_bucket.acquire()
+            self.global_bucket.acquire()
+
+            try:
+                response = self.session.post(self.url, json=payload, timeout=self.timeout)
+            except requests.exceptions.RequestException as e:
+                last_error = f"сетевая ошибка: {e}"
+                delay = self._backoff(attempt)
+            else:
+                try:
+                    data = response.json()
+                except ValueError:
+                    data = {}
+
+                if response.status_code == 200 and data.get('ok', True):
+                    return data.get('result', {})
+
+                description = data.get('description') or response.text[:200]
+                last_error = f"HTTP {response.status_code}: {description}"
+
+                if response.status_code == 429:
+                    retry_after = (data.get('parameters') or {}).get('retry_after')
+                    delay = float(retry_after) if retry_after else self._backoff(attempt)
+                    chat_bucket.block_for(delay)
+                elif response.status_code >= 500:
+                    delay = self._backoff(attempt)
+                else:
+                    raise TelegramSendError(last_error, retryable=False)
+
+            if attempt < self.max_attempts:
+                logger.warning(f"Telegram: {last_error}. Повтор {attempt + 1}/{self.max_attempts} через {delay:.1f} с.")
+                time.sleep(delay)
+
+        raise TelegramSendError(f"Не удалось отправить после {self.max_attempts} попыток. {last_error}")
+
+
+_dispatchers = {}
+_dispatchers_lock = threading.Lock()
+
+
+def get_dispatcher(bot_token: str) -> TelegramDispatcher:
+    """
+    Общий на процесс диспетчер для бота: одно соединение и одни лимиты на всех.
+    """
+    api_url = getattr(settings, 'TELEGRAM_API_URL', 'https://api.telegram.org')
+    key = (bot_token, api_url)
+    with _dispatchers_lock:
+        dispatcher = _dispatchers.get(key)
+        if dispatcher is None:
+            dispatcher = _dispatchers[key] = TelegramDispatcher(
+                bot_token,
+                api_url=api_url,
+                global_rate=getattr(settings, 'TELEGRAM_GLOBAL_RATE', 30),
+                chat_rate=getattr(settings, 'TELEGRAM_CHAT_RATE', 1),
+                group_rate_per_minute=getattr(settings, 'TELEGRAM_GROUP_RATE_PER_MINUTE', 20),
+            )
+        return dispatcher
@@ -0,0 +1,133 @@
+# backend/wells/telegram_export.py
+"""
+Потоковое чтение экспорта чата Telegram (result.json).
+
+Экспорт бывает в сотни мегабайт, поэтому файл не грузится целиком через
+json.load: читаем его кусками и декодируем сообщения по одному из массивов
+"messages". В памяти одновременно лежит только текущий кусок файла.
+
+Модуль не трогает Django-модели, чтобы функции разбора можно было
+запускать в отдельных процессах.
+"""
+import re
+import json
+import codecs
+from datetime import datetime, timezone as dt_timezone
+from .parser import parse_summary, extract_mud_parameters, summary_fingerprint
+
+READ_CHUNK_SIZE = 1024 * 1024 # 1 МБ за одно чтение
+
+_MESSAGES_KEY_RE = re.compile(r'"messages"\s*:\s*\[')
+_SKIP_RE = re.compile(r'[\s,]*')
+
+
+class ExportFormatError(ValueError):
+    """Файл не похож на экспорт Telegram или оборван."""
+
+
+def iter_export_messages(file_obj, start_offset: int = 0):
+    """
+    Генератор сообщений из бинарного файла экспорта.
+    Отдает пары (message: dict, end_offset: int), где end_offset — байтовое
+    смещение сразу после сообщения. С этого смещения можно продолжить чтение,
+    передав его как start_offset (мы окажемся внутри массива "messages").
+    Поддерживает и экспорт одного чата, и полный экспорт (chats.list[*].messages).
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    file_obj.seek(start_offset)
+
+    buffer = ''
+    pos = 0 # текущая позиция в buffer
+    pos_offset = start_offset # байтовое смещение, соответствующее pos
+    in_array = start_offset > 0
+    eof = False
+
+    def read_more():
+        nonlocal buffer, pos, eof
+        chunk = file_obj.read(READ_CHUNK_SIZE)
+        if not chunk:
+            eof = True
+        buffer = buffer[pos:] + utf8.decode(chunk, final=eof)
+        pos = 0
+
+    def advance(new_pos):
+        nonlocal pos, pos_offset
+        pos_offset += len(buffer[pos:new_pos].encode('utf-8'))
+        pos = new_pos
+
+    while True:
+        if not in_array:
+            # Ищем начало очередного массива "messages"
+            match = _MESSAGES_KEY_RE.search(buffer, pos)
+            if match:
+                advance(match.end())
+                in_array = True
+                continue
+            if eof:
+                return
+            # Хвост оставляем: ключ мог разрезаться границей чтения
+            advance(max(pos, len(buffer) - 32))
+            read_more()
+            continue
+
+        advance(_SKIP_RE.match(buffer, pos).end())
+        if pos >= len(buffer):
+            if eof:
+                raise ExportFormatError("Файл экспорта оборван внутри массива сообщений.")
+            read_more()
+            continue
+
+        if buffer[pos] == ']':
+            advance(pos + 1)
+            in_array = False
+            continue
+
+        try:
+            message, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError as e:
+            if eof:
+                raise ExportFormatError(f"Некорректный JSON около байта {pos_offset}: {e.msg}") from e
+            read_more() # сообщение разрезано границей чтения
+            continue
+
+        advance(end)
+        yield message, pos_offset
+
+
+def message_text(message: dict) -> str:
+    """
+    Текст сообщения. В экспорте он либо строка, либо список из строк
+    и кусочков форматирования вида {"type": "bold", "text": "..."}.
+    """
+    text = message.get('text', '')
+    if isinstance(text, str):
+        return text
+    return ''.join(part if isinstance(part, str) else part.get('text', '') for part in text)
+
+
+def message_time(message: dict):
+    """
+    Время отправки сообщения. Новые экспорты содержат date_unixtime (UTC),
+    старые — только date в локальном времени (возвращается naive datetime).
+    """
+    if message.get('date_unixtime'):
+        return datetime.fromtimestamp(int(message['date_unixtime']), tz=dt_timezone.utc)
+    if message.get('date'):
+        return datetime.fromisoformat(message['date'])
+    return None
+
+
+def parse_export_chunk(messages: list) -> list:
+    """
+    Разбирает пачку сообщений (выполняется в процессе-воркере).
+    На вход — список (message_id, date, text), на выход — только сводки:
+    список (message_id, date, content_hash, parsed_data, parsed_mud_params).
+    """
+    parsed = []
+    for message_id, date, text in messages:
+        parsed_data = parse_summary(text)
+        if not parsed_data.get('name'):
+            continue
+        parsed.append((message_id, date, summary_fingerprint(text), parsed_data, extract_mud_parameters(text)))
+    return parsed
@@ -0,0 +1,61 @@
+# backend/wells/tests/common.py
+"""Общие данные тестов: текст сводки, таблица программы промывки, настройки."""
+import tempfile
+from django.test import override_settings
+
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'budgets-default'},
+    'api': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'budgets-api'},
+}
+
+
+def summary_text(well_number: int, depth: float = 1800, marker: str = '') -> str:
+    return (
+        f"Куст 12 скв {well_number}\n"
+        "Инженер по бр: Иванов / Петров\n"
+        "Проектный забой: 3500\n"
+        f"Текущий забой: {depth}\n"
+        f"Текущие работы: Бурение {marker}\n"
+        "Параметры бурового раствора:\n"
+        "Пл - 1.18\nУВ - 45\nПВ - 18\nДНС - 60\nСНС - 12/20\nФ - 6\nPH - 9\n"
+    )
+
+
+PROGRAM_ROWS = [
+    ["Секция", "Начало", "Конец", "Плотность (Пл) мин", "Плотность (Пл) макс", "viscosity_min", "viscosity_max"],
+    ["Кондуктор", 0, 700, "1,12", "1,18", 35, 60],
+    ["Кондуктор", 700, 1200, 1.14, 1.2, 35, 60],
+    ["Техническая колонна (промежуточная)", 1200, 3500, 1.08, 1.12, None, None],
+]
+
+
+def test_settings(test_class):
+    """
+    Декоратор тестовых классов: кэши в памяти, без внешних сервисов, архивы
+    замеров — во временном каталоге, который живет, пока идут тесты класса.
+    """
+    set_up_class = test_class.setUpClass
+
+    @classmethod
+    def setUpClass(cls):
+        archive_dir = tempfile.TemporaryDirectory(prefix='mud-archive-')
+        cls.addClassCleanup(archive_dir.cleanup)
+        storages = override_settings(STORAGES={
+            # админке в тестах не нужен манифест collectstatic
+            'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+            'mud_archive': {
+                'BACKEND': 'django.core.files.storage.FileSystemStorage',
+                'OPTIONS': {'location': archive_dir.name},
+            },
+        })
+        storages.enable()
+        cls.addClassCleanup(storages.disable)
+        set_up_class.__func__(cls)
+
+    test_class.setUpClass = setUpClass
+    return override_settings(
+        CACHES=TEST_CACHES,
+        CHANGES_SAFETY_WINDOW=0,
+        TELEGRAM_ALERTS_BOT_TOKEN=None,
+        GOOGLE_API_KEY=None,
+    )(test_class)
@@ -0,0 +1,68 @@
+# backend/wells/tests/test_archive.py
+from datetime import timedelta
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from ..archive import archive_mud_logs
+from ..models import Well, MudParameterLog, MudLogArchive
+from .common import test_settings
+
+
+@test_settings
+class ArchivedHistoryPagesTests(TestCase):
+    """Страницы истории из БД и двух архивов совпадают с сортировкой всех замеров."""
+
+    def setUp(self):
+        self.client = APIClient(SERVER_NAME='localhost')
+        self.well = Well.objects.create(name="Куст 12 скважина 1", is_active=False)
+        self.start = timezone.now().replace(second=0, microsecond=0) - timedelta(days=10)
+        logs = MudParameterLog.objects.bulk_create([
+            MudParameterLog(well=self.well, density=1.1, is_out_of_norm=i % 3 == 0) for i in range(90)
+        ])
+        # По два замера на одно время: курсор различает их по id
+        for i, log_entry in enumerate(logs):
+            log_entry.measurement_time = self.start + timedelta(hours=i // 2)
+        MudParameterLog.objects.bulk_update(logs, ['measurement_time'])
+        self.logs = logs
+
+        archive_mud_logs([self.well.pk], cutoff=self.start + timedelta(hours=15))
+        archive_mud_logs([self.well.pk], cutoff=self.start + timedelta(hours=30))
+        self.assertEqual(MudLogArchive.objects.filter(well=self.well).count(), 2)
+        self.assertEqual(MudParameterLog.objects.filter(well=self.well).count(), 30)
+
+    def walk(self, params: dict) -> tuple:
+        url = f'/api/wells/{self.well.pk}/mud-logs/'
+        pages = []
+        response = self.client.get(url, data={'page_size': 7, **params}).json()
+        pages.append(response['results'])
+        while response['next']:
+            response = self.client.get(response['next']).json()
+            pages.append(response['results'])
+        # Обратно по ссылкам previous — те же страницы
+        backward = [response['results']]
+        while response['previous']:
+            response = self.client.get(response['previous']).json()
+            backward.append(response['results'])
+        self.assertEqual(backward[::-1], pages)
+        return [row['id'] for page in pages for row in page]
+
+    def expected(self, condition) -> list:
+        rows = sorted(
+            (log_entry for log_entry in self.logs if condition(log_entry)),
+            key=lambda log_entry: (log_entry.measurement_time, log_entry.pk), reverse=True,
+        )
+        return [log_entry.pk for log_entry in rows]
+
+    def test_pages(self):
+        self.assertEqual(self.walk({}), self.expected(lambda log_entry: True))
+        self.assertEqual(
+            self.walk({'is_out_of_norm': 'true'}),
+            self.expected(lambda log_entry: log_entry.is_out_of_norm),
+        )
+        time_from, time_to = self.start + timedelta(hours=5), self.start + timedelta(hours=35)
+        self.assertEqual(
+            self.walk({'from': time_from.isoformat(), 'to': time_to.isoformat(), 'is_out_of_norm': 'false'}),
+            self.expected(lambda log_entry: (
+                time_from <= log_entry.measurement_time <= time_to and not log_entry.is_out_of_norm
+            )),
+        )
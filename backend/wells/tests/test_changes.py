@@ -0,0 +1,83 @@
+# backend/wells/tests/test_changes.py
+from datetime import timedelta
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from ..changes import encode_cursor
+from ..models import Well, NVPIncident, Task, Tender
+from .common import test_settings
+
+
+@test_settings
+class ChangesSinceCursorTests(TestCase):
+    """/api/changes/?since= отдает правки и удаления после курсора и ничего из того, что было до него."""
+
+    def setUp(self):
+        self.client = APIClient(SERVER_NAME='localhost')
+        today = timezone.localdate()
+        deadline = timezone.now() + timedelta(days=3)
+        self.wells = [Well.objects.create(name=f"Куст 12 скважина {i}") for i in range(1, 5)]
+        self.incidents = [
+            NVPIncident.objects.create(well=well, incident_date=today, description="Поглощение")
+            for well in self.wells[:2]
+        ]
+        self.tasks = [Task.objects.create(title=f"Задача {i}", deadline=deadline) for i in range(3)]
+        self.tenders = [Tender.objects.create(name=f"Тендер {i}", deadline=deadline) for i in range(2)]
+        # Удалено до курсора — в ленте изменений его быть не должно
+        self.wells.pop().delete()
+
+    def changes(self, since=None) -> dict:
+        response = self.client.get('/api/changes/', data={'since': since} if since else {})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def ids(self, data, collection) -> tuple:
+        return sorted(row['id'] for row in data[collection]['changed']), sorted(data[collection]['deleted'])
+
+    def test_changes_after_cursor(self):
+        snapshot = self.changes()
+        self.assertTrue(snapshot['reset'])
+        self.assertEqual(self.ids(snapshot, 'wells'), (sorted(well.pk for well in self.wells), []))
+        self.assertEqual(len(snapshot['tasks']['changed']), 3)
+
+        well, deleted_well, nvp_well = self.wells
+        well.current_depth = 1850
+        well.save()
+        # delete() обнуляет pk — запоминаем id заранее
+        deleted_well_id, deleted_incident_id = deleted_well.pk, self.incidents[1].pk
+        deleted_well.delete() # вместе с ее НВП
+        new_incident = NVPIncident.objects.create(well=nvp_well, incident_date=timezone.localdate(), description="Прихват")
+        completed, deleted_task, _ = self.tasks
+        completed.is_completed = True
+        completed.save()
+        deleted_task_id = deleted_task.pk
+        deleted_task.delete()
+        new_task = Task.objects.create(title="Новая задача", deadline=timezone.now())
+        changed_tender, deleted_tender = self.tenders
+        changed_tender.status = Tender.Status.WON
+        changed_tender.save()
+        deleted_tender_id = deleted_tender.pk
+        deleted_tender.delete()
+
+        data = self.changes(snapshot['cursor'])
+        self.assertFalse(data['reset'])
+        # Скважина с новым НВП меняется вместе со счетчиком
+        self.assertEqual(self.ids(data, 'wells'), (sorted([well.pk, nvp_well.pk]), [deleted_well_id]))
+        self.assertEqual(self.ids(data, 'nvp_incidents'), ([new_incident.pk], [deleted_incident_id]))
+        # Выполненная задача для клиента — удаление
+        self.assertEqual(self.ids(data, 'tasks'), ([new_task.pk], sorted([completed.pk, deleted_task_id])))
+        self.assertEqual(self.ids(data, 'tenders'), ([changed_tender.pk], [deleted_tender_id]))
+
+        # С нового курсора изменений нет
+        data = self.changes(data['cursor'])
+        for collection in ('wells', 'nvp_incidents', 'tasks', 'tenders'):
+            self.assertEqual(self.ids(data, collection), ([], []))
+
+    def test_stale_cursor_resets(self):
+        data = self.changes(encode_cursor(timezone.now() - timedelta(days=365)))
+        self.assertTrue(data['reset'])
+        self.assertEqual(len(data['wells']['changed']), 3)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/changes/', data={'since': 'не курсор'})
+        self.assertEqual(response.status_code, 400)
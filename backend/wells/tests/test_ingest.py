@@ -0,0 +1,103 @@
+# backend/wells/tests/test_ingest.py
+from unittest import mock
+from django.db import IntegrityError
+from django.test import TestCase
+from rest_framework.test import APIClient
+from .. import ingest, views
+from ..models import Well, MudParameterLog, ProcessedSummary
+from ..norm_index import invalidate_norm_index
+from ..parser import summary_fingerprint
+from .common import summary_text, test_settings
+
+
+@test_settings
+class SummaryBatchRaceTests(TestCase):
+    """Повтор пакета релеем, пока первый еще пишется: пакет не падает целиком."""
+
+    def setUp(self):
+        invalidate_norm_index()
+        self.client = APIClient(SERVER_NAME='localhost')
+
+    def test_hash_taken_mid_batch(self):
+        texts = [summary_text(number) for number in range(3)]
+        taken_hash = summary_fingerprint(texts[1])
+        other_well = Well.objects.create(name="Куст 12 скважина 1")
+        find_processed_summaries = ingest.find_processed_summaries
+
+        def concurrent_commit(content_hashes):
+            # Проверка отпечатков уже прошла, а параллельный запрос успел записать сводку
+            result = find_processed_summaries(content_hashes)
+            if not ProcessedSummary.objects.filter(content_hash=taken_hash).exists():
+                ProcessedSummary.objects.create(content_hash=taken_hash, well=other_well)
+            return result
+
+        with mock.patch.object(ingest, 'find_processed_summaries', side_effect=concurrent_commit):
+            response = self.client.post('/api/wells/process-summaries/', data={
+                'summaries': [{'text': text} for text in texts],
+            }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([result['status'] for result in results], ['ok', 'duplicate', 'ok'])
+        self.assertEqual(results[1]['well_id'], other_well.pk)
+        self.assertEqual(MudParameterLog.objects.count(), 2)
+        self.assertEqual(ProcessedSummary.objects.count(), 3)
+
+
+@test_settings
+class SingleSummaryIntegrityTests(TestCase):
+    """process-summary: IntegrityError — это повтор, только если отпечаток действительно занят."""
+
+    def setUp(self):
+        invalidate_norm_index()
+        self.client = APIClient(SERVER_NAME='localhost')
+
+    def test_concurrent_duplicate(self):
+        text = summary_text(1)
+        other_well = Well.objects.create(name="Куст 12 скважина 7")
+        real_parse = views.parse_summary
+
+        def parse_while_other_request_commits(summary):
+            # Шаг 0 уже пройден, а параллельный повтор релея успел записать отпечаток
+            ProcessedSummary.objects.create(content_hash=summary_fingerprint(text), well=other_well)
+            return real_parse(summary)
+
+        with mock.patch.object(views, 'parse_summary', side_effect=parse_while_other_request_commits):
+            response = self.client.post('/api/wells/process-summary/', data={'text': text}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['id'], other_well.pk)
+        self.assertEqual(MudParameterLog.objects.count(), 0)
+
+    def test_other_integrity_error_not_hidden(self):
+        error = IntegrityError("NOT NULL constraint failed: wells_receivedsummary.compressed_text")
+        with mock.patch.object(views, 'summary_entry', side_effect=error):
+            with self.assertRaises(IntegrityError) as caught:
+                self.client.post('/api/wells/process-summary/', data={'text': summary_text(1)}, format='json')
+        self.assertIs(caught.exception, error)
+
+
+@test_settings
+class SummaryBatchValidationTests(TestCase):
+    """Поля элементов пакета проверяются; время замера клиент не задает."""
+
+    def setUp(self):
+        invalidate_norm_index()
+        self.client = APIClient(SERVER_NAME='localhost')
+
+    def test_invalid_items(self):
+        response = self.client.post('/api/wells/process-summaries/', data={'summaries': [
+            {'text': summary_text(1), 'measurement_time': 'garbage'},
+            {'text': summary_text(2), 'measurement_time': '2026-01-01T00:00:00Z'},
+            {'text': summary_text(3), 'chat_id': 'not a number'},
+            {'chat_id': 5},
+            'just a string',
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([result['status'] for result in results], ['ok', 'ok', 'error', 'error', 'error'])
+        self.assertIn('chat_id', results[2]['fields'])
+        self.assertEqual(results[3]['error'], 'No text provided')
+        # Время из запроса игнорируется: замер и история получают время приема
+        self.assertFalse(MudParameterLog.objects.filter(measurement_time__year=2026, measurement_time__month=1).exists())
+        self.assertEqual(MudParameterLog.objects.count(), 2)
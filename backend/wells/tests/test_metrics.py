@@ -0,0 +1,41 @@
+# backend/wells/tests/test_metrics.py
+import asyncio
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from .. import metrics
+from ..models import Well
+from .common import test_settings
+
+
+@test_settings
+class MetricsTests(TestCase):
+    """Сериализация меряется только у наших сериализаторов и рендерера, DRF не патчится."""
+
+    def setUp(self):
+        self.client = APIClient(SERVER_NAME='localhost')
+
+    def serializer_seconds(self, route: str) -> float:
+        key = ('http_request_serializer_seconds', (('method', 'GET'), ('route', route)))
+        return metrics._snapshot().get(key, [0, 0])[-2]
+
+    def test_serializer_time_recorded(self):
+        Well.objects.create(name="Куст 12 скважина 1")
+        before = self.serializer_seconds('well-list')
+        self.assertEqual(self.client.get('/api/wells/').status_code, 200)
+        self.assertGreater(self.serializer_seconds('well-list'), before)
+        # Остальные пользователи DRF в процессе не затронуты
+        self.assertEqual(serializers.Serializer.data.fget.__module__, 'rest_framework.serializers')
+        self.assertEqual(serializers.ListSerializer.data.fget.__module__, 'rest_framework.serializers')
+        self.assertEqual(JSONRenderer.render.__module__, 'rest_framework.renderers')
+
+    def test_async_middleware(self):
+        async def view(request):
+            return HttpResponse("ok")
+
+        middleware = metrics.MetricsMiddleware(view)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        response = asyncio.run(middleware(RequestFactory().get('/api/events/')))
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,70 @@
+# backend/wells/tests/test_parser.py
+import random
+from unittest import mock
+from django.test import SimpleTestCase
+from .. import parser
+from ..parser import parse_mud_parameters, _parse_mud_parameters_sequential
+
+# Сводки, на которых однопроходный и пошаговый парсеры могли бы разойтись:
+# регистр, двойники букв, склеенные токены, повторы, пустые значения
+MUD_PARAMS_CORPUS = [
+    "Пл - 1.18\nУВ - 45\nПВ - 18\nДНС - 60\nСНС - 12/20\nФ - 6\nPH - 9\n",
+    "Пл-1,18; УВ-45; ПВ-18; ДНС 60; СНС 12/20; Ф-6; ТФ-1.5; PH-9; CL-1200; Ca-40; мел-3; K-2; смазка-1; МБТ-10",
+    "пл - 1.18 пл - 1.2 уВ - 45 ув - 46 ph - 8 PH - 9",
+    "ТФ - 1 ТФ - 2 Ф - 5 Ф - 6 ДНС - 50 ДНC - 60 СНС - 1/2 СНС - 3/4 Pf/mf - 0.1/0.2 Pf/mf - 0.3/",
+    "СL - 1200 Сl - 1300 CaCO3 - 4 К+ - 3 MBT - 9",
+    "Пл - 1.2.3 УВ - . ПВ - , Ф - 6,5 Pf/mf - / ",
+    "Пл-1.18УВ-45ПВ-18",
+    "ТФ-1ТФ-1 Ф-2Ф-3 ДНС60ДНС60",
+    "ᲃНС - 12/20 ᲃL - 5",
+    "Параметры в норме, замечаний нет",
+    "",
+]
+ALIASES = [
+    'ТФ', 'тф', 'Ф', 'ДНС', 'ДНC', 'днс', 'Пл', 'пл', 'УВ', 'ПВ', 'PH', 'ph', 'CL', 'СL', 'Ca', 'мел', 'CaCO3',
+    'К+', 'К', 'Кк', 'K', 'KK', 'смазка', 'МБТ', 'MBT', 'СНС', 'снс', 'ᲃНС', 'Pf/mf',
+]
+SEPARATORS = [' - ', '-', '--', ' ', ' -- ', '', '—']
+VALUES = ['1.18', '1,18', '45', '1.2.3', '.', '', ',', '12/20', '12 / 20', '0.1/0.2', '/', '7/', 'abc']
+GLUE = ['\n', ' ', '; ', ', ', '', ';', 'x', '\t']
+
+
+class MudParametersParserTests(SimpleTestCase):
+    """Однопроходный парсер совпадает с эталонным пошаговым (_MUD_TOKENS не должен разойтись с шагами)."""
+
+    def assertSameAsSequential(self, text: str):
+        self.assertEqual(parse_mud_parameters(text), _parse_mud_parameters_sequential(text), repr(text))
+
+    def test_corpus(self):
+        for text in MUD_PARAMS_CORPUS:
+            self.assertSameAsSequential(text)
+        self.assertEqual(parse_mud_parameters(MUD_PARAMS_CORPUS[0]), {
+            'filtration': 6.0, 'yield_point': 60.0, 'density': 1.18, 'viscosity': 45.0, 'plastic_viscosity': 18.0,
+            'ph': 9.0, 'gel_strength_10s': 12.0, 'gel_strength_10m': 20.0,
+        })
+
+    def test_glued_input_uses_sequential(self):
+        sequential = mock.patch.object(
+            parser, '_parse_mud_parameters_sequential', wraps=_parse_mud_parameters_sequential,
+        )
+        # Токены вплотную: удаление одного меняет соседей — разбор отдается эталону
+        with sequential as fallback:
+            self.assertEqual(parse_mud_parameters("Пл-1.18УВ-45ПВ-18"), {
+                'density': 1.18, 'viscosity': 45.0, 'plastic_viscosity': 18.0,
+            })
+            self.assertEqual(fallback.call_count, 1)
+            parse_mud_parameters("ТФ-1ТФ-1 Ф-2Ф-3 ДНС60ДНС60")
+            self.assertEqual(fallback.call_count, 2)
+        # Обычная сводка — без запасного пути
+        with sequential as fallback:
+            parse_mud_parameters(MUD_PARAMS_CORPUS[0])
+            parse_mud_parameters(MUD_PARAMS_CORPUS[1])
+            fallback.assert_not_called()
+
+    def test_random_tokens(self):
+        rng = random.Random(20250101)
+        for _ in range(5000):
+            self.assertSameAsSequential(''.join(
+                rng.choice(ALIASES) + rng.choice(SEPARATORS) + rng.choice(VALUES) + rng.choice(GLUE)
+                for _ in range(rng.randint(1, 8))
+            ))
@@ -0,0 +1,35 @@
+# backend/wells/tests/test_program_import.py
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+from ..models import WellSection
+from ..program_import import parse_program, apply_program
+from .common import PROGRAM_ROWS
+
+
+class ProgramImportTests(TestCase):
+    """Разбор таблицы программы промывки: все ошибки файла — одним списком."""
+
+    def test_parse(self):
+        intervals = parse_program(PROGRAM_ROWS)
+        self.assertEqual([(item.section, item.start_depth, item.end_depth) for item in intervals], [
+            (WellSection.CONDUCTOR, 0, 700), (WellSection.CONDUCTOR, 700, 1200), (WellSection.SURFACE_CASING, 1200, 3500),
+        ])
+        self.assertEqual(intervals[0].norms['density_min'], 1.12)
+        self.assertIsNone(intervals[2].norms['viscosity_max'])
+
+    def test_errors(self):
+        with self.assertRaises(ValidationError) as caught:
+            parse_program([
+                ["Секция", "Начало", "Конец", "density_min", "density_max"],
+                ["Кондуктор", "0", "700", "1,2", "1,1"],
+                ["Кондуктор", "650", "900", "", ""],
+                ["Кондуктор", "950", "1200", "", ""],
+                ["Луна", "0", "10", "", ""],
+            ])
+        messages = caught.exception.messages
+        self.assertEqual(len(messages), 4)
+        self.assertIn("перекрываются", messages[2])
+        self.assertIn("разрыв", messages[3])
+
+        with self.assertRaises(ValidationError):
+            apply_program(parse_program(PROGRAM_ROWS), [], "Программа")
@@ -0,0 +1,312 @@
+# backend/wells/tests/test_query_budgets.py
+"""
+Бюджеты SQL-запросов: регрессионные тесты производительности.
+
+Данные — в объеме, близком к боевому (сотни скважин, тысячи замеров), и для
+каждого эндпоинта API, process_summary и списков админки проверяется, что
+число запросов не выше бюджета из query_budgets.json. Запрос "на каждую
+строку" (N+1) при таком объеме сразу выходит за бюджет.
+
+Бюджет поменялся осознанно — правим query_budgets.json в том же коммите.
+Фактические значения печатаются с QUERY_BUDGETS_REPORT=1:
+    QUERY_BUDGETS_REPORT=1 python manage.py test wells
+"""
+import os
+import json
+import uuid
+from datetime import date, timedelta
+from pathlib import Path
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver
+from django.utils import timezone
+from rest_framework.test import APIClient
+from .. import urls as wells_urls
+from ..models import (
+    Well, NVPIncident, Task, Tender, MudParameterLog, WellSection,
+    DrillingProgram, ProgramSection, DepthIntervalNorms, Job, ReceivedSummary,
+)
+from ..norm_index import invalidate_norm_index
+from ..trends import invalidate_trend_buffer
+from ..ingest import post_process_mud_log
+from ..rollups import rebuild_rollups
+from ..archive import archive_mud_logs
+from ..program_import import parse_program, apply_program
+from ..summary_history import summary_entry
+from .common import TEST_CACHES, PROGRAM_ROWS, summary_text, test_settings
+
+BUDGETS_FILE = Path(__file__).with_name('query_budgets.json')
+BUDGETS = json.loads(BUDGETS_FILE.read_text(encoding='utf-8'))
+
+WELLS = 300
+LOGS_PER_WELL = 10
+WELLS_WITH_NVP = 100
+WELLS_WITH_PROGRAM = 50
+BATCH_SIZE = 50
+
+
+@test_settings
+class QueryBudgetTests(TestCase):
+    report = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        wells = Well.objects.bulk_create([
+            Well(
+                name=f"Куст 12 скважина {number}",
+                is_active=number % 4 != 0,
+                engineers="Иванов, Петров",
+                current_depth=1800,
+                planned_depth=3500,
+                current_section=WellSection.CONDUCTOR,
+                current_operations="Бурение",
+            )
+            for number in range(WELLS)
+        ])
+        ReceivedSummary.objects.bulk_create([
+            summary_entry(summary_text(number), well=well) for number, well in enumerate(wells)
+        ])
+        NVPIncident.objects.bulk_create([
+            NVPIncident(well=well, incident_date=date(2025, 1, 1 + i), duration="2 ч", description="Прихват")
+            for well in wells[:WELLS_WITH_NVP] for i in range(2)
+        ])
+        MudParameterLog.objects.bulk_create([
+            MudParameterLog(
+                well=well, depth=1000 + i * 50, section=WellSection.CONDUCTOR,
+                density=1.1 + i * 0.01, viscosity=40 + i, plastic_viscosity=15, yield_point=50, ph=9,
+                is_out_of_norm=i % 3 == 0,
+            )
+            for well in wells for i in range(LOGS_PER_WELL)
+        ])
+
+        rebuild_rollups()
+
+        programs = DrillingProgram.objects.bulk_create([
+            DrillingProgram(well=well, name="Программа промывки") for well in wells[:WELLS_WITH_PROGRAM]
+        ])
+        sections = ProgramSection.objects.bulk_create([
+            ProgramSection(program=program, section_type=section_type)
+            for program in programs
+            for section_type in (WellSection.DIRECTION, WellSection.CONDUCTOR, WellSection.SURFACE_CASING)
+        ])
+        DepthIntervalNorms.objects.bulk_create([
+            DepthIntervalNorms(
+                section=section, start_depth=start, end_depth=start + 1500,
+                density_min=1.1, density_max=1.2, viscosity_min=30, viscosity_max=60, ph_min=8, ph_max=10,
+            )
+            for section in sections for start in (0, 1500)
+        ])
+
+        Task.objects.bulk_create([
+            Task(title=f"Задача {i}", customer="Заказчик", deadline=now + timedelta(days=i), is_completed=i % 5 == 0)
+            for i in range(40)
+        ])
+        Tender.objects.bulk_create([
+            Tender(name=f"Тендер {i}", deadline=now + timedelta(days=i - 10) if i % 3 else None)
+            for i in range(30)
+        ])
+        cls.admin_user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def setUp(self):
+        for alias in TEST_CACHES:
+            caches[alias].clear()
+        invalidate_norm_index()
+        self.client = APIClient(SERVER_NAME='localhost')
+        self.well = Well.objects.filter(drilling_program__isnull=False).order_by('pk').first()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        if os.environ.get('QUERY_BUDGETS_REPORT') and cls.report:
+            print("\nФактическое число запросов:")
+            for key in sorted(cls.report):
+                print(f"  {key}: {cls.report[key]}")
+
+    # --- проверка бюджета ---
+
+    def assertWithinBudget(self, section: str, key: str, func):
+        """Выполняет func и сверяет число запросов с бюджетом section/key."""
+        budget = BUDGETS[section].get(key)
+        self.assertIsNotNone(budget, f"Нет бюджета для {section}/{key} в {BUDGETS_FILE.name}")
+        with CaptureQueriesContext(connection) as captured:
+            result = func()
+        report_key = f"{section}/{key}"
+        self.report[report_key] = max(self.report.get(report_key, 0), len(captured))
+        if len(captured) > budget:
+            queries = "\n".join(query['sql'][:300] for query in captured.captured_queries[:15])
+            self.fail(f"{section}/{key}: {len(captured)} запросов при бюджете {budget}. Первые запросы:\n{queries}")
+        return result
+
+    def api(self, key: str, method: str, url: str, expected_status: int = 200, **kwargs):
+        def call():
+            response = getattr(self.client, method)(url, **kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+            if response.streaming:
+                # запросы потокового ответа выполняются при чтении
+                response.streamed_content = b''.join(response.streaming_content)
+            return response
+        response = self.assertWithinBudget('api', key, call)
+        self.assertEqual(response.status_code, expected_status, f"{key}: {response.status_code}")
+        return response
+
+    # --- API ---
+
+    def test_every_api_route_has_budget(self):
+        def names(patterns):
+            for pattern in patterns:
+                if isinstance(pattern, URLResolver):
+                    yield from names(pattern.url_patterns)
+                elif isinstance(pattern, URLPattern) and pattern.name:
+                    yield pattern.name
+
+        budgeted = {key.split(' ', 1)[1] for key in BUDGETS['api']}
+        missing = sorted(set(names(wells_urls.urlpatterns)) - budgeted)
+        self.assertEqual(missing, [], "У маршрутов нет бюджета в query_budgets.json")
+
+    def test_api_root(self):
+        self.api('GET api-root', 'get', '/api/')
+
+    def test_well_list(self):
+        response = self.api('GET well-list', 'get', '/api/wells/')
+        self.assertEqual(len(response.json()['results']), 100)
+        self.api('GET well-list', 'get', '/api/wells/', data={'expand': 'nvp_incidents'})
+        # теплый кэш ответов — без запросов к данным
+        self.api('GET well-list', 'get', '/api/wells/', data={'expand': 'nvp_incidents'})
+
+    def test_well_list_next_page(self):
+        first = self.client.get('/api/wells/').json()
+        self.api('GET well-list', 'get', first['next'])
+
+    def test_well_detail(self):
+        self.api('GET well-detail', 'get', f'/api/wells/{self.well.pk}/')
+
+    def test_well_create_update_delete(self):
+        response = self.api('POST well-list', 'post', '/api/wells/', data={'name': 'Новая скважина'}, format='json',
+                            expected_status=201)
+        well_id = response.json()['id']
+        self.api('PATCH well-detail', 'patch', f'/api/wells/{well_id}/', data={'current_depth': 10}, format='json')
+        self.api('DELETE well-detail', 'delete', f'/api/wells/{self.well.pk}/', expected_status=204)
+
+    def test_well_timeseries(self):
+        self.api('GET well-timeseries', 'get', f'/api/wells/{self.well.pk}/timeseries/',
+                 data={'params': 'density,viscosity,ph', 'points': 100})
+
+    def test_well_rollups(self):
+        self.api('GET well-rollups', 'get', f'/api/wells/{self.well.pk}/rollups/',
+                 data={'period': 'day', 'params': 'density,viscosity,ph'})
+
+    def test_mud_logs(self):
+        response = self.api('GET well-mud-logs', 'get', f'/api/wells/{self.well.pk}/mud-logs/',
+                            data={'is_out_of_norm': 'true'})
+        log_id = response.json()['results'][0]['id']
+        self.api('GET well-mud-log-detail', 'get', f'/api/wells/{self.well.pk}/mud-logs/{log_id}/')
+
+    def test_mud_logs_archived_well(self):
+        url = f'/api/wells/{self.well.pk}/mud-logs/'
+        before = self.client.get(url, data={'page_size': 4}).json()
+        Well.objects.filter(pk=self.well.pk).update(is_active=False)
+        stats = archive_mud_logs([self.well.pk], cutoff=timezone.now() + timedelta(seconds=1))
+        self.assertEqual(stats['logs'], LOGS_PER_WELL)
+        self.assertFalse(MudParameterLog.objects.filter(well=self.well).exists())
+
+        # из архива — те же страницы и те же замеры
+        response = self.api('GET well-mud-logs', 'get', url, data={'page_size': 4})
+        self.assertEqual(response.json()['results'], before['results'])
+        next_page = self.api('GET well-mud-logs', 'get', response.json()['next'])
+        self.assertEqual(len(next_page.json()['results']), 4)
+        log_entry = before['results'][0]
+        detail = self.api('GET well-mud-log-detail', 'get', f"{url}{log_entry['id']}/")
+        self.assertEqual(detail.json(), log_entry)
+        export = self.api('GET mud-logs-export', 'get', '/api/mud-logs/export/', data={'well': self.well.pk})
+        self.assertEqual(len(export.streamed_content.decode('utf-8-sig').splitlines()), LOGS_PER_WELL + 1)
+
+    def test_mud_logs_export(self):
+        response = self.api('GET mud-logs-export', 'get', '/api/mud-logs/export/', data={'well': self.well.pk})
+        lines = response.streamed_content.decode('utf-8-sig').splitlines()
+        self.assertEqual(len(lines), LOGS_PER_WELL + 1)
+        response = self.api('GET mud-logs-export', 'get', '/api/mud-logs/export/',
+                            data={'format': 'xlsx', 'is_out_of_norm': 'true'})
+        self.assertEqual(response.streamed_content[:2], b'PK')
+        response = self.api('GET mud-logs-export', 'get', '/api/mud-logs/export/')
+        self.assertEqual(len(response.streamed_content.decode('utf-8-sig').splitlines()), WELLS * LOGS_PER_WELL + 1)
+
+    def test_tasks(self):
+        self.api('GET task-list', 'get', '/api/tasks/')
+        self.api('GET task-detail', 'get', f'/api/tasks/{Task.objects.filter(is_completed=False).first().pk}/')
+
+    def test_tenders(self):
+        self.api('GET tender-list', 'get', '/api/tenders/')
+        self.api('GET tender-detail', 'get', f'/api/tenders/{Tender.objects.first().pk}/')
+
+    def test_dashboard(self):
+        version = self.api('GET dashboard', 'get', '/api/dashboard/').json()['version']
+        self.api('GET dashboard', 'get', '/api/dashboard/', data={'version': version})
+
+    def test_changes(self):
+        cursor = self.api('GET changes', 'get', '/api/changes/').json()['cursor']
+        self.api('GET changes', 'get', '/api/changes/', data={'since': cursor})
+
+    def test_events_outside_asgi(self):
+        # Поток SSE работает только под ASGI; тестовый клиент — WSGI
+        self.api('GET events', 'get', '/api/events/', expected_status=501)
+
+    def test_link_telegram(self):
+        self.api('POST well-link-telegram', 'post', '/api/wells/link-telegram/',
+                 data={'name': self.well.name, 'telegram_chat_id': -100123, 'telegram_topic_id': 5}, format='json')
+
+    # --- обработка сводок ---
+
+    def test_process_summary_existing_well(self):
+        number = int(self.well.name.rsplit(' ', 1)[1])
+        self.api('POST well-process-summary', 'post', '/api/wells/process-summary/',
+                 data={'text': summary_text(number, depth=1850)}, format='json')
+        # повтор той же сводки — ответ по отпечатку
+        self.api('POST well-process-summary', 'post', '/api/wells/process-summary/',
+                 data={'text': summary_text(number, depth=1850)}, format='json')
+
+    def test_process_summary_new_well(self):
+        self.api('POST well-process-summary', 'post', '/api/wells/process-summary/',
+                 data={'text': summary_text(WELLS + 1)}, format='json')
+
+    def test_process_summaries_batch(self):
+        summaries = [
+            {'text': summary_text(number, depth=1900, marker=uuid.uuid4().hex)}
+            for number in range(WELLS - BATCH_SIZE // 2, WELLS + BATCH_SIZE // 2)
+        ]
+        response = self.api('POST well-process-summaries', 'post', '/api/wells/process-summaries/',
+                            data={'summaries': summaries}, format='json')
+        self.assertEqual(len(response.json()['results']), BATCH_SIZE)
+
+    def test_post_processing_job(self):
+        self.client.post('/api/wells/process-summary/', data={'text': summary_text(1, depth=1850)}, format='json')
+        job = Job.objects.latest('pk')
+        # холодные индекс норм и буфер трендов — как в только что запущенном воркере
+        invalidate_norm_index()
+        invalidate_trend_buffer(MudParameterLog.objects.get(pk=job.payload['mud_log_id']).well_id)
+        self.assertWithinBudget('background', 'post_process_mud_log', lambda: post_process_mud_log(job.payload))
+
+    def test_import_drilling_program(self):
+        # Все скважины без программы разом: число запросов не зависит от числа скважин
+        wells = list(Well.objects.filter(drilling_program__isnull=True))
+        intervals = parse_program(PROGRAM_ROWS)
+        stats = self.assertWithinBudget(
+            'background', 'import_drilling_program', lambda: apply_program(intervals, wells, "Типовая программа"),
+        )
+        self.assertEqual(stats['intervals'], len(wells) * len(intervals))
+        self.assertEqual(DepthIntervalNorms.objects.filter(section__program__well=wells[0]).count(), len(intervals))
+
+    # --- админка ---
+
+    def test_admin_changelists(self):
+        self.client.force_login(self.admin_user)
+        for key, url in (
+            ('wells_well_changelist', '/admin/wells/well/'),
+            ('wells_mudparameterlog_changelist', '/admin/wells/mudparameterlog/'),
+        ):
+            response = self.assertWithinBudget('admin', key, lambda: self.client.get(url))
+            self.assertEqual(response.status_code, 200)
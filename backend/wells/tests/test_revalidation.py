@@ -0,0 +1,90 @@
+# backend/wells/tests/test_revalidation.py
+import copy
+import random
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from ..models import Well, MudParameterLog, DrillingProgram, ProgramSection, DepthIntervalNorms, WellSection
+from ..norm_index import invalidate_norm_index
+from ..revalidation import revalidate_mud_logs, PARAM_NAMES
+from ..validator import validate_mud_parameters
+
+
+class RevalidationTests(TestCase):
+    """Векторная перепроверка дает те же флаги, что и валидатор при приеме сводки."""
+
+    def setUp(self):
+        invalidate_norm_index()
+        self.well = Well.objects.create(name="Куст 12 скважина 1")
+        program = DrillingProgram.objects.create(well=self.well, name="Программа промывки")
+
+        def section(section_type, *intervals):
+            program_section = ProgramSection.objects.create(program=program, section_type=section_type)
+            for start, end, norms in intervals:
+                DepthIntervalNorms.objects.create(section=program_section, start_depth=start, end_depth=end, **norms)
+
+        # Несколько интервалов с общей границей 700 (на ней — два интервала, нормы нет)
+        section(
+            WellSection.CONDUCTOR,
+            (0, 700, {'density_min': 1.12, 'density_max': 1.18, 'viscosity_min': 35, 'viscosity_max': 60}),
+            (700, 1200, {'density_min': 1.14, 'density_max': 1.2, 'ph_max': 9.5}),
+        )
+        # Секция такого типа в программе дважды — норма не применяется
+        section(WellSection.SURFACE_CASING, (1200, 2500, {'density_max': 1.0}))
+        section(WellSection.SURFACE_CASING, (1200, 2500, {'density_max': 1.0}))
+        # Интервал нулевой длины: start_depth == depth == end_depth
+        section(WellSection.PRODUCTION_CASING, (3000, 3000, {'ph_min': 8, 'ph_max': 9, 'filtration_max': 6}))
+        # Только одна граница
+        section(WellSection.DIRECTION, (0, 100, {'viscosity_min': 40}))
+
+        rng = random.Random(9)
+        depths = [0, 50, 100, 350, 699.9, 700, 700.1, 1200, 1800, 2999.9, 3000, 3000.1, 5000]
+        sections = list(WellSection.values) + ['Неизвестная секция']
+        logs = []
+        for _ in range(600):
+            values = {
+                'density': rng.choice([None, 1.05, 1.12, 1.15, 1.18, 1.19, 1.25]),
+                'viscosity': rng.choice([None, 30, 35, 45, 60, 70]),
+                'ph': rng.choice([None, 7.5, 8, 8.5, 9, 9.6]),
+                'filtration': rng.choice([None, 4, 6, 7]),
+            }
+            logs.append(MudParameterLog(
+                well=self.well, depth=rng.choice(depths), section=rng.choice(sections),
+                is_out_of_norm=rng.random() < 0.5, **values,
+            ))
+        # История до миграции 0012: без глубины и секции
+        logs.append(MudParameterLog(well=self.well, density=2.0, is_out_of_norm=False))
+        MudParameterLog.objects.bulk_create(logs)
+
+    def expected_flag(self, log_entry) -> bool:
+        well = copy.copy(self.well)
+        well.current_section = log_entry.section
+        params = {name: getattr(log_entry, name) for name in PARAM_NAMES if getattr(log_entry, name) is not None}
+        return validate_mud_parameters(well, params, log_entry.depth)
+
+    def test_flags_match_validator(self):
+        stats = revalidate_mud_logs()
+        self.assertEqual(stats['skipped'], 1)
+        self.assertEqual(stats['checked'], 600)
+        self.assertGreater(stats['changed'], 0)
+
+        logs = MudParameterLog.objects.order_by('pk')
+        mismatched = [
+            (log_entry.depth, log_entry.section, log_entry.is_out_of_norm)
+            for log_entry in logs.filter(depth__isnull=False)
+            if log_entry.is_out_of_norm != self.expected_flag(log_entry)
+        ]
+        self.assertEqual(mismatched, [])
+        # Флаги хорошо перемешаны: проверка не вырождена
+        self.assertTrue(logs.filter(is_out_of_norm=True).exists())
+        self.assertTrue(logs.filter(is_out_of_norm=False, depth__isnull=False).exists())
+        # Лог без глубины/секции не тронут
+        self.assertFalse(logs.get(depth__isnull=True).is_out_of_norm)
+
+        # Повтор ничего не меняет
+        self.assertEqual(revalidate_mud_logs()['changed'], 0)
+
+    def test_command_reports_unchecked(self):
+        out = StringIO()
+        call_command('revalidate_mud_logs', '--dry-run', stdout=out)
+        self.assertIn("Не проверено: 1", out.getvalue())
@@ -0,0 +1,115 @@
+# backend/wells/tests/test_summary_history.py
+import io
+from datetime import timedelta
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from ..models import Well, MudParameterLog, ReceivedSummary
+from ..norm_index import invalidate_norm_index
+from ..management.commands.replay_summaries import Command as ReplayCommand
+from ..summary_history import summary_entry, decompress_summary, parse_history_chunk, attach_unassigned_chunk
+from ..parser import summary_fingerprint
+from .common import summary_text, test_settings
+
+
+@test_settings
+class SummaryReplayTests(TestCase):
+    """История сводок и ее повтор: replay_summaries восстанавливает скважины и замеры."""
+
+    def setUp(self):
+        invalidate_norm_index()
+        self.client = APIClient(SERVER_NAME='localhost')
+
+    def test_unrecognized_retries_stored_once(self):
+        unrecognized = summary_text(2).replace("скв", "скв-на")
+        for _ in range(3):
+            response = self.client.post('/api/wells/process-summary/', data={'text': unrecognized}, format='json')
+            self.assertEqual(response.status_code, 400)
+            response = self.client.post('/api/wells/process-summaries/', data={
+                'summaries': [{'text': unrecognized}, {'text': summary_text(1)}],
+            }, format='json')
+            self.assertEqual([result['status'] for result in response.json()['results']][0], 'error')
+        self.assertEqual(ReceivedSummary.objects.filter(well__isnull=True).count(), 1)
+
+    def test_history_and_replay(self):
+        texts = [summary_text(1, depth=1700 + i * 50, marker=str(i)) for i in range(3)]
+        unrecognized = summary_text(2).replace("скв", "скв-на")
+        response = self.client.post('/api/wells/process-summaries/', data={
+            'summaries': [{'text': text} for text in texts + [unrecognized]],
+        }, format='json')
+        results = response.json()['results']
+        self.assertEqual([result['status'] for result in results], ['ok', 'ok', 'ok', 'error'])
+
+        well = Well.objects.get(pk=results[0]['well_id'])
+        history = list(ReceivedSummary.objects.filter(well=well).order_by('id'))
+        self.assertEqual([decompress_summary(entry.compressed_text) for entry in history], texts)
+        self.assertEqual(history[0].content_hash, summary_fingerprint(texts[0]))
+        self.assertEqual(ReceivedSummary.objects.filter(well__isnull=True).count(), 1)
+        response = self.client.get(f'/api/wells/{well.pk}/', data={'fields': 'last_summary_text'})
+        self.assertEqual(response.json()['last_summary_text'], texts[-1])
+
+        # Порча, которую повтор должен исправить: неверное значение, лишнее поле, удаленный замер
+        logs = {log_entry.pk: log_entry for log_entry in MudParameterLog.objects.filter(well=well)}
+        first_id, second_id, third_id = sorted(logs)
+        MudParameterLog.objects.filter(pk=first_id).update(density=9.99)
+        Well.objects.filter(pk=well.pk).update(current_depth=0, current_operations="?")
+        MudParameterLog.objects.filter(pk=third_id).delete()
+
+        call_command('replay_summaries', workers=1, stdout=io.StringIO())
+
+        well.refresh_from_db()
+        self.assertEqual(well.current_depth, 1800)
+        self.assertEqual(well.current_operations, "Бурение 2")
+        restored = MudParameterLog.objects.get(pk=first_id)
+        self.assertEqual(restored.density, logs[first_id].density)
+        self.assertEqual(restored.measurement_time, logs[first_id].measurement_time)
+        self.assertEqual(MudParameterLog.objects.filter(well=well).count(), 3)
+        self.assertEqual(ReceivedSummary.objects.get(pk=history[2].pk).mud_log.depth, 1800)
+
+        # Повтор идемпотентен
+        call_command('replay_summaries', workers=1, stdout=io.StringIO())
+        self.assertEqual(MudParameterLog.objects.filter(well=well).count(), 3)
+
+    def test_attach_after_parser_fix(self):
+        text = summary_text(5).replace("скв", "скв-на")
+        self.client.post('/api/wells/process-summary/', data={'text': text}, format='json')
+        entry = ReceivedSummary.objects.get(well__isnull=True)
+
+        # Исправленный парсер видит название — сводка привязывается к новой скважине
+        fixed_text = text.replace("скв-на", "скв")
+        parsed = parse_history_chunk([(entry.pk, summary_entry(fixed_text).compressed_text)])
+        stats = {'attached': 0, 'wells_created': 0}
+        attach_unassigned_chunk([(entry.pk, entry.content_hash)], parsed, stats)
+        self.assertEqual(stats, {'attached': 1, 'wells_created': 1})
+        entry.refresh_from_db()
+        self.assertEqual(entry.well.name, "Куст 12 скважина 5")
+
+    def test_history_read_in_pages(self):
+        start = timezone.now() - timedelta(days=1)
+        entries = []
+        for number in (1, 2):
+            well = Well.objects.create(name=f"Куст 12 скважина {number}")
+            for i in range(7):
+                entry = summary_entry(summary_text(number, marker=str(i)), well=well)
+                # По две сводки на одно время: страницы различают их по id
+                entry.received_at = start + timedelta(minutes=i // 2)
+                entries.append(entry)
+        ReceivedSummary.objects.bulk_create(entries[::-1])
+        expected = list(
+            ReceivedSummary.objects.order_by('well_id', 'received_at', 'id')
+            .values_list('id', 'well_id', 'received_at', 'mud_log_id', 'compressed_text')
+        )
+
+        command = ReplayCommand()
+        command.chunk_size = 3
+        with CaptureQueriesContext(connection) as queries:
+            chunks = list(command._history_chunks(None))
+        self.assertEqual([len(chunk) for chunk in chunks], [3, 3, 3, 3, 2])
+        self.assertEqual([row for chunk in chunks for row in chunk], expected)
+        # Историю скважины целиком не читает ни один запрос
+        pages = [query['sql'] for query in queries.captured_queries if 'compressed_text' in query['sql']]
+        self.assertTrue(pages)
+        self.assertTrue(all('LIMIT' in sql for sql in pages))
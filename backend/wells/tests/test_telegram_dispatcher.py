@@ -0,0 +1,168 @@
+# backend/wells/tests/test_telegram_dispatcher.py
+import json
+import re
+import threading
+import time
+from html.parser import HTMLParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from django.test import SimpleTestCase
+from ..telegram_dispatcher import TelegramDispatcher, TelegramSendError, split_message, MAX_MESSAGE_LENGTH
+
+
+class FakeTelegramHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        server = self.server
+        with server.lock:
+            server.requests.append((time.monotonic(), self.path, payload))
+            status, body = server.responses.pop(0) if server.responses else (200, {'ok': True, 'result': {}})
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TagBalanceChecker(HTMLParser):
+    """Проверяет, что в части сообщения все теги закрыты и сущности целы."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.stack = []
+        self.text = []
+
+    def handle_starttag(self, tag, attrs):
+        self.stack.append(tag)
+
+    def handle_endtag(self, tag):
+        assert self.stack and self.stack[-1] == tag, f"лишний </{tag}>"
+        self.stack.pop()
+
+    def handle_data(self, data):
+        assert '&' not in data, f"разрезанная сущность: {data[:20]!r}"
+        self.text.append(data)
+
+    def handle_entityref(self, name):
+        self.text.append(f'&{name};')
+
+    def handle_charref(self, name):
+        self.text.append(f'&#{name};')
+
+
+def visible_text(part: str) -> str:
+    checker = TagBalanceChecker()
+    checker.feed(part)
+    checker.close()
+    assert not checker.stack, f"незакрытые теги: {checker.stack}"
+    return ''.join(checker.text)
+
+
+class SplitMessageTests(SimpleTestCase):
+
+    def assertValidParts(self, text: str, parts: list):
+        self.assertGreater(len(parts), 1)
+        for part in parts:
+            self.assertLessEqual(len(part), MAX_MESSAGE_LENGTH)
+        # Текст без тегов сохраняется целиком (с точностью до пробелов на месте разреза)
+        self.assertEqual(
+            re.sub(r'\s+', '', ''.join(visible_text(part) for part in parts)),
+            re.sub(r'\s+', '', visible_text(text)),
+        )
+
+    def test_entities_and_tags_not_cut(self):
+        text = '<b>' + '&lt;' * 2000 + '</b>'
+        parts = split_message(text)
+        self.assertValidParts(text, parts)
+        for part in parts:
+            self.assertTrue(part.startswith('<b>&lt;') and part.endswith('&lt;</b>'), part[-10:])
+
+    def test_alerts_split_between_paragraphs(self):
+        text = "🔔 <b>Оповещение Куст 12 скважина 1</b>\n\n" + "\n\n".join(
+            f"<b>Тревога {i}</b>: <i>плотность 1,25 &gt; нормы {'x' * 40}</i>" for i in range(150)
+        )
+        parts = split_message(text)
+        self.assertValidParts(text, parts)
+        for part in parts[1:]:
+            self.assertTrue(part.startswith('<b>Тревога'), part[:20])
+
+    def test_plain_text(self):
+        self.assertEqual(split_message('a' * 10, limit=4, html=False), ['aaaa', 'aaaa', 'aa'])
+        self.assertEqual(split_message('<b>aaaa bbbb</b>', limit=12), ['<b>aaaa</b>', '<b>bbbb</b>'])
+
+
+class TelegramDispatcherTests(SimpleTestCase):
+    """Диспетчер против локального HTTP-сервера вместо api.telegram.org."""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeTelegramHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.responses = []
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def dispatcher(self, **options) -> TelegramDispatcher:
+        options = {
+            'global_rate': 1000, 'chat_rate': 1000, 'group_rate_per_minute': 60000, 'backoff_base': 0.01, **options,
+        }
+        dispatcher = TelegramDispatcher('TOKEN', api_url=f'http://127.0.0.1:{self.server.server_port}', **options)
+        self.addCleanup(dispatcher.session.close)
+        return dispatcher
+
+    def request_times(self) -> list:
+        return [requested_at for requested_at, _, _ in self.server.requests]
+
+    def test_retry_after(self):
+        self.server.responses = [
+            (429, {'ok': False, 'description': 'Too Many Requests', 'parameters': {'retry_after': 0.3}}),
+        ]
+        self.dispatcher().send_message(1, "Тревога")
+        first, second = self.request_times()
+        self.assertGreaterEqual(second - first, 0.3)
+        self.assertEqual(self.server.requests[0][1], '/botTOKEN/sendMessage')
+
+    def test_client_error_not_retried(self):
+        self.server.responses = [(400, {'ok': False, 'description': "Bad Request: can't parse entities"})]
+        with self.assertRaises(TelegramSendError) as caught:
+            self.dispatcher().send_message(1, "<b>Тревога")
+        self.assertFalse(caught.exception.retryable)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_server_error_retried(self):
+        self.server.responses = [(502, {'ok': False})] * 2
+        self.dispatcher().send_message(1, "Тревога")
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_chat_rate(self):
+        self.dispatcher(chat_rate=5).send_message(1, "Тревога\n\n" * 1000 + "конец", parse_mode=None)
+        times = self.request_times()
+        self.assertGreaterEqual(len(times), 3)
+        # В один чат — не чаще 5 сообщений в секунду
+        self.assertGreaterEqual(times[-1] - times[0], (len(times) - 1) / 5 - 0.02)
+
+    def test_global_rate(self):
+        dispatcher = self.dispatcher(global_rate=5)
+        started = time.monotonic()
+        for chat_id in range(1, 9):
+            dispatcher.send_message(chat_id, "Тревога")
+        # Первые 5 — из запаса, остальные 3 — по одному в 0,2 с
+        self.assertGreaterEqual(time.monotonic() - started, 3 / 5 - 0.02)
+        self.assertEqual(len(self.server.requests), 8)
+
+    def test_multipart_message(self):
+        text = "🔔 <b>Оповещение</b>\n\n" + "\n\n".join(f"<b>Тревога {i}</b>: <i>{'&lt;' * 300}</i>" for i in range(40))
+        results = self.dispatcher().send_message(-100500, text, topic_id=7)
+        parts = [payload for _, _, payload in self.server.requests]
+        self.assertEqual(len(results), len(parts))
+        self.assertGreater(len(parts), 1)
+        for payload in parts:
+            self.assertEqual(payload['parse_mode'], 'HTML')
+            self.assertEqual(payload['message_thread_id'], 7)
+            self.assertLessEqual(len(payload['text']), MAX_MESSAGE_LENGTH)
+            visible_text(payload['text'])
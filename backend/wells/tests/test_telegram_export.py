@@ -0,0 +1,169 @@
+# backend/wells/tests/test_telegram_export.py
+import io
+import os
+import json
+import tempfile
+from unittest import mock
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from .. import telegram_export
+from ..telegram_export import ExportFormatError, iter_export_messages, message_text
+from ..management.commands.backfill_telegram_export import Command as BackfillCommand
+from ..models import MudParameterLog, ProcessedSummary
+from ..norm_index import invalidate_norm_index
+from .common import summary_text, test_settings
+
+
+def export_messages() -> tuple:
+    """Сообщения двух чатов полного экспорта: сводки, повтор, служебное и обычное сообщение."""
+    summaries = [
+        {'id': 1, 'type': 'service', 'action': 'create_group', 'date_unixtime': '1767225600'},
+        {'id': 2, 'type': 'message', 'date_unixtime': '1767229200', 'text': summary_text(1, 1800)},
+        # Текст с форматированием — список строк и кусочков
+        {'id': 3, 'type': 'message', 'date_unixtime': '1767232800', 'text': [
+            {'type': 'bold', 'text': "Куст 12 скв 2\n"}, summary_text(2, 1900).split('\n', 1)[1],
+        ]},
+        {'id': 4, 'type': 'message', 'date_unixtime': '1767236400', 'text': summary_text(1, 1800)},
+        # 4-байтовые символы UTF-8 и экранированные кавычки
+        {'id': 5, 'type': 'message', 'date_unixtime': '1767240000', 'text': summary_text(3, 2000, '🛢️ "messages": [ ёЁ')},
+    ]
+    other_chat = [
+        {'id': 1, 'type': 'message', 'date': '2026-01-01T12:00:00', 'text': summary_text(4, 2100)},
+        {'id': 2, 'type': 'message', 'date_unixtime': '1767247200', 'text': "Принято 👍"},
+    ]
+    return summaries, other_chat
+
+
+def full_export(*chats) -> bytes:
+    export = {
+        'about': "Экспорт 📦",
+        'chats': {'about': "", 'list': [
+            {'name': f"Чат {i}", 'type': 'private_supergroup', 'id': i, 'messages': messages}
+            for i, messages in enumerate(chats, start=1)
+        ]},
+        'left_chats': {'about': "", 'list': [{'name': "Архив", 'messages': []}]},
+    }
+    return json.dumps(export, ensure_ascii=False, indent=1).encode('utf-8')
+
+
+class IterExportMessagesTests(TestCase):
+    """Потоковое чтение: результат не зависит от размера куска и точки продолжения."""
+
+    def setUp(self):
+        self.chats = export_messages()
+        self.expected = [message for chat in self.chats for message in chat]
+        self.data = full_export(*self.chats)
+
+    def read(self, data: bytes, start_offset: int = 0) -> list:
+        return list(iter_export_messages(io.BytesIO(data), start_offset))
+
+    def test_tiny_read_chunks(self):
+        reference = self.read(self.data)
+        self.assertEqual([message for message, _ in reference], self.expected)
+        # Куски в 1-7 байт режут и ключ "messages", и многобайтовые символы
+        for chunk_size in range(1, 8):
+            with self.subTest(chunk_size=chunk_size), mock.patch.object(telegram_export, 'READ_CHUNK_SIZE', chunk_size):
+                self.assertEqual(self.read(self.data), reference)
+
+    def test_offsets_are_bytes(self):
+        for message, end_offset in self.read(self.data):
+            self.assertEqual(self.data[end_offset - 1:end_offset], b'}')
+            # Смещение попадает на границу символа, а не внутрь многобайтового
+            self.assertTrue(self.data[:end_offset].decode('utf-8').endswith('}'))
+
+    def test_resume_from_every_offset(self):
+        reference = self.read(self.data)
+        for chunk_size in (3, 1024 * 1024):
+            with mock.patch.object(telegram_export, 'READ_CHUNK_SIZE', chunk_size):
+                for i, (_, end_offset) in enumerate(reference):
+                    with self.subTest(chunk_size=chunk_size, offset=end_offset):
+                        self.assertEqual(self.read(self.data, end_offset), reference[i + 1:])
+
+    def test_single_chat_export(self):
+        data = json.dumps({'name': "Сводки", 'messages': self.chats[0]}, ensure_ascii=False).encode('utf-8')
+        self.assertEqual([message for message, _ in self.read(data)], self.chats[0])
+
+    def test_message_text(self):
+        self.assertEqual(message_text(self.chats[0][2]), summary_text(2, 1900))
+        self.assertEqual(message_text(self.chats[0][0]), '')
+
+    def test_truncated_export(self):
+        end_offset = self.read(self.data)[2][1]
+        with mock.patch.object(telegram_export, 'READ_CHUNK_SIZE', 5):
+            with self.assertRaises(ExportFormatError):
+                self.read(self.data[:end_offset + 40])
+
+
+@test_settings
+class BackfillCommandTests(TestCase):
+    """Команда: прерванный запуск продолжается по чекпоинту, чужой чекпоинт не принимается."""
+
+    def setUp(self):
+        invalidate_norm_index()
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.export_path = os.path.join(tmp_dir.name, 'result.json')
+        with open(self.export_path, 'wb') as f:
+            f.write(full_export(*export_messages()))
+        self.checkpoint_path = f"{self.export_path}.checkpoint.json"
+
+    def backfill(self, *args) -> str:
+        out = io.StringIO()
+        call_command('backfill_telegram_export', self.export_path, '--workers', '1', '--chunk-size', '2', *args, stdout=out)
+        return out.getvalue()
+
+    def checkpoint(self) -> dict:
+        with open(self.checkpoint_path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def test_interrupt_and_resume(self):
+        write_batch = BackfillCommand._write_batch
+        written = []
+
+        def interrupt_second_batch(command, *args):
+            if written:
+                raise KeyboardInterrupt
+            written.append(args)
+            write_batch(command, *args)
+
+        with mock.patch.object(BackfillCommand, '_write_batch', autospec=True, side_effect=interrupt_second_batch):
+            self.assertIn("Прервано", self.backfill())
+        # Записана только первая пачка: служебное сообщение и сводка скважины 1
+        state = self.checkpoint()
+        self.assertEqual((state['messages'], state['summaries']), (2, 1))
+        self.assertEqual(MudParameterLog.objects.count(), 1)
+
+        output = self.backfill()
+        self.assertIn(f"Продолжаем с байта {state['offset']}", output)
+        state = self.checkpoint()
+        self.assertEqual(
+            (state['messages'], state['summaries'], state['logs'], state['duplicates']),
+            (7, 4, 4, 1),
+        )
+        self.assertEqual(ProcessedSummary.objects.count(), 4)
+        self.assertEqual(
+            sorted(MudParameterLog.objects.values_list('depth', flat=True)),
+            [1800, 1900, 2000, 2100],
+        )
+
+        # Чекпоинт в конце файла: повторный запуск ничего не пишет
+        self.backfill()
+        self.assertEqual(self.checkpoint()['summaries'], 4)
+        self.assertEqual(MudParameterLog.objects.count(), 4)
+
+    def test_checkpoint_of_other_file(self):
+        self.backfill()
+        state = self.checkpoint()
+        with open(self.export_path, 'ab') as f:
+            f.write(b'\n')
+        with self.assertRaises(CommandError):
+            self.backfill()
+        # Чекпоинт не тронут
+        self.assertEqual(self.checkpoint(), state)
+
+        # --restart читает файл заново; все сводки уже есть в БД
+        self.backfill('--restart')
+        state = self.checkpoint()
+        self.assertEqual((state['messages'], state['summaries'], state['duplicates']), (7, 0, 5))
+        self.assertEqual(MudParameterLog.objects.count(), 4)
@@ -0,0 +1,72 @@
+# backend/wells/tests/test_timeseries.py
+import random
+from datetime import timedelta
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from ..models import Well, MudParameterLog
+from ..timeseries import lttb_indices
+from .common import test_settings
+
+
+class LttbTests(SimpleTestCase):
+    """LTTB: первая и последняя точки на месте, точек не больше запрошенного."""
+
+    def test_bounds(self):
+        rng = np.random.default_rng(15)
+        for n in (1, 2, 3, 4, 10, 101, 1000):
+            x = np.sort(rng.uniform(0, 1e6, n))
+            y = rng.normal(size=n)
+            for n_out in (1, 2, 3, 5, 50, n - 1, n, n + 10):
+                if n_out < 1:
+                    continue
+                with self.subTest(n=n, n_out=n_out):
+                    selected = lttb_indices(x, y, n_out)
+                    self.assertEqual(len(selected), min(n, n_out))
+                    # Индексы возрастают и не повторяются
+                    self.assertTrue(np.all(np.diff(selected) > 0))
+                    self.assertEqual(selected[0], 0)
+                    if n_out >= 2:
+                        self.assertEqual(selected[-1], n - 1)
+
+    def test_keeps_peaks(self):
+        x = np.arange(1000, dtype=float)
+        y = np.sin(x / 50)
+        y[377], y[612] = 10, -10
+        selected = lttb_indices(x, y, 40)
+        self.assertIn(377, selected)
+        self.assertIn(612, selected)
+
+
+@test_settings
+class TimeseriesEndpointTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient(SERVER_NAME='localhost')
+        self.well = Well.objects.create(name="Куст 12 скважина 1")
+        start = timezone.now().replace(microsecond=0) - timedelta(days=7)
+        rng = random.Random(15)
+        logs = MudParameterLog.objects.bulk_create([
+            MudParameterLog(well=self.well, density=None if i % 7 == 0 else rng.uniform(1.05, 1.25))
+            for i in range(300)
+        ])
+        for i, log_entry in enumerate(logs):
+            log_entry.measurement_time = start + timedelta(minutes=30 * i)
+        MudParameterLog.objects.bulk_update(logs, ['measurement_time'])
+        self.present = [log_entry for log_entry in logs if log_entry.density is not None]
+
+    def test_points(self):
+        response = self.client.get(
+            f'/api/wells/{self.well.pk}/timeseries/', data={'params': 'density', 'points': 25}
+        )
+        self.assertEqual(response.status_code, 200)
+        density = response.json()['series']['density']
+        self.assertEqual(density['total'], len(self.present))
+        self.assertEqual(len(density['t']), 25)
+        self.assertEqual(len(density['v']), 25)
+        first, last = self.present[0], self.present[-1]
+        self.assertEqual(density['t'][0], int(first.measurement_time.timestamp() * 1000))
+        self.assertEqual(density['t'][-1], int(last.measurement_time.timestamp() * 1000))
+        self.assertEqual((density['v'][0], density['v'][-1]), (first.density, last.density))
+        self.assertEqual(density['t'], sorted(density['t']))
@@ -0,0 +1,167 @@
+# backend/wells/tests/test_trends.py
+from datetime import timedelta
+from unittest import mock
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from .. import trends
+from ..models import Well, MudParameterLog
+from ..trends import (
+    TrendRule, TrendBuffer, SLOPE, EWMA, DELTA, UP, DOWN, BOTH, BUFFER_SIZE,
+    check_trends, get_trend_buffer, invalidate_trend_buffer,
+)
+
+START = timezone.now().replace(microsecond=0) - timedelta(days=1)
+
+
+class TrendRuleTests(SimpleTestCase):
+    """Правила на синтетических рядах: буфер заполняется в памяти, без БД."""
+
+    well_id = -1
+
+    def setUp(self):
+        self.addCleanup(invalidate_trend_buffer, self.well_id)
+        self.next_pk = 1
+
+    def feed(self, rule: TrendRule, values, hours=None, param=None, fresh=True) -> list:
+        """
+        Прогоняет ряд через check_trends с одним правилом (fresh — с пустого буфера).
+        Возвращает предупреждения по каждому замеру.
+        """
+        if fresh:
+            trends._buffers[self.well_id] = TrendBuffer()
+        hours = range(len(values)) if hours is None else hours
+        fired = []
+        with mock.patch.object(trends, 'TREND_RULES', (rule,)):
+            for hour, value in zip(hours, values):
+                log_entry = MudParameterLog(
+                    pk=self.next_pk, well_id=self.well_id, measurement_time=START + timedelta(hours=hour),
+                    **{param or rule.param: value},
+                )
+                self.next_pk += 1
+                fired.append(check_trends(log_entry)['warning'])
+        return fired
+
+    def test_slope_direction(self):
+        rising, falling = [1.10, 1.13, 1.16], [1.16, 1.13, 1.10]
+        up = TrendRule(SLOPE, 'density', threshold=0.02, window=6)
+        self.assertTrue(self.feed(up, rising)[-1])
+        self.assertFalse(self.feed(up, falling)[-1])
+        self.assertTrue(self.feed(up._replace(direction=DOWN), falling)[-1])
+        self.assertFalse(self.feed(up._replace(direction=DOWN), rising)[-1])
+        self.assertTrue(self.feed(up._replace(direction=BOTH), falling)[-1])
+
+    def test_slope_threshold_is_strict(self):
+        rule = TrendRule(SLOPE, 'density', threshold=0.5, window=6)
+        self.assertFalse(self.feed(rule, [1.0, 1.5, 2.0])[-1])
+        self.assertTrue(self.feed(rule, [1.0, 1.5, 2.1])[-1])
+
+    def test_slope_per_hour(self):
+        # Тот же прирост за полчаса — вдвое круче
+        rule = TrendRule(SLOPE, 'filtration', threshold=3, window=6)
+        self.assertFalse(self.feed(rule, [4, 6, 8], hours=[0, 1, 2])[-1])
+        self.assertTrue(self.feed(rule, [4, 6, 8], hours=[0, 0.5, 1])[-1])
+
+    def test_min_points(self):
+        rule = TrendRule(SLOPE, 'density', threshold=0.01, window=6, min_points=3)
+        self.assertEqual([bool(alerts) for alerts in self.feed(rule, [1.1, 1.2, 1.3])], [False, False, True])
+
+    def test_window(self):
+        # Рост был только в начале: в окно из трех последних замеров он не попадает
+        rule = TrendRule(SLOPE, 'density', threshold=0.01, window=3)
+        fired = self.feed(rule, [1.1, 1.2, 1.3, 1.3, 1.3, 1.3])
+        self.assertEqual([bool(alerts) for alerts in fired], [False, False, True, True, False, False])
+
+    def test_equal_timestamps(self):
+        # Все замеры в один момент: дисперсия времени нулевая, наклон не определен
+        rule = TrendRule(SLOPE, 'density', threshold=0.01, window=6)
+        self.assertEqual(self.feed(rule, [1.1, 1.2, 1.3], hours=[5, 5, 5]), [[], [], []])
+
+    def test_ewma(self):
+        rule = TrendRule(EWMA, 'filtration', threshold=1.0, window=10)
+        self.assertTrue(self.feed(rule, [5, 5, 5, 6.5])[-1])
+        self.assertFalse(self.feed(rule, [5, 5, 5, 3.5])[-1])
+        self.assertTrue(self.feed(rule._replace(direction=DOWN), [5, 5, 5, 3.5])[-1])
+        # Уровень сглажен: единичный выброс в истории лишь сдвигает его
+        self.assertFalse(self.feed(rule, [5, 8, 5, 5, 6])[-1])
+
+    def test_delta(self):
+        rule = TrendRule(DELTA, 'ph', threshold=1.0, window=2, direction=BOTH, min_points=2)
+        fired = self.feed(rule, [8, 9.5, 8.4, 7.2, 7.6])
+        self.assertEqual([bool(alerts) for alerts in fired], [False, True, True, True, False])
+        self.assertEqual(self.feed(rule._replace(direction=UP), [8, 6.5]), [[], []])
+
+    def test_missing_value_is_silent(self):
+        rule = TrendRule(DELTA, 'ph', threshold=1.0, window=2, direction=BOTH, min_points=2)
+        self.feed(rule, [8, 10])
+        # В новом замере pH нет — скачок по нему не сообщается
+        self.assertEqual(self.feed(rule, [1.2], hours=[3], param='density', fresh=False), [[]])
+
+
+class TrendBufferTests(SimpleTestCase):
+
+    def key(self, hour, pk):
+        return START + timedelta(hours=hour), pk
+
+    def keys(self, buffer):
+        return [entry[0] for entry in buffer.entries]
+
+    def test_out_of_order(self):
+        buffer = TrendBuffer([(3, START + timedelta(hours=2), 1.0, None, None, None)])
+        self.assertTrue(buffer.add(self.key(0, 1), (1.1,)))
+        self.assertTrue(buffer.add(self.key(1, 2), (1.2,)))
+        # То же время — порядок по id
+        self.assertTrue(buffer.add(self.key(1, 0), (1.3,)))
+        self.assertEqual(self.keys(buffer), [self.key(0, 1), self.key(1, 0), self.key(1, 2), self.key(2, 3)])
+        self.assertEqual(buffer.window_until(self.key(1, 2))[-1], (self.key(1, 2), (1.2,)))
+
+    def test_eviction(self):
+        buffer = TrendBuffer()
+        for i in range(BUFFER_SIZE):
+            buffer.add(self.key(i * 2, i), (i,))
+        # Полный буфер: новый замер вытесняет самый старый
+        self.assertTrue(buffer.add(self.key(5, 100), (100,)))
+        self.assertEqual(len(buffer.entries), BUFFER_SIZE)
+        self.assertEqual(buffer.entries[0][0], self.key(2, 1))
+        self.assertIn(self.key(5, 100), self.keys(buffer))
+        # Старше всего полного буфера — в окно не попадает
+        self.assertFalse(buffer.add(self.key(1, 101), (101,)))
+        self.assertNotIn(self.key(1, 101), self.keys(buffer))
+
+    def test_duplicate(self):
+        buffer = TrendBuffer()
+        buffer.add(self.key(0, 1), (1.1,))
+        buffer.add(self.key(1, 2), (1.2,))
+        entries = list(buffer.entries)
+        self.assertTrue(buffer.add(self.key(0, 1), (9.9,)))
+        self.assertEqual(list(buffer.entries), entries)
+
+
+class TrendBufferQueriesTests(TestCase):
+    """Буфер строится одним запросом, дальше новые логи добавляются без БД."""
+
+    def setUp(self):
+        invalidate_trend_buffer()
+        self.addCleanup(invalidate_trend_buffer)
+        self.well = Well.objects.create(name="Куст 12 скважина 1")
+
+    def log(self, hour, density):
+        log_entry = MudParameterLog.objects.create(well=self.well, density=density)
+        log_entry.measurement_time = START + timedelta(hours=hour)
+        MudParameterLog.objects.filter(pk=log_entry.pk).update(measurement_time=log_entry.measurement_time)
+        return log_entry
+
+    def test_no_query_after_load(self):
+        first, second = self.log(0, 1.10), self.log(1, 1.13)
+        with self.assertNumQueries(1):
+            check_trends(second)
+        with self.assertNumQueries(0):
+            check_trends(first)
+
+        third = self.log(2, 1.16)
+        with self.assertNumQueries(0):
+            alerts = check_trends(third)
+        self.assertEqual(len(alerts['warning']), 1)
+        self.assertEqual(
+            [key[1] for key, _ in get_trend_buffer(self.well.pk).entries],
+            [first.pk, second.pk, third.pk],
+        )
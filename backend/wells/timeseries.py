@@ -0,0 +1,158 @@
+# backend/wells/timeseries.py
+"""
+Временные ряды параметров раствора для графиков.
+
+Ответ колоночный (параллельные массивы времени и значений) и ограничен
+запрошенным числом точек, а не глубиной истории: ряд прореживается на
+сервере алгоритмом LTTB (Largest-Triangle-Three-Buckets), который сохраняет
+форму кривой — пики и провалы не теряются, в отличие от усреднения.
+
+Коридор нормы (min/max интервала DepthIntervalNorms, действовавшего на
+момент замера) отдается отдельными ступенчатыми рядами: только точки смены
+границ. Интервал для замера выбирается по его глубине и секции так же,
+как при перепроверке истории (revalidation.WellNormArrays).
+"""
+import numpy as np
+from django.db import models
+from .models import MudParameterLog
+from .revalidation import PARAM_NAMES, SECTION_CODES, load_well_norm_arrays
+from .archive import archived_logs
+
+# Параметры, по которым можно строить ряд: все числовые поля замера, кроме глубины
+TIMESERIES_PARAMS = tuple(
+    field.name for field in MudParameterLog._meta.get_fields()
+    if isinstance(field, models.FloatField) and field.name != 'depth'
+)
+DEFAULT_POINTS = 500
+MAX_POINTS = 5000
+
+
+def lttb_indices(x, y, n_out: int):
+    """
+    Индексы точек, отобранных LTTB (x по возрастанию).
+    Первая и последняя точки сохраняются всегда, остальные n_out-2 —
+    по одной из каждой корзины: та, что образует наибольший треугольник
+    с уже выбранной точкой и средним следующей корзины.
+    Средние всех корзин считаются одной операцией (reduceat), внутри
+    корзины площади — векторно; цикл только по корзинам.
+    """
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1])[:max(n_out, 1)]
+
+    # Границы n_out-2 корзин между первой и последней точкой (каждая непуста, т.к. n_out < n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    sizes = np.diff(edges)
+    inner = slice(1, n - 1)
+    mean_x = np.add.reduceat(x[inner], edges[:-1] - 1) / sizes
+    mean_y = np.add.reduceat(y[inner], edges[:-1] - 1) / sizes
+    # "Следующая корзина" для последней — последняя точка
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for bucket in range(n_out - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        bx, by = x[start:end], y[start:end]
+        area = np.abs((x[a] - next_x[bucket]) * (by - y[a]) - (x[a] - bx) * (next_y[bucket] - y[a]))
+        a = start + int(area.argmax())
+        selected[bucket + 1] = a
+    return selected
+
+
+def _to_json_list(values) -> list:
+    return [None if np.isnan(value) else float(value) for value in values.tolist()]
+
+
+def _norm_band(times, norm_min, norm_max, selected, max_points: int) -> dict:
+    """
+    Ступенчатый коридор нормы: точки, где меняются границы, плюс последняя точка.
+    Если смен больше, чем разрешено точек, — значения в отобранных LTTB точках.
+    """
+    if len(times) == 0:
+        return {'t': [], 'min': [], 'max': []}
+    same_min = (norm_min[1:] == norm_min[:-1]) | (np.isnan(norm_min[1:]) & np.isnan(norm_min[:-1]))
+    same_max = (norm_max[1:] == norm_max[:-1]) | (np.isnan(norm_max[1:]) & np.isnan(norm_max[:-1]))
+    changes = np.concatenate(([0], np.flatnonzero(~(same_min & same_max)) + 1))
+    if changes[-1] != len(times) - 1:
+        changes = np.append(changes, len(times) - 1)
+    points = changes if len(changes) <= max_points else selected
+    return {
+        't': times[points].tolist(),
+        'min': _to_json_list(norm_min[points]),
+        'max': _to_json_list(norm_max[points]),
+    }
+
+
+def build_timeseries(well, params, points: int = DEFAULT_POINTS, time_from=None, time_to=None) -> dict:
+    """
+    Ряды параметров скважины за период: {param: {t, v, total, norms}}.
+    t — миллисекунды Unix-времени, v — значения, total — сколько замеров было до прореживания.
+    Замеры из архива (wells/archive.py) подмешиваются, если у скважины нет
+    аннотации has_archived_logs=False (см. archive.with_archive_flag).
+    """
+    logs = MudParameterLog.objects.filter(well=well)
+    if time_from:
+        logs = logs.filter(measurement_time__gte=time_from)
+    if time_to:
+        logs = logs.filter(measurement_time__lte=time_to)
+    rows = list(
+        logs.order_by('measurement_time', 'id')
+        .values_list('measurement_time', 'depth', 'section', *params)
+    )
+    if getattr(well, 'has_archived_logs', True):
+        archived = [
+            (log_entry.measurement_time, log_entry.depth, log_entry.section, *(getattr(log_entry, param) for param in params))
+            for log_entry in archived_logs([well.pk], time_from, time_to)
+        ]
+        if archived:
+            rows = sorted(archived + rows, key=lambda row: row[0])
+
+    norm_params = [param for param in params if param in PARAM_NAMES]
+    if rows:
+        columns = list(zip(*rows))
+        times = np.array([int(value.timestamp() * 1000) for value in columns[0]], dtype=np.int64)
+        depth = np.array(columns[1], dtype=float)
+        section = np.array([SECTION_CODES.get(value, -1) for value in columns[2]], dtype=np.int64)
+        values = {param: np.array(column, dtype=float) for param, column in zip(params, columns[3:])}
+    else:
+        times = np.empty(0, dtype=np.int64)
+        depth = np.empty(0)
+        section = np.empty(0, dtype=np.int64)
+        values = {param: np.empty(0) for param in params}
+
+    interval = applicable = norms = None
+    if norm_params and rows:
+        norms = load_well_norm_arrays([well.pk])[well.pk]
+        # Логи без глубины (до появления поля) — без коридора: NaN не попадает ни в один интервал
+        interval, applicable = norms.match(depth, section)
+
+    series = {}
+    for param in params:
+        present = ~np.isnan(values[param])
+        t = times[present]
+        v = values[param][present]
+        selected = lttb_indices(t.astype(float), v, points)
+        result = {
+            'verbose_name': str(MudParameterLog._meta.get_field(param).verbose_name),
+            'total': int(len(t)),
+            't': t[selected].tolist(),
+            'v': v[selected].tolist(),
+        }
+        if param in norm_params:
+            if norms is not None and len(norms.start):
+                column = PARAM_NAMES.index(param)
+                idx = interval[present]
+                ok = applicable[present]
+                norm_min = np.where(ok, norms.mins[idx, column], np.nan)
+                norm_max = np.where(ok, norms.maxs[idx, column], np.nan)
+            else:
+                norm_min = norm_max = np.full(len(t), np.nan)
+            result['norms'] = _norm_band(t, norm_min, norm_max, selected, points)
+        series[param] = result
+    return series
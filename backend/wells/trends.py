@@ -0,0 +1,226 @@
+# backend/wells/trends.py
+"""
+Правила по трендам: как параметры раствора меняются от замера к замеру.
+
+Для каждой скважины в памяти процесса держится кольцевой буфер последних
+замеров (только отслеживаемые параметры). Буфер строится одним запросом
+при первом обращении, дальше каждый новый лог просто добавляется в него —
+проверка трендов не делает запросов к БД и стоит O(окна).
+
+Правила:
+- SLOPE — наклон (МНК по времени замера, в единицах параметра за час)
+  за последние window замеров;
+- EWMA — отклонение текущего значения от экспоненциально сглаженного
+  уровня предыдущих замеров;
+- DELTA — скачок относительно предыдущего замера.
+
+Буфер одного процесса не видит логи, обработанные другими воркерами, поэтому
+он перечитывается из БД не реже чем раз в TREND_BUFFER_TTL секунд.
+"""
+import time
+import threading
+from bisect import bisect_left
+from collections import deque
+from typing import NamedTuple
+from django.conf import settings
+from .models import MudParameterLog
+
+SLOPE = 'slope'
+EWMA = 'ewma'
+DELTA = 'delta'
+
+UP = 'up'
+DOWN = 'down'
+BOTH = 'both'
+
+
+class TrendRule(NamedTuple):
+    kind: str
+    param: str
+    threshold: float
+    window: int = 6 # сколько последних замеров (включая текущий) смотрит правило
+    direction: str = UP
+    level: str = 'warning'
+    alpha: float = 0.3 # только для EWMA
+    min_points: int = 3 # меньше замеров с этим параметром — правило молчит
+
+
+TREND_RULES = (
+    # Плотность растет быстрее 0.02 г/см³ в час
+    TrendRule(SLOPE, 'density', threshold=0.02, window=6),
+    # Фильтрация стабильно растет: наклон и отрыв от сглаженного уровня
+    TrendRule(SLOPE, 'filtration', threshold=0.5, window=6),
+    TrendRule(EWMA, 'filtration', threshold=1.0, window=10),
+    # Скачок хлоридов между соседними замерами (мг/л) — признак притока пластовой воды
+    TrendRule(DELTA, 'chlorides', threshold=2000, window=2, direction=BOTH, min_points=2),
+    TrendRule(DELTA, 'ph', threshold=1.0, window=2, direction=BOTH, min_points=2),
+)
+
+TREND_PARAMS = tuple(dict.fromkeys(rule.param for rule in TREND_RULES))
+_PARAM_POSITIONS = {param: position for position, param in enumerate(TREND_PARAMS)}
+_VERBOSE_NAMES = {param: str(MudParameterLog._meta.get_field(param).verbose_name) for param in TREND_PARAMS}
+
+BUFFER_SIZE = max(rule.window for rule in TREND_RULES)
+
+
+def _exceeds(value: float, threshold: float, direction: str) -> bool:
+    if direction == UP:
+        return value > threshold
+    if direction == DOWN:
+        return value < -threshold
+    return abs(value) > threshold
+
+
+class TrendBuffer:
+    """
+    Последние BUFFER_SIZE замеров одной скважины, упорядоченные по
+    (measurement_time, id). Элемент — (ключ, значения TREND_PARAMS).
+    """
+    __slots__ = ('entries', 'loaded_at', 'lock')
+
+    def __init__(self, rows=()):
+        self.entries = deque(maxlen=BUFFER_SIZE)
+        self.loaded_at = time.monotonic()
+        self.lock = threading.Lock()
+        for log_id, measurement_time, *values in sorted(rows, key=lambda row: (row[1], row[0])):
+            self.entries.append(((measurement_time, log_id), tuple(values)))
+
+    def add(self, key, values) -> bool:
+        """
+        Добавляет замер на его место по времени. Повтор (та же запись) — no-op.
+        False — замер старше всего полного буфера и в окно уже не попадает.
+        """
+        keys = [entry[0] for entry in self.entries]
+        position = bisect_left(keys, key)
+        if position < len(keys) and keys[position] == key:
+            return True
+        if len(self.entries) == BUFFER_SIZE:
+            if position == 0:
+                return False
+            self.entries.popleft()
+            position -= 1
+        self.entries.insert(position, (key, values))
+        return True
+
+    def window_until(self, key) -> list:
+        """Замеры буфера до указанного включительно (по возрастанию времени)."""
+        return [entry for entry in self.entries if entry[0] <= key]
+
+
+_buffers = {}
+_lock = threading.Lock()
+
+
+def _ttl() -> float:
+    return getattr(settings, 'TREND_BUFFER_TTL', 300)
+
+
+def _load_buffer(well_id) -> TrendBuffer:
+    rows = (
+        MudParameterLog.objects.filter(well_id=well_id)
+        .order_by('-measurement_time', '-id')
+        .values_list('id', 'measurement_time', *TREND_PARAMS)[:BUFFER_SIZE]
+    )
+    return TrendBuffer(list(rows))
+
+
+def get_trend_buffer(well_id) -> TrendBuffer:
+    buffer = _buffers.get(well_id)
+    if buffer is None or time.monotonic() - buffer.loaded_at > _ttl():
+        buffer = _load_buffer(well_id)
+        with _lock:
+            _buffers[well_id] = buffer
+    return buffer
+
+
+def invalidate_trend_buffer(well_id=None):
+    """Сбрасывает буфер одной скважины или (без аргумента) всех."""
+    with _lock:
+        if well_id is None:
+            _buffers.clear()
+        else:
+            _buffers.pop(well_id, None)
+
+
+# --- Вычисления по окну ---
+
+def _series(window, rule: TrendRule) -> list:
+    """(время, значение) параметра правила за последние rule.window замеров, без пропусков."""
+    position = _PARAM_POSITIONS[rule.param]
+    return [
+        (key[0], values[position])
+        for key, values in window[-rule.window:]
+        if values[position] is not None
+    ]
+
+
+def _check_slope(rule: TrendRule, series) -> str | None:
+    start = series[0][0]
+    hours = [(measurement_time - start).total_seconds() / 3600 for measurement_time, _ in series]
+    values = [value for _, value in series]
+    n = len(series)
+    mean_t = sum(hours) / n
+    mean_v = sum(values) / n
+    variance = sum((t - mean_t) ** 2 for t in hours)
+    if variance == 0:
+        return None # все замеры в один момент — наклон не определен
+    slope = sum((t - mean_t) * (v - mean_v) for t, v in zip(hours, values)) / variance
+    if not _exceeds(slope, rule.threshold, rule.direction):
+        return None
+    trend = "растет" if slope > 0 else "падает"
+    return (f"📈 <b>Тренд: {_VERBOSE_NAMES[rule.param]} {trend}</b>\n"
+            f"<i>Скорость: <b>{slope:+.3g}</b> в час за последние {n} замеров, порог: {rule.threshold}</i>")
+
+
+def _check_ewma(rule: TrendRule, series) -> str | None:
+    *previous, (_, value) = series
+    level = previous[0][1]
+    for _, previous_value in previous[1:]:
+        level = rule.alpha * previous_value + (1 - rule.alpha) * level
+    deviation = value - level
+    if not _exceeds(deviation, rule.threshold, rule.direction):
+        return None
+    side = "выше" if deviation > 0 else "ниже"
+    return (f"📈 <b>Тренд: {_VERBOSE_NAMES[rule.param]} {side} сглаженного уровня</b>\n"
+            f"<i>Факт: <b>{value}</b>, сглаженный уровень (EWMA): {level:.3g}, допустимое отклонение: {rule.threshold}</i>")
+
+
+def _check_delta(rule: TrendRule, series) -> str | None:
+    (_, previous), (_, value) = series[-2], series[-1]
+    delta = value - previous
+    if not _exceeds(delta, rule.threshold, rule.direction):
+        return None
+    return (f"⚡ <b>Скачок: {_VERBOSE_NAMES[rule.param]}</b>\n"
+            f"<i>{previous} → <b>{value}</b> ({delta:+g}) с прошлого замера, порог: {rule.threshold}</i>")
+
+
+_CHECKS = {SLOPE: _check_slope, EWMA: _check_ewma, DELTA: _check_delta}
+
+
+def check_trends(log_entry: MudParameterLog) -> dict:
+    """
+    Добавляет замер в буфер скважины и проверяет правила по трендам
+    на окне, которое заканчивается этим замером.
+    Возвращает словарь {'critical': [...], 'warning': [...]}.
+    """
+    alerts = {'critical': [], 'warning': []}
+    buffer = get_trend_buffer(log_entry.well_id)
+    key = (log_entry.measurement_time, log_entry.pk)
+    values = tuple(getattr(log_entry, param) for param in TREND_PARAMS)
+
+    with buffer.lock:
+        if not buffer.add(key, values):
+            return alerts
+        window = buffer.window_until(key)
+
+    for rule in TREND_RULES:
+        # В текущем замере параметра нет — сообщать о тренде по нему не с чем
+        if values[_PARAM_POSITIONS[rule.param]] is None:
+            continue
+        series = _series(window, rule)
+        if len(series) < max(rule.min_points, 2):
+            continue
+        message = _CHECKS[rule.kind](rule, series)
+        if message:
+            alerts[rule.level].append(message)
+    return alerts
@@ -2,7 +2,10 @@
 
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import WellViewSet, TaskViewSet, TenderViewSet 
+from .views import (
+    WellViewSet, TaskViewSet, TenderViewSet, MudParameterLogViewSet, DashboardView, ChangesView, well_events,
+    export_mud_logs,
+)
 
 # Создаем роутер
 router = DefaultRouter()
@@ -13,5 +16,16 @@ router.register(r'tenders', TenderViewSet, basename='tender')
 
 # Наши URL-ы генерируются роутером автоматически
 urlpatterns = [
+    # Вся главная страница одним запросом
+    path('dashboard/', DashboardView.as_view(), name='dashboard'),
+    # Только изменившиеся строки с прошлого курсора (для экранов, держащих списки в памяти)
+    path('changes/', ChangesView.as_view(), name='changes'),
+    # Живые обновления (SSE, только под ASGI)
+    path('events/', well_events, name='events'),
+    # История замеров вложена в скважину: /api/wells/<id>/mud-logs/
+    path('wells/<int:well_pk>/mud-logs/', MudParameterLogViewSet.as_view({'get': 'list'}), name='well-mud-logs'),
+    path('wells/<int:well_pk>/mud-logs/<int:pk>/', MudParameterLogViewSet.as_view({'get': 'retrieve'}), name='well-mud-log-detail'),
+    # Выгрузка истории замеров в CSV/XLSX (потоком)
+    path('mud-logs/export/', export_mud_logs, name='mud-logs-export'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
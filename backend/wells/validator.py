@@ -1,10 +1,35 @@
 # backend/wells/validator.py
 import logging
 from .models import Well
+from .norm_index import get_norm_index
+from .norms import evaluate_norms
 
 
 logger = logging.getLogger(__name__)
 
+def get_interval_norms(well: Well, current_depth: float):
+    """
+    Находит интервал норм для текущей секции скважины и глубины (по индексу норм,
+    без запросов к БД). Если секция или интервал не найдены — или найдено
+    несколько (пересекающиеся интервалы в программе), возвращает None.
+    """
+    index = get_norm_index(well)
+    if not index.has_program:
+        return None
+
+    sections_count = index.section_count(well.current_section)
+    if sections_count != 1:
+        logger.warning(f"Секция '{well.current_section}' в программе найдена {sections_count} раз(а).")
+        return None
+
+    intervals = index.intervals_at(well.current_section, current_depth)
+    if len(intervals) != 1:
+        logger.warning(f"Интервал норм для глубины {current_depth}м найден {len(intervals)} раз(а).")
+        return None
+
+    return intervals[0]
+
+
 def validate_mud_parameters(well: Well, params: dict, current_depth: float) -> bool:
     """
     Проверяет параметры на соответствие нормам для текущей секции и глубины.
@@ -13,46 +38,24 @@ def validate_mud_parameters(well: Well, params: dict, current_depth: float) -> b
     logger.info(f"Получены параметры: {params}")
     logger.info(f"Текущая глубина: {current_depth}м, текущая секция: '{well.current_section}'")
 
-    if not hasattr(well, 'drilling_program'):
+    if not get_norm_index(well).has_program:
         logger.warning("Программа промывки для скважины не найдена. Валидация пропущена.")
         return False # Если программы нет, не проверяем
 
-    try:
-        # Находим текущую секцию в программе по типу секции скважины
-        current_program_section = well.drilling_program.sections.get(section_type=well.current_section)
-        logger.info(f"Найдена секция в программе: '{current_program_section}'")
-        # Находим нужный интервал глубин, в который попадает текущий забой
-        # lte = Less Than or Equal (<=), gte = Greater Than or Equal (>=)
-        interval_norms = current_program_section.intervals.get(
-            start_depth__lte=current_depth,
-            end_depth__gte=current_depth
-        )
-        logger.info(f"Найден интервал норм: {interval_norms.start_depth}м - {interval_norms.end_depth}м")
-    except Exception as e:
+    interval_norms = get_interval_norms(well, current_depth)
+    if interval_norms is None:
         # Если не найдена секция или интервал, считаем, что отклонений нет
-        logger.warning(f"Не удалось найти подходящую норму: {e}. Валидация пропущена.")
+        logger.warning("Не удалось найти подходящую норму. Валидация пропущена.")
         return False
+    logger.info(f"Найден интервал норм: {interval_norms.start_depth}м - {interval_norms.end_depth}м")
 
-    is_out_of_norm = False
-    for param_name, measured_value in params.items():
-        if measured_value is None:
-            continue
-
-        norm_min = getattr(interval_norms, f"{param_name}_min", None)
-        norm_max = getattr(interval_norms, f"{param_name}_max", None)
-        
-        logger.info(f"Проверка параметра '{param_name}': значение={measured_value}, норма=[{norm_min}, {norm_max}]")
-
-
-        if (norm_min is not None and measured_value < norm_min):
-            logger.warning(f"ОТКЛОНЕНИЕ! '{param_name}' ({measured_value}) < min ({norm_min})")
-            is_out_of_norm = True
-            break
-        
-        if (norm_max is not None and measured_value > norm_max):
-            logger.warning(f"ОТКЛОНЕНИЕ! '{param_name}' ({measured_value}) > max ({norm_max})")
-            is_out_of_norm = True
-            break
+    evaluation = evaluate_norms(params, interval_norms)
+    for result in evaluation.deviations:
+        logger.warning(
+            f"ОТКЛОНЕНИЕ ({result.level})! '{result.name}' ({result.value}), "
+            f"норма=[{result.norm_min}, {result.norm_max}]"
+        )
+    is_out_of_norm = evaluation.is_out_of_norm
     
     logger.info(f"--- Результат валидации: is_out_of_norm = {is_out_of_norm} ---")
     
@@ -63,20 +66,8 @@ def update_well_section_by_depth(well: Well, current_depth: float):
     Возвращает section_type, если по текущей глубине нужно обновить секцию.
     Ничего не сохраняет!
     """
-    if not hasattr(well, 'drilling_program'):
-        return None
-
-    from .models import DepthIntervalNorms
-
-    interval = DepthIntervalNorms.objects.filter(
-        section__program__well=well,
-        start_depth__lte=current_depth,
-        end_depth__gte=current_depth
-    ).first()
-
-    if interval:
-        new_section_type = interval.section.section_type
-        if new_section_type != well.current_section:
-            return new_section_type
+    new_section_type = get_norm_index(well).section_at(current_depth)
+    if new_section_type and new_section_type != well.current_section:
+        return new_section_type
 
-    return None
\ No newline at end of file
+    return None
@@ -1,25 +1,123 @@
 # backend/wells/views.py
-import re
 import logging
-from django.db.models import Case, When, Value, F, BooleanField
+from django.db import transaction, IntegrityError
+from django.db.models import F, Q, Count, Max, Min
+from django.shortcuts import get_object_or_404
 from django.conf import settings
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
-from .models import Well,Task, Tender, MudParameterLog
-from .serializers import WellSerializer,TaskSerializer, TenderSerializer, WellLinkTelegramSerializer 
+from rest_framework.views import APIView
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.utils.cache import get_conditional_response, patch_cache_control
+from .models import Well,Task, Tender, MudParameterLog, ProcessedSummary
+from .serializers import (
+    WellSerializer, WellListSerializer, TaskSerializer, TenderSerializer, WellLinkTelegramSerializer,
+    MudParameterLogSerializer, MudLogFilterSerializer, MudLogExportSerializer, TimeSeriesQuerySerializer,
+    RollupQuerySerializer,
+)
+from .timeseries import build_timeseries
+from .dashboard import (
+    tender_list_queryset, seconds_until_next_deadline, get_dashboard_sections, parse_version, render_dashboard,
+)
+from .pagination import DashboardPagination, MudLogPagination, MergedRows
+from .conditional import ConditionalListMixin
+from .response_cache import CachedListMixin
+from .events import event_stream, publish_well_events
+from .changes import build_changes, decode_cursor
+from .metrics import render_metrics, stage_timer
+from .rollups import add_logs_to_rollups, rollup_series
+from .archive import with_archive_flag, ArchivedLogs, find_archived_log
+from .export import iter_export, as_async_iterator, CONTENT_TYPES
+from .summary_history import summary_entry, save_unrecognized_summaries, latest_summary_subquery
 from django.utils import timezone
 from rest_framework.response import Response
-from .parser import parse_summary, parse_mud_parameters
-from .validator import validate_mud_parameters, update_well_section_by_depth
-from .rules_engine import run_all_rules 
-from .notifications import send_telegram_alert 
-from .ai_service import get_ai_analysis
-class WellViewSet(viewsets.ModelViewSet):
+from .parser import parse_summary, extract_mud_parameters, summary_fingerprint
+from .ingest import (
+    MAX_SUMMARIES_PER_BATCH, apply_summary_to_well, build_mud_log,
+    post_processing_job, process_summary_batch,
+)
+class WellViewSet(CachedListMixin, ConditionalListMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows wells to be viewed.
     """
     queryset = Well.objects.order_by(F('is_active').desc(), F('updated_at').desc())
     serializer_class = WellSerializer
+    pagination_class = DashboardPagination
+    cursor_ordering = ('-is_active', '-updated_at', '-id')
+    last_modified_aggregates = ('updated_at', 'nvp_updated_at')
+    cache_group = 'wells'
+
+    def get_validator_queryset(self):
+        return Well.objects.all()
+
+    def get_validator_aggregates(self):
+        # НВП входят в карточку (счетчик/expand), поэтому учитываем и их
+        return {
+            'updated_at': Max('updated_at'),
+            'count': Count('pk', distinct=True),
+            'nvp_updated_at': Max('nvp_incidents__updated_at'),
+            'nvp_count': Count('nvp_incidents', distinct=True),
+        }
+
+    def get_serializer_class(self):
+        # Список — компактные карточки, карточка скважины — полный набор полей
+        if self.action == 'list':
+            return WellListSerializer
+        return super().get_serializer_class()
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            # Подгружаем/аннотируем ровно то, что попадет в ответ (с учетом ?fields= и ?expand=)
+            queryset = self.get_serializer().optimize_queryset(queryset)
+        elif self.action in ('update', 'partial_update'):
+            # Последняя сводка в ответе — тем же запросом, что и скважина (prefetch НВП DRF после записи сбросит)
+            queryset = queryset.annotate(last_summary_text=latest_summary_subquery())
+        return queryset
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        serializer.instance.last_summary_text = None # у новой скважины сводок нет — не спрашиваем историю
+
+    @action(detail=True, methods=['get'], url_path='timeseries')
+    def timeseries(self, request, pk=None):
+        """
+        Ряды параметров для графиков, прореженные до ?points= точек (LTTB),
+        с коридором нормы: /api/wells/<id>/timeseries/?params=density,viscosity&points=500
+        """
+        well = get_object_or_404(with_archive_flag(Well.objects.only('pk')), pk=pk)
+        query = TimeSeriesQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        series = build_timeseries(
+            well,
+            list(dict.fromkeys(params['params'])),
+            points=params['points'],
+            time_from=params.get('time_from'),
+            time_to=params.get('time_to'),
+        )
+        return Response({'well_id': well.pk, 'points': params['points'], 'series': series})
+
+    @action(detail=True, methods=['get'], url_path='rollups')
+    def rollups(self, request, pk=None):
+        """
+        Часовые/суточные сводки параметров (min, max, среднее, число замеров и
+        замеров вне нормы) для графиков за длинный период:
+        /api/wells/<id>/rollups/?period=day&params=density,viscosity&from=...&to=...
+        """
+        well = get_object_or_404(Well.objects.only('pk'), pk=pk)
+        query = RollupQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        series = rollup_series(
+            well.pk,
+            params['period'],
+            list(dict.fromkeys(params['params'])),
+            time_from=params.get('time_from'),
+            time_to=params.get('time_to'),
+        )
+        return Response({'well_id': well.pk, 'period': params['period'], 'series': series})
 
     @action(detail=False, methods=['post'], url_path='process-summary')
     def process_summary(self, request):
@@ -30,91 +128,85 @@ class WellViewSet(viewsets.ModelViewSet):
         if not summary_text:
             return Response({'error': 'No text provided'}, status=status.HTTP_400_BAD_REQUEST)
 
+        # --- Шаг 0: Эту сводку уже обрабатывали? Тогда сразу отдаем прежний результат ---
+        content_hash = summary_fingerprint(summary_text)
+        processed = ProcessedSummary.objects.select_related('well').filter(content_hash=content_hash).first()
+        if processed:
+            serializer = self.get_serializer(processed.well)
+            return Response(serializer.data, status=status.HTTP_200_OK)
+
         # --- Шаг 1: Парсим все данные ---
-        parsed_data = parse_summary(summary_text)
+        with stage_timer('parse'):
+            parsed_data = parse_summary(summary_text)
+            parsed_mud_params = extract_mud_parameters(summary_text)
         
         well_name = parsed_data.get('name')
         if not well_name:
+            # Сохраняем в историю без скважины: разберется повтором (replay_summaries) после правки парсера
+            save_unrecognized_summaries([summary_entry(summary_text, content_hash=content_hash)])
             return Response({'error': 'Could not find well name in summary'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # --- Шаг 2: Находим или создаем скважину ---
-        well, created = Well.objects.get_or_create(name=well_name)
-        
-        # --- Шаг 3: Собираем все обновления в один пакет ---
-        fields_to_update = []
-
-        # Обновляем поля из парсера
-        for key, value in parsed_data.items():
-            if key != 'name' and hasattr(well, key):
-                setattr(well, key, value)
-                fields_to_update.append(key)
-        
-        # Логика авто-привязки
-        if telegram_chat_id and not well.telegram_chat_id:
-            well.telegram_chat_id = telegram_chat_id
-            well.telegram_topic_id = telegram_topic_id
-            fields_to_update.extend(['telegram_chat_id', 'telegram_topic_id'])
-        
-        # Логика авто-обновления секции (из Варианта 1)
-        current_depth_from_parser = parsed_data.get('current_depth')
-        if current_depth_from_parser is not None:
-            new_section = update_well_section_by_depth(well, current_depth_from_parser)
-            if new_section:
-                well.current_section = new_section
-                fields_to_update.append('current_section')
-
-        # --- Шаг 4: Делаем ОДНО сохранение, если были изменения ---
-        if fields_to_update:
-            well.save(update_fields=list(set(fields_to_update))) # set() убирает дубликаты
-
-        # --- Шаг 5: Обработка параметров раствора ---
-        mud_params_text_match = re.search(r'Параметры бурового раствора:\s*(.*)', summary_text, re.DOTALL | re.IGNORECASE)
-        if mud_params_text_match:
-            mud_params_text = mud_params_text_match.group(1)
-            parsed_mud_params = parse_mud_parameters(mud_params_text)
-            
-            if parsed_mud_params:
-                current_depth = parsed_data.get('current_depth', well.current_depth)
-                has_deviation = validate_mud_parameters(well, parsed_mud_params, current_depth)
-                parsed_mud_params['is_out_of_norm'] = has_deviation
-                
-                log_entry = MudParameterLog.objects.create(well=well, **parsed_mud_params)
-                    # 1. Запускаем движок правил на только что созданном логе
-                alerts_dict  = run_all_rules(log_entry)
-                
-                # 2. Если есть хоть одна тревога, формируем и отправляем уведомление
-                if alerts_dict['critical'] or alerts_dict['warning']:
-                    
-                    header = f"🔔 <b>Оповещение {well.name}</b>\n\n"
-                    
-                    message_parts = []
-                    if alerts_dict['warning']:
-                        message_parts.extend(alerts_dict['warning'])
-                    if alerts_dict['critical']:
-                        message_parts.extend(alerts_dict['critical'])
-
-                    full_message = header + "\n\n".join(message_parts)
-
-                    # --- ИЗМЕНЕНИЯ ЗДЕСЬ ---
-                    # Запускаем AI-анализ ТОЛЬКО если есть КРИТИЧЕСКИЕ тревоги
-                    # if alerts_dict['critical']:
-                    #     logging.info(f"Обнаружены критические тревоги, запускаем AI-анализ для скважины {well.name}...")
-                    #     ai_comment = get_ai_analysis(well)
-                    #     if ai_comment:
-                    #         full_message += "\n\n" + ai_comment
-                    # # --------------------------
-                    
-                    # Отправляем финальное сообщение (с комментарием AI или без)
-                    logging.info("--- ГОТОВИМСЯ ОТПРАВИТЬ В TELEGRAM ---")
-                    logging.info(repr(full_message))
-                    logging.info("-------------------------------------")
-                    send_telegram_alert(well, full_message)
-                else:
-                    logging.info("Движок правил сработал, но не сгенерировал текста для тревог. Уведомление не отправлено.")
+        try:
+            with transaction.atomic():
+                # --- Шаг 2: Находим или создаем скважину ---
+                well, created = Well.objects.get_or_create(name=well_name)
+
+                # --- Шаг 3: Собираем все обновления в один пакет ---
+                fields_to_update = apply_summary_to_well(well, parsed_data, telegram_chat_id, telegram_topic_id)
 
+                # --- Шаг 4: Делаем ОДНО сохранение, если были изменения ---
+                if fields_to_update:
+                    well.save(update_fields=fields_to_update)
+
+                # --- Шаг 5: Обработка параметров раствора ---
+                log_entry = None
+                if parsed_mud_params:
+                    log_entry = build_mud_log(well, parsed_data, parsed_mud_params)
+                    log_entry.save()
+                    add_logs_to_rollups([log_entry])
+
+                    # Правила и уведомление — в фоне (воркер run_jobs), ответ не ждет Telegram
+                    post_processing_job(log_entry).save()
+
+                ProcessedSummary.objects.create(content_hash=content_hash, well=well, mud_log=log_entry)
+                history = summary_entry(summary_text, well=well, mud_log=log_entry, content_hash=content_hash)
+                history.save()
+
+                # Экраны узнают об изменении по SSE (уйдет после коммита)
+                publish_well_events(well, [log_entry] if log_entry else [])
+        except IntegrityError:
+            # Ту же сводку параллельно обработал другой запрос (повтор релея) — отдаем его результат.
+            # Нет такой записи — нарушено другое ограничение, и ошибка не наша
+            processed = ProcessedSummary.objects.select_related('well').filter(content_hash=content_hash).first()
+            if processed is None:
+                raise
+            serializer = self.get_serializer(processed.well)
+            return Response(serializer.data, status=status.HTTP_200_OK)
+
+        well.last_summary_text = history.compressed_text # ответ не перечитывает только что записанную сводку
         serializer = self.get_serializer(well)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['post'], url_path='process-summaries')
+    def process_summaries(self, request):
+        """
+        Пакетная версия process-summary.
+        Принимает {"summaries": [{"text": ..., "chat_id": ..., "topic_id": ...}, ...]}
+        (или просто список) и возвращает результат по каждой сводке.
+        """
+        items = request.data.get('summaries') if isinstance(request.data, dict) else request.data
+
+        if not isinstance(items, list) or not items:
+            return Response({'error': 'No summaries provided'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > MAX_SUMMARIES_PER_BATCH:
+            return Response(
+                {'error': f'Too many summaries in one batch (max {MAX_SUMMARIES_PER_BATCH})'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        results = process_summary_batch(items)
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
     @action(detail=False, methods=['post'], url_path='link-telegram')
     def link_telegram(self, request):
         serializer = WellLinkTelegramSerializer(data=request.data)
@@ -140,38 +232,185 @@ class WellViewSet(viewsets.ModelViewSet):
             'message': f"Скважина '{well_to_update.name}' успешно привязана к чату."
         }, status=status.HTTP_200_OK)
 
-class TaskViewSet(viewsets.ReadOnlyModelViewSet):
+class TaskViewSet(CachedListMixin, ConditionalListMixin, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint that allows tasks to be viewed.
     Мы хотим видеть только невыполненные задачи.
     """
     queryset = Task.objects.filter(is_completed=False)
     serializer_class = TaskSerializer
+    pagination_class = DashboardPagination
+    cursor_ordering = ('deadline', 'id')
+    cache_group = 'tasks'
+
+    def get_validator_queryset(self):
+        return Task.objects.filter(is_completed=False)
+
+    def get_validator_aggregates(self):
+        return {'updated_at': Max('updated_at'), 'count': Count('pk')}
 
-class TenderViewSet(viewsets.ReadOnlyModelViewSet):
+class TenderViewSet(CachedListMixin, ConditionalListMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = TenderSerializer
-    
-    def get_queryset(self):
-        """
-        Возвращает тендеры, отсортированные по следующей логике:
-        1. Сначала "Активные" тендеры (у которых есть дедлайн в будущем).
-           - Внутри этой группы сортируем по дедлайну (от ближайшего к дальнему).
-        2. Затем все остальные ("Неактивные").
-           - Внутри этой группы сортируем по дате обновления (от нового к старому).
-        """
+    pagination_class = DashboardPagination
+    # deadline может быть пустым — для курсора сортируем по deadline_sort (пустые в конце)
+    cursor_ordering = ('-is_active', 'deadline_sort', '-updated_at', '-id')
+    # Тендер становится "неактивным" без записи в БД, когда проходит дедлайн —
+    # это тоже изменение списка, и его время — самый поздний из прошедших дедлайнов
+    last_modified_aggregates = ('updated_at', 'passed_deadline')
+    cache_group = 'tenders'
+
+    def get_cache_timeout(self, request):
+        # Запись не должна пережить ближайший дедлайн: после него меняется is_active
+        next_deadline = Tender.objects.filter(deadline__gt=timezone.now()).aggregate(next=Min('deadline'))['next']
+        return seconds_until_next_deadline([next_deadline], super().get_cache_timeout(request))
+
+    def get_validator_queryset(self):
+        return Tender.objects.all()
+
+    def get_validator_aggregates(self):
         now = timezone.now()
-        
-        queryset = Tender.objects.annotate(
-            # Создаем флаг "Активный"
-            is_active=Case(
-                When(deadline__isnull=False, deadline__gt=now, then=Value(True)),
-                default=Value(False),
-                output_field=BooleanField()
-            )
-        ).order_by(
-            F('is_active').desc(), # Сначала активные (True > False при сортировке по убыванию)
-            F('deadline').asc(nulls_last=True), # Затем по дедлайну (ближайшие сначала)
-            F('updated_at').desc() # В самом конце - по дате обновления
-        )
-        
-        return queryset
\ No newline at end of file
+        return {
+            'updated_at': Max('updated_at'),
+            'count': Count('pk'),
+            'passed_deadline': Max('deadline', filter=Q(deadline__lte=now)),
+        }
+
+
+    def get_queryset(self):
+        return tender_list_queryset()
+
+
+class MudParameterLogViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    История замеров параметров раствора скважины (только чтение):
+    /api/wells/<id>/mud-logs/?from=<ISO>&to=<ISO>&is_out_of_norm=true
+    Новые сверху, курсорная пагинация по (measurement_time, id).
+    У скважин с архивом (wells/archive.py) страница сливается из страницы БД
+    и страницы архива.
+    """
+    serializer_class = MudParameterLogSerializer
+    pagination_class = MudLogPagination
+
+    def get_well(self):
+        return get_object_or_404(with_archive_flag(Well.objects.only('pk')), pk=self.kwargs['well_pk'])
+
+    def get_queryset(self):
+        well = self.get_well()
+        queryset = MudParameterLog.objects.filter(well=well)
+        if self.action != 'list':
+            return queryset
+
+        filters = MudLogFilterSerializer(data=self.request.query_params)
+        filters.is_valid(raise_exception=True)
+        params = filters.validated_data
+        if params.get('time_from'):
+            queryset = queryset.filter(measurement_time__gte=params['time_from'])
+        if params.get('time_to'):
+            queryset = queryset.filter(measurement_time__lte=params['time_to'])
+        if params.get('is_out_of_norm') is not None:
+            queryset = queryset.filter(is_out_of_norm=params['is_out_of_norm'])
+        if well.has_archived_logs:
+            return MergedRows(queryset, ArchivedLogs(
+                well.pk, params.get('time_from'), params.get('time_to'), params.get('is_out_of_norm'),
+            ))
+        return queryset
+
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            log_entry = find_archived_log(self.kwargs['well_pk'], self.kwargs['pk'])
+            if log_entry is None:
+                raise
+            return log_entry
+
+
+class DashboardView(APIView):
+    """
+    Главная страница одним запросом: {"version", "unchanged", "wells", "tasks", "tenders"}.
+    ?version=<из прошлого ответа> — неизменившиеся секции не передаются (перечислены в "unchanged"),
+    If-None-Match с той же версией — 304, если не изменилось ничего.
+    """
+    def get(self, request):
+        sections = get_dashboard_sections()
+        client_version = request.query_params.get('version') or request.META.get('HTTP_IF_NONE_MATCH')
+        version, body = render_dashboard(sections, parse_version(client_version))
+
+        etag = f'"{version}"'
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(body, content_type='application/json')
+            response['ETag'] = etag
+        patch_cache_control(response, no_cache=True)
+        return response
+
+
+
+class ChangesView(APIView):
+    """
+    Изменения с прошлой синхронизации: /api/changes/?since=<cursor из прошлого ответа>.
+    {"cursor", "reset", "wells"|"nvp_incidents"|"tasks"|"tenders": {"changed": [...], "deleted": [id, ...]}}
+    Без since (или при "reset": true) — полный снимок, локальные данные заменяются целиком.
+    """
+    def get(self, request):
+        since = request.query_params.get('since')
+        response = Response(build_changes(decode_cursor(since) if since else None))
+        patch_cache_control(response, no_store=True)
+        return response
+
+async def well_events(request):
+    """
+    Поток Server-Sent Events: /api/events/
+    event: well    data: {"type": "well", "well_id": ..., "name": ...}
+    event: mud_log data: {"type": "mud_log", "well_id": ..., "mud_log_id": ..., "is_out_of_norm": ...}
+    Клиент по событию дозапрашивает /api/dashboard/?version=...
+    """
+    if not isinstance(request, ASGIRequest):
+        # Под WSGI бесконечный асинхронный поток был бы прочитан в память целиком
+        return JsonResponse({'error': 'Event stream requires ASGI server'}, status=501)
+
+    response = StreamingHttpResponse(
+        event_stream(heartbeat=getattr(settings, 'EVENTS_HEARTBEAT', 15)),
+        content_type='text/event-stream',
+    )
+    patch_cache_control(response, no_cache=True)
+    # nginx и подобные не должны буферизовать поток
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def export_mud_logs(request):
+    """
+    Выгрузка истории замеров файлом, потоком:
+    /api/mud-logs/export/?format=csv|xlsx&well=<id>&from=<ISO>&to=<ISO>&is_out_of_norm=true
+    Без well — все скважины. Обычная Django-вьюха: в DRF ?format= занят выбором рендерера.
+    """
+    query = MudLogExportSerializer(data=request.GET)
+    if not query.is_valid():
+        return JsonResponse(query.errors, status=400)
+    params = dict(query.validated_data)
+    export_format = params.pop('format')
+    if params.get('well_id') is not None:
+        get_object_or_404(Well.objects.only('pk'), pk=params['well_id'])
+
+    chunks = iter_export(export_format, **params)
+    response = StreamingHttpResponse(
+        as_async_iterator(chunks) if isinstance(request, ASGIRequest) else chunks,
+        content_type=CONTENT_TYPES[export_format],
+    )
+    scope = f"well-{params['well_id']}" if params.get('well_id') is not None else 'all'
+    response['Content-Disposition'] = (
+        f'attachment; filename="mud-logs-{scope}-{timezone.localdate():%Y%m%d}.{export_format}"'
+    )
+    patch_cache_control(response, no_store=True)
+    return response
+
+
+def metrics_view(request):
+    """Метрики в текстовом формате Prometheus: /metrics"""
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token and request.META.get('HTTP_AUTHORIZATION') != f"Bearer {token}":
+        return HttpResponse(status=401)
+    response = HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+    patch_cache_control(response, no_store=True)
+    return response
@@ -2,44 +2,82 @@
 
 'use client';
 
-import { useState, useEffect, useCallback, useMemo } from 'react';
-import { Well, Task } from '../types';
+import { useState, useEffect, useCallback, useMemo, useRef } from 'react';
+import { WellListItem, Task, Tender } from '../types';
 import { TaskCard } from '../components/TaskCard';
 import { WellCard } from '../components/WellCard'; // <-- Импортируем новую карточку
 import { InfoModal } from '../components/InfoModal';
-import { getWells,getTasks  } from '../services/api'; 
+import { getDashboard, getWellSummary, subscribeToEvents } from '../services/api'; 
 
 import { TendersPanel } from '../components/TendersPanel';
 import { DocumentTextIcon } from '@heroicons/react/24/outline';
 
 
+const DASHBOARD_POLL_INTERVAL_MS = 60_000;
+
 export default function Home() {
   // Так как страница стала клиентской, данные грузим через useEffect
-  const [wells, setWells] = useState<Well[]>([]);
+  const [wells, setWells] = useState<WellListItem[]>([]);
   const [tasks, setTasks] = useState<Task[]>([]);
+  const [tenders, setTenders] = useState<Tender[]>([]);
   const [isTendersPanelOpen, setIsTendersPanelOpen] = useState(false);
 
   // 1. Добавляем состояние для модального окна сводки
   const [isSummaryModalOpen, setIsSummaryModalOpen] = useState(false);
   const [summaryContent, setSummaryContent] = useState('');
 
+  // Версия последнего ответа дашборда: сервер присылает только изменившиеся секции
+  const versionRef = useRef<string | undefined>(undefined);
+  const loadingRef = useRef(false);
+  const reloadPendingRef = useRef(false);
+
+  const fetchData = useCallback(async () => {
+    // Пачка событий подряд — не больше одного запроса в полете и одного следом
+    if (loadingRef.current) {
+      reloadPendingRef.current = true;
+      return;
+    }
+    loadingRef.current = true;
+    try {
+      do {
+        reloadPendingRef.current = false;
+        // Скважины, задачи и тендеры — одним запросом
+        const dashboard = await getDashboard(versionRef.current);
+        if (!dashboard) return;
+        versionRef.current = dashboard.version;
+        if (dashboard.wells) setWells(dashboard.wells);
+        if (dashboard.tasks) setTasks(dashboard.tasks);
+        if (dashboard.tenders) setTenders(dashboard.tenders);
+      } while (reloadPendingRef.current);
+    } finally {
+      loadingRef.current = false;
+    }
+  }, []);
+
   useEffect(() => {
-    const fetchData = async () => {
-      const [wellsData, tasksData] = await Promise.all([getWells(), getTasks()]);
-      setWells(wellsData);
-      setTasks(tasksData);
-    };
     fetchData();
-  }, []);
+    // Поток событий: по каждому дозапрашиваем изменившееся. Редкий опрос — на случай,
+    // если поток недоступен (прокси режет SSE, процесс событий лежит): запрос с
+    // версией без изменений почти ничего не стоит
+    const unsubscribe = subscribeToEvents(fetchData, fetchData);
+    const poll = setInterval(fetchData, DASHBOARD_POLL_INTERVAL_MS);
+    return () => {
+      unsubscribe();
+      clearInterval(poll);
+    };
+  }, [fetchData]);
 
   // Мемоизируем фильтрацию для избежания лишних пересчетов
   const activeWells = useMemo(() => wells.filter(well => well.is_active), [wells]);
   const completedWells = useMemo(() => wells.filter(well => !well.is_active), [wells]);
 
   // 2. Мемоизируем функцию-обработчик для открытия модального окна
-  const handleShowSummary = useCallback((summaryText: string) => {
-    setSummaryContent(summaryText);
-    setIsSummaryModalOpen(true);
+  const handleShowSummary = useCallback(async (wellId: number) => {
+    const summaryText = await getWellSummary(wellId);
+    if (summaryText) {
+      setSummaryContent(summaryText);
+      setIsSummaryModalOpen(true);
+    }
   }, []);
   
 
@@ -60,6 +98,7 @@ export default function Home() {
       {/* НАША БУДУЩАЯ ПАНЕЛЬ */}
       <TendersPanel 
         isOpen={isTendersPanelOpen} 
+        tenders={tenders}
         onClose={() => setIsTendersPanelOpen(false)} 
       />
       {/* БЛОК ЗАДАЧ */}
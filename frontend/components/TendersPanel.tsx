@@ -1,20 +1,11 @@
 // frontend/components/TendersPanel.tsx
 'use client';
-import { useEffect, useState } from 'react';
 import { XMarkIcon } from '@heroicons/react/24/solid';
-import { getTenders } from '@/services/api';
 import { Tender } from '@/types';
 import { TenderTable } from './TenderTable'; // Таблицу вынесем в отдельный компонент
 
-export const TendersPanel: React.FC<{ isOpen: boolean; onClose: () => void }> = ({ isOpen, onClose }) => {
-  const [tenders, setTenders] = useState<Tender[]>([]);
-
-  // Загружаем данные только когда панель собирается открыться
-  useEffect(() => {
-    if (isOpen) {
-      getTenders().then(setTenders);
-    }
-  }, [isOpen]);
+// Тендеры приходят со страницы (загружаются вместе с дашбордом одним запросом)
+export const TendersPanel: React.FC<{ isOpen: boolean; onClose: () => void; tenders: Tender[] }> = ({ isOpen, onClose, tenders }) => {
 
   if (!isOpen) return null;
 
@@ -1,7 +1,7 @@
 // frontend/components/WellCard.tsx
 'use client';
 import { memo } from 'react';
-import { Well } from '../types';
+import { WellListItem } from '../types';
 import { ExclamationTriangleIcon, UsersIcon, DocumentTextIcon  } from '@heroicons/react/24/solid';
 import Link from 'next/link'; 
 
@@ -20,14 +20,14 @@ const ProgressBar: React.FC<{ current: number; total: number }> = ({ current, to
 
 
 interface WellCardProps {
-  well: Well;
-  onShowSummary: (summary: string) => void; // <-- Новый пропс
+  well: WellListItem;
+  onShowSummary: (wellId: number) => void; // <-- сводку загружает родитель по id
 }
 
 
 export const WellCard: React.FC<WellCardProps> = memo(({ well, onShowSummary }) => {
   // Определяем "статус" скважины по наличию проблем
-  const hasIssues = well.nvp_incidents.length > 0 || well.has_overspending;
+  const hasIssues = well.nvp_incident_count > 0 || well.has_overspending;
   const statusColor = !well.is_active
     ? 'border-gray-400' // Серый для завершенных
     : hasIssues
@@ -39,8 +39,8 @@ export const WellCard: React.FC<WellCardProps> = memo(({ well, onShowSummary })
   const handleSummaryClick = (e: React.MouseEvent) => {
     e.preventDefault(); // <-- Останавливаем стандартное поведение (переход по ссылке)
     e.stopPropagation(); // <-- Останавливаем "всплытие" события до <Link>
-    if (well.last_summary_text) {
-      onShowSummary(well.last_summary_text);
+    if (well.has_summary) {
+      onShowSummary(well.id);
     }
   };
 
@@ -56,10 +56,10 @@ export const WellCard: React.FC<WellCardProps> = memo(({ well, onShowSummary })
                 Завершен
               </span>
             )}
-          {well.nvp_incidents.length > 0 && (
+          {well.nvp_incident_count > 0 && (
             <div className="bg-red-100 text-red-800 dark:bg-red-400/20 dark:text-red-300 text-xs font-bold px-2 py-1 rounded-full flex items-center gap-1">
               <ExclamationTriangleIcon className="w-4 h-4" />
-              НВП: {well.nvp_incidents.length}
+              НВП: {well.nvp_incident_count}
             </div>
           )}
           
@@ -104,7 +104,7 @@ export const WellCard: React.FC<WellCardProps> = memo(({ well, onShowSummary })
           <p className="text-xs text-gray-500 dark:text-gray-400 mb-1">Текущие работы:</p>
           <p className="text-gray-700 dark:text-gray-200">{well.current_operations || 'Нет данных'}</p>
         </div>
-        {well.last_summary_text && (
+        {well.has_summary && (
                   <button 
                       onClick={handleSummaryClick}
                       className="flex-shrink-0 p-2 rounded-full hover:bg-gray-200 dark:hover:bg-neutral-700 transition-colors"
@@ -1,21 +1,65 @@
 // frontend/services/api.ts
 
-import { Well, Task,NVPIncident, Tender } from '../types';
+import { Well, WellListItem, Task,NVPIncident, Tender, Dashboard } from '../types';
 
 // Получаем URL нашего API из переменных окружения
 const API_URL = process.env.NEXT_PUBLIC_API_URL;
+// Поток событий отдает отдельный ASGI-процесс (events в backend/Procfile)
+const EVENTS_URL = process.env.NEXT_PUBLIC_EVENTS_URL || API_URL;
 
-export async function getWells(): Promise<Well[]> {
+// Списки API отдаются страницами (курсорная пагинация): { next, previous, results }
+interface Page<T> {
+  next: string | null;
+  previous: string | null;
+  results: T[];
+}
+
+// Забирает все страницы списка, следуя по ссылкам next
+async function fetchAllPages<T>(url: string): Promise<T[]> {
+  const items: T[] = [];
+  let nextUrl: string | null = url;
+  while (nextUrl) {
+    const response = await fetch(nextUrl);
+    if (!response.ok) {
+      throw new Error(`Failed to fetch ${url}`);
+    }
+    const page: Page<T> = await response.json();
+    items.push(...page.results);
+    nextUrl = page.next;
+  }
+  return items;
+}
+
+// Главная страница одним запросом. version — из прошлого ответа: тогда
+// неизменившиеся секции сервер не присылает (они перечислены в unchanged)
+export async function getDashboard(version?: string): Promise<Dashboard | null> {
   try {
-    const response = await fetch(`${API_URL}/wells/`);
-    
+    const query = version ? `?version=${encodeURIComponent(version)}` : '';
+    const response = await fetch(`${API_URL}/dashboard/${query}`);
     if (!response.ok) {
-      // Если сервер ответил ошибкой (например, 500)
-      throw new Error('Failed to fetch wells data');
+      throw new Error('Failed to fetch dashboard');
     }
+    return await response.json();
+  } catch (error) {
+    console.error("Error fetching dashboard:", error);
+    return null;
+  }
+}
 
-    const data: Well[] = await response.json();
-    return data;
+// Живые обновления (Server-Sent Events): сервер сообщает, что скважина
+// обновилась или пришел новый замер. EventSource сам переподключается.
+// onOpen вызывается и при переподключении — за время обрыва события могли потеряться.
+export function subscribeToEvents(onEvent: () => void, onOpen?: () => void): () => void {
+  const source = new EventSource(`${EVENTS_URL}/events/`);
+  source.addEventListener('well', onEvent);
+  source.addEventListener('mud_log', onEvent);
+  if (onOpen) source.addEventListener('open', onOpen);
+  return () => source.close();
+}
+
+export async function getWells(): Promise<WellListItem[]> {
+  try {
+    return await fetchAllPages<WellListItem>(`${API_URL}/wells/`);
   } catch (error) {
     console.error("Error fetching wells:", error);
     // В случае ошибки возвращаем пустой массив, чтобы приложение не "упало"
@@ -43,13 +87,24 @@ export async function getWellById(id: string): Promise<Well | null> {
   }
 }
 
-export async function getTasks(): Promise<Task[]> {
+// Текст последней сводки грузим только по запросу — в списке скважин его нет
+export async function getWellSummary(id: number): Promise<string | null> {
   try {
-    const response = await fetch(`${API_URL}/tasks/`);
+    const response = await fetch(`${API_URL}/wells/${id}/?fields=last_summary_text`);
     if (!response.ok) {
-      throw new Error('Failed to fetch tasks');
+      throw new Error('Failed to fetch well summary');
     }
-    return await response.json();
+    const data: Pick<Well, 'last_summary_text'> = await response.json();
+    return data.last_summary_text;
+  } catch (error) {
+    console.error(`Error fetching summary for well ${id}:`, error);
+    return null;
+  }
+}
+
+export async function getTasks(): Promise<Task[]> {
+  try {
+    return await fetchAllPages<Task>(`${API_URL}/tasks/`);
   } catch (error) {
     console.error("Error fetching tasks:", error);
     return [];
@@ -58,11 +113,7 @@ export async function getTasks(): Promise<Task[]> {
 
 export async function getTenders(): Promise<Tender[]> {
   try {
-    const response = await fetch(`${API_URL}/tenders/`);
-    if (!response.ok) {
-      throw new Error('Failed to fetch tenders');
-    }
-    return await response.json();
+    return await fetchAllPages<Tender>(`${API_URL}/tenders/`);
   } catch (error) {
     console.error("Error fetching tenders:", error);
     return [];
@@ -27,6 +27,23 @@ export interface Well {
   last_summary_text: string | null;
 }
 
+// Компактная карточка из списка GET /wells/ (без текста сводки и списка НВП)
+export interface WellListItem {
+  id: number;
+  name: string;
+  is_active: boolean;
+  engineers: string;
+  current_depth: number;
+  planned_depth: number;
+  current_section: string;
+  current_section_display: string;
+  current_operations: string;
+  has_overspending: boolean;
+  updated_at: string;
+  nvp_incident_count: number;
+  has_summary: boolean;
+}
+
 export interface Task {
   id: number;
   title: string;
@@ -47,4 +64,13 @@ export interface Tender {
   notes: string;
   created_at: string;
   updated_at: string;
-}
\ No newline at end of file
+}
+
+// Ответ /dashboard/: секции, версия которых совпала с присланной, не передаются
+export interface Dashboard {
+  version: string;
+  unchanged: Array<'wells' | 'tasks' | 'tenders'>;
+  wells?: WellListItem[];
+  tasks?: Task[];
+  tenders?: Tender[];
+}